@@ -1,103 +1,135 @@
 import hashlib
-import json
-import os
-from ocr_module import TextAnalyzer, eliz_data_trade
+from dedup_module import DedupStore
+from keyword_module import KeywordMatcher
+from ocr_module import OCRResult, TextAnalyzer, eliz_data_trade
+from segment_module import MessageSegmenter
+
+# Confidenza media (0-100) sotto cui una riga OCR è rumore: le righe di testo reale
+# stanno sopra 70, avatar e icone letti come caratteri intorno a 10-40
+DEFAULT_MIN_CONFIDENCE = 30
 
 class MessageAnalyzer:
-    def __init__(self, keywords="", keywords_eliz="", source_filter="@Eliz Challenge"):
-        self.keywords = [kw.strip() for kw in keywords.split(',') if kw.strip()]
-        self.keywords_eliz = [kw.strip() for kw in keywords_eliz.split(',') if kw.strip()]
+    def __init__(self, keywords="", keywords_eliz="", source_filter="@Eliz Challenge", min_confidence=0,
+                 near_duplicates=None, near_distance=0, last_messages=None):
+        self.set_keywords(keywords)
+        self.set_keywords_eliz(keywords_eliz)
         self.source_filter = source_filter
+        self.min_confidence = min_confidence  # Righe OCR con confidenza media inferiore vengono scartate
         self.text_analyzer = TextAnalyzer()
-        self.last_messages = self.load_last_messages()
+        # Store degli hash dei messaggi già notificati (DedupStore) usato da update_last_messages:
+        # lo imposta l'applicazione (set_dedup_store), fino ad allora uno store in memoria;
+        # le aree ricevono quello condiviso in analyze_messages
+        self.last_messages = last_messages if last_messages is not None else DedupStore()
+        # Indice condiviso dei messaggi notificati: una rilettura entro near_distance modifiche
+        # (stessi numeri) non è un messaggio nuovo
+        self.near_duplicates = near_duplicates
+        self.near_distance = near_distance
     
     def set_keywords(self, keywords):
-        """Imposta le parole chiave generiche"""
-        self.keywords = [kw.strip() for kw in keywords.split(',') if kw.strip()]
+        """Imposta le parole chiave generiche (compilate in un unico matcher)"""
+        self.keyword_matcher = KeywordMatcher(keywords)
+        self.keywords = self.keyword_matcher.keywords
+        self.segmenter = MessageSegmenter(self.keyword_matcher, single_line=True)
     
     def set_keywords_eliz(self, keywords_eliz):
-        """Imposta le parole chiave per Eliz"""
-        self.keywords_eliz = [kw.strip() for kw in keywords_eliz.split(',') if kw.strip()]
+        """Imposta le parole chiave per Eliz (compilate in un unico matcher)"""
+        self.keyword_matcher_eliz = KeywordMatcher(keywords_eliz)
+        self.keywords_eliz = self.keyword_matcher_eliz.keywords
+        # Stato tra i frame: solo i messaggi dalla prima riga cambiata vengono ricostruiti
+        self.segmenter_eliz = MessageSegmenter(self.keyword_matcher_eliz, skip_prefix="(Edited")
     
     def set_source_filter(self, source_filter):
         """Imposta il filtro sorgente"""
         self.source_filter = source_filter
+        self.reset_segmentation()
+    
+    def reset_segmentation(self):
+        """Il prossimo frame viene segmentato per intero (cambio di area, canale o filtri)"""
+        self.segmenter.reset()
+        self.segmenter_eliz.reset()
+    
+    def format_segmentation_stats(self):
+        """Statistiche del segmenter in uso per il filtro sorgente corrente"""
+        if self.source_filter == "@Eliz Challenge":
+            return self.segmenter_eliz.format_stats()
+        return self.segmenter.format_stats()
+    
+    def set_dedup_store(self, dedup_store):
+        """Imposta lo store persistente dei messaggi già notificati (chiude il precedente)"""
+        if self.last_messages is not None and self.last_messages is not dedup_store:
+            self.last_messages.close()
+        self.last_messages = dedup_store
+    
+    def set_near_duplicates(self, near_duplicates, near_distance=0):
+        """Imposta l'indice dei quasi duplicati e la distanza di edit tollerata (0 = solo hash esatto)"""
+        if self.near_duplicates is not None and self.near_duplicates is not near_duplicates:
+            self.near_duplicates.close()
+        self.near_duplicates = near_duplicates
+        self.near_distance = near_distance
+    
+    def is_new_message(self, message, message_hash, last_messages=None):
+        """
+        Nuovo se l'hash non è nello storico (last_messages, di default quello dell'analizzatore)
+        e nessun messaggio notificato è entro near_distance modifiche
+        """
+        if last_messages is None:
+            last_messages = self.last_messages
+        if message_hash in last_messages:
+            return False
+        if self.near_duplicates is None or self.near_distance <= 0:
+            return True
+        return self.near_duplicates.find(message, self.near_distance) is None
+    
+    def set_min_confidence(self, min_confidence):
+        """Imposta la confidenza OCR minima (0-100) di una riga per essere analizzata"""
+        self.min_confidence = min_confidence
+        self.reset_segmentation()
+    
+    def frame_lines(self, text):
+        """Righe non vuote del testo OCR, senza spazi ai bordi"""
+        return [line for line in (raw.strip() for raw in text.split('\n')) if line]
     
-    def detect_new_messages(self, text, last_messages):
-        """Rileva nuovi messaggi nel testo generico"""
+    def detect_new_messages(self, text, last_messages=None):
+        """Rileva nuovi messaggi nel testo generico (solo righe con parole chiave nuove o cambiate)"""
         new_messages = []
         
-        # Dividi in righe
-        lines = text.split('\n')
-        
-        # Trova messaggi con parole chiave
-        current_message = []
-        
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-            
-            # Controlla se contiene parole chiave
-            has_keyword = any(kw in line.lower() for kw in self.keywords if kw)
-            
-            if has_keyword:
-                # Salva messaggio precedente
-                if current_message := self.text_analyzer.remove_before_lo_or_sh_ww_simple(line):
-                    message_hash = hashlib.md5(current_message.encode()).hexdigest()
-                    
-                    if message_hash not in last_messages:
-                        new_messages.append(current_message)
+        for line in self.segmenter.feed(self.frame_lines(text)):
+            if current_message := self.text_analyzer.remove_before_lo_or_sh_ww_simple(line):
+                message_hash = hashlib.md5(current_message.encode()).hexdigest()
                 
-                # Inizia nuovo messaggio
-                current_message = []
+                if self.is_new_message(current_message, message_hash, last_messages):
+                    new_messages.append(current_message)
+                    continue
+            self.segmenter.settle(line)
         
         return new_messages
     
-    def detect_new_messages_eliz(self, text, last_messages):
-        """Rileva nuovi messaggi nel testo di Eliz"""
+    def detect_new_messages_eliz(self, text, last_messages=None):
+        """
+        Rileva nuovi messaggi nel testo di Eliz. Il segmenter allinea le righe al frame
+        precedente: vengono ricostruiti e controllati solo i messaggi aggiunti o modificati
+        e quelli nuovi non ancora registrati nello storico (invio fallito o in corso).
+        """
         new_messages = []
         
-        # Dividi in righe
-        lines = text.split('\n')
-        
-        # Trova messaggi con parole chiave
-        current_message = []
-        
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-            
-            # Controlla se contiene parole chiave
-            has_keyword = any(kw in line.lower() for kw in self.keywords_eliz if kw)
-            
-            if has_keyword:
-                # Salva messaggio precedente
-                if current_message:
-                    message_text = '\n'.join(current_message)
-                    message_hash = hashlib.md5(message_text.encode()).hexdigest()
-                    
-                    if message_hash not in last_messages:
-                        new_messages.append(message_text)
-                
-                # Inizia nuovo messaggio
-                current_message = [line]
-            elif not line.startswith("(Edited"):
-                current_message.append(line)
-        
-        # Ultimo messaggio
-        if current_message:
-            message_text = '\n'.join(current_message)
+        for message_text in self.segmenter_eliz.feed(self.frame_lines(text)):
             message_hash = hashlib.md5(message_text.encode()).hexdigest()
             
-            if message_hash not in last_messages:
+            if self.is_new_message(message_text, message_hash, last_messages):
                 new_messages.append(message_text)
+            else:
+                self.segmenter_eliz.settle(message_text)
         
         return new_messages
     
-    def analyze_messages(self, text, last_messages):
-        """Analizza i messaggi in base al filtro sorgente"""
+    def analyze_messages(self, text, last_messages=None):
+        """
+        Analizza i messaggi in base al filtro sorgente. text può essere un OCRResult:
+        le righe sotto min_confidence (avatar, icone, rumore letti come testo) vengono
+        scartate prima dell'analisi.
+        """
+        if isinstance(text, OCRResult):
+            text = text.confident_text(self.min_confidence)
         if self.source_filter == "@Eliz Challenge":
             return self.detect_new_messages_eliz(text, last_messages)
         else:
@@ -109,33 +141,8 @@ class MessageAnalyzer:
             return self.text_analyzer.parse_eliz_trade(message)
         return None
     
-    def save_last_messages(self, messages, filename='last_messages.json'):
-        """Salva last_messages in un file JSON"""
-        try:
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(messages, f, ensure_ascii=False, indent=2)
-            return True
-        except Exception as e:
-            print(f"Errore nel salvataggio dei messaggi: {e}")
-            return False
-    
-    def load_last_messages(self, filename='last_messages.json'):
-        """Carica last_messages da un file JSON"""
-        try:
-            if os.path.exists(filename):
-                with open(filename, 'r', encoding='utf-8') as f:
-                    messages = json.load(f)
-                return messages
-            else:
-                return []
-        except Exception as e:
-            print(f"Errore nel caricamento dei messaggi: {e}")
-            return []
-    
-    def update_last_messages(self, new_message_hash):
-        """Aggiorna la lista dei messaggi recenti"""
-        self.last_messages.append(new_message_hash) #Fa update della lista degli ultimi messaggi al volo
-        
-        # Mantieni solo ultimi 30 messaggi
-        if len(self.last_messages) > 30:
-            self.last_messages = self.last_messages[-30:] 
\ No newline at end of file
+    def update_last_messages(self, new_message_hash, message=None):
+        """Registra un messaggio notificato (scritto subito nel journal dello store) e il suo testo"""
+        self.last_messages.add(new_message_hash)
+        if message is not None and self.near_duplicates is not None:
+            self.near_duplicates.add(message)
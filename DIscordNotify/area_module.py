@@ -0,0 +1,120 @@
+from dataclasses import dataclass
+from analysis_module import MessageAnalyzer
+from band_module import BandOCR
+from change_module import FrameChangeDetector
+
+AREA_SECTION_PREFIX = "area:"
+
+@dataclass
+class MonitorArea:
+    name: str
+    x: int
+    y: int
+    width: int
+    height: int
+    source_filter: str = "@Eliz Challenge"
+    keywords: str = "long,short,@"
+    keywords_eliz: str = "current trade"
+    preprocessing: str = "default"
+
+    @property
+    def rect(self):
+        return (self.x, self.y, self.width, self.height)
+
+def load_areas(config, include_main=True):
+    """
+    Legge le aree da config.ini: [area] è l'area 'main' con le impostazioni di
+    [monitoring], ogni sezione [area:nome] è un'area aggiuntiva che può avere
+    source_filter, keywords e keywords_eliz propri (default da [monitoring]).
+    preprocessing sceglie il profilo di preprocessing dell'area (default 'default').
+    """
+    monitoring = config['monitoring'] if config.has_section('monitoring') else {}
+    defaults = {
+        'source_filter': monitoring.get('source_filter', '@Eliz Challenge'),
+        'keywords': monitoring.get('keywords', 'long,short,@'),
+        'keywords_eliz': monitoring.get('keywords_eliz', 'current trade'),
+    }
+
+    sections = []
+    if include_main and config.has_section('area'):
+        sections.append(('main', config['area']))
+    for section_name in config.sections():
+        if section_name.startswith(AREA_SECTION_PREFIX):
+            sections.append((section_name[len(AREA_SECTION_PREFIX):].strip(), config[section_name]))
+
+    areas = []
+    for name, section in sections:
+        areas.append(MonitorArea(
+            name=name,
+            x=int(section.get('x', '0')),
+            y=int(section.get('y', '0')),
+            width=int(section.get('width', '0')),
+            height=int(section.get('height', '0')),
+            source_filter=section.get('source_filter', defaults['source_filter']),
+            keywords=section.get('keywords', defaults['keywords']),
+            keywords_eliz=section.get('keywords_eliz', defaults['keywords_eliz']),
+            preprocessing=section.get('preprocessing', 'default')
+        ))
+    return areas
+
+def bounding_union(areas):
+    """Rettangolo (x, y, larghezza, altezza) che contiene tutte le aree"""
+    left = min(area.x for area in areas)
+    top = min(area.y for area in areas)
+    right = max(area.x + area.width for area in areas)
+    bottom = max(area.y + area.height for area in areas)
+    return (left, top, right - left, bottom - top)
+
+class MultiAreaCapture:
+    """Cattura una sola volta per tick il rettangolo che unisce tutte le aree e le restituisce come viste numpy"""
+    def __init__(self, capture, areas):
+        self.capture = capture
+        self.last_frame = None  # Ultimo frame catturato (unione delle aree), es. per SessionRecorder
+        self.set_areas(areas)
+
+    def set_areas(self, areas):
+        """Imposta le aree e ricalcola l'unione e gli offset di ogni area"""
+        if not areas:
+            raise ValueError("Nessuna area di monitoraggio impostata")
+        self.areas = list(areas)
+        self.union = bounding_union(self.areas)
+        ux, uy = self.union[0], self.union[1]
+        self.offsets = {area.name: (area.x - ux, area.y - uy, area.width, area.height) for area in self.areas}
+
+    def grab(self):
+        """Restituisce {nome area: vista sul frame catturato}"""
+        frame = self.capture.grab(self.union)
+        self.last_frame = frame
+        return {name: frame[oy:oy + h, ox:ox + w] for name, (ox, oy, w, h) in self.offsets.items()}
+
+class AreaState:
+    """Stato di elaborazione indipendente di un'area: rilevamento cambiamenti, OCR per bande e analisi"""
+    def __init__(self, area, ocr_processor, preprocess, sensitivity=5, use_band_ocr=True, line_mode=False,
+                 min_confidence=0, near_duplicates=None, near_distance=0):
+        self.area = area
+        self.ocr_processor = ocr_processor
+        self.preprocess = preprocess
+        self.change_detector = FrameChangeDetector(sensitivity=sensitivity)
+        self.band_ocr = BandOCR(ocr_processor, preprocess, line_mode=line_mode) if use_band_ocr else None
+        self.message_analyzer = MessageAnalyzer(area.keywords, area.keywords_eliz, area.source_filter,
+                                                min_confidence, near_duplicates, near_distance)
+        self.first_message_dropped = False
+
+    def extract_text(self, frame):
+        """OCR del frame dell'area (per bande se abilitato)"""
+        return self.collect(self.submit(frame)).text
+
+    def submit(self, frame):
+        """Invia l'OCR del frame senza attenderlo (con un OCRPool le aree vengono lette in parallelo)"""
+        if self.band_ocr:
+            return self.band_ocr.submit(frame)
+        preprocessed = self.preprocess(frame)
+        return self.ocr_processor.submit([preprocessed]), frame.shape, preprocessed.shape
+
+    def collect(self, job):
+        """OCRResult dell'area per un OCR inviato con submit, con i box in coordinate del frame"""
+        if self.band_ocr:
+            return self.band_ocr.collect(job)
+        pending, frame_shape, preprocessed_shape = job
+        return pending.result()[0].transformed(frame_shape[1] / preprocessed_shape[1],
+                                               frame_shape[0] / preprocessed_shape[0])
@@ -0,0 +1,199 @@
+import cv2
+import numpy as np
+from change_module import ScrollEstimator
+from ocr_module import OCRResult
+from preprocessing_module import to_gray
+
+def estimate_background(gray):
+    """Valore di grigio più frequente (sfondo) stimato su un sottocampione"""
+    return int(np.bincount(gray[::4, ::4].ravel(), minlength=256).argmax())
+
+LINE_PENDING = object()  # Banda inviata all'OCR in modalità riga, testo non ancora disponibile
+
+def ink_mask(gray, ink_threshold=48):
+    """Pixel che si discostano dallo sfondo più di ink_threshold (testo, icone, avatar)"""
+    return np.abs(gray.astype(np.int16) - estimate_background(gray)) > ink_threshold
+
+def find_text_bands(gray, ink_threshold=48, min_gap=2, margin=2, ink=None):
+    """
+    Divide un'immagine in scala di grigi in bande orizzontali di testo usando il
+    profilo di proiezione per riga. Restituisce una lista di (y_inizio, y_fine).
+    """
+    h = gray.shape[0]
+    ink = ink_mask(gray, ink_threshold) if ink is None else ink
+    rows = np.flatnonzero(ink.any(axis=1))
+    if not rows.size:
+        return []
+
+    # Righe con inchiostro separate da più di min_gap righe vuote aprono una nuova banda
+    breaks = np.flatnonzero(np.diff(rows) > min_gap)
+    starts = np.concatenate(([rows[0]], rows[breaks + 1]))
+    ends = np.concatenate((rows[breaks], [rows[-1]])) + 1
+    return [(max(0, int(s) - margin), min(h, int(e) + margin)) for s, e in zip(starts, ends)]
+
+def find_gutter(ink, max_width=64, min_gap=8):
+    """
+    Colonna di inizio del testo se a sinistra c'è una colonna stretta (avatar, icone)
+    separata dal testo da almeno min_gap colonne vuote in tutta l'area, altrimenti 0.
+    """
+    columns = np.flatnonzero(ink.any(axis=0))
+    if not columns.size:
+        return 0
+    gaps = np.flatnonzero(np.diff(columns) > min_gap)
+    if not gaps.size:
+        return 0
+    first_end = columns[gaps[0]] + 1
+    if first_end - columns[0] > max_width:
+        return 0
+    return int(columns[gaps[0] + 1])
+
+def ink_extent(ink, x0=0, margin=4):
+    """Intervallo di colonne (inizio, fine) con inchiostro a partire da x0, con margine; None se vuoto"""
+    columns = np.flatnonzero(ink[:, x0:].any(axis=0))
+    if not columns.size:
+        return None
+    return max(x0, x0 + int(columns[0]) - margin), min(ink.shape[1], x0 + int(columns[-1]) + 1 + margin)
+
+class BandOCR:
+    """
+    OCR incrementale per bande sul frame grezzo: l'area viene divisa in righe di testo
+    e solo le bande nuove o cambiate vengono preprocessate e passate a Tesseract.
+    Se la chat è scorsa, il testo delle righe solo spostate viene riportato dal frame
+    precedente e si legge soltanto la striscia appena comparsa.
+
+    Con line_mode=True ogni banda viene ritagliata sul testo (senza la colonna degli
+    avatar e i margini vuoti) e letta in modalità riga singola (psm 7), senza
+    l'analisi del layout del blocco; le bande alte più righe restano in psm 6.
+    """
+    LINE_PSM = 7
+    MAX_LINE_RATIO = 1.6  # Una banda più alta della mediana di questo fattore contiene più righe
+
+    def __init__(self, ocr_processor, preprocess, padding=10, line_mode=False):
+        self.ocr_processor = ocr_processor
+        self.preprocess = preprocess
+        self.padding = padding
+        self.line_mode = line_mode
+        self.scroll_estimator = ScrollEstimator()
+        self.previous_gray = None
+        self.previous_signature = None
+        self.band_results = {}  # (y_inizio, y_fine) sul frame precedente -> OCRResult in coordinate della banda
+        self.last_scroll = 0
+        self.last_total_bands = 0
+        self.last_ocr_bands = 0
+
+    def prepare_band(self, band):
+        """Preprocessa una banda e aggiunge un bordo di sfondo (Tesseract legge male il testo a filo)"""
+        preprocessed = self.preprocess(band)
+        background = estimate_background(preprocessed)
+        return cv2.copyMakeBorder(preprocessed, self.padding, self.padding, self.padding, self.padding,
+                                  cv2.BORDER_CONSTANT, value=background)
+
+    def band_transform(self, band, tile, x0=0):
+        """
+        Argomenti di OCRResult.transformed che riportano i box letti sul tile in
+        coordinate della banda: x come nell'area, y dall'inizio della banda.
+        """
+        scale_x = band.shape[1] / (tile.shape[1] - 2 * self.padding)
+        scale_y = band.shape[0] / (tile.shape[0] - 2 * self.padding)
+        return scale_x, scale_y, x0 - self.padding * scale_x, -self.padding * scale_y
+
+    def recognize_band(self, band):
+        """Preprocessa e legge una singola banda"""
+        return self.ocr_processor.extract_text(self.prepare_band(band))
+
+    def carried_result(self, gray, y0, y1, dy):
+        """Lettura della banda nel frame precedente se i pixel, spostati di dy, sono identici"""
+        result = self.band_results.get((y0 + dy, y1 + dy))
+        if result is None:
+            return None
+        if np.array_equal(gray[y0:y1], self.previous_gray[y0 + dy:y1 + dy]):
+            return result
+        return None
+
+    def extract_text(self, frame):
+        """Estrae il testo di un frame grezzo ri-eseguendo l'OCR solo sulle bande nuove o cambiate"""
+        return self.collect(self.submit(frame)).text
+
+    def submit(self, frame):
+        """
+        Prima fase: individua le bande e invia all'OCR solo quelle nuove o cambiate,
+        tutte insieme (con un OCRPool vengono lette in parallelo). collect() completa.
+        Lo stato delle bande non cambia qui: i segnaposto delle bande inviate restano
+        nel job e il frame diventa il riferimento solo quando collect() riesce.
+        """
+        gray = to_gray(frame)
+        if self.previous_gray is not None and self.previous_gray.shape != gray.shape:
+            self.reset()
+
+        signature = self.scroll_estimator.row_signature(gray)
+        dy = 0
+        if self.previous_gray is not None:
+            dy = self.scroll_estimator.estimate(self.previous_signature, signature) or 0
+
+        ink = ink_mask(gray)
+        bands = find_text_bands(gray, ink=ink)
+        band_results = {}
+        tiles, transforms = [], []
+        line_tiles, line_transforms = [], []
+        if self.line_mode and bands:
+            gutter = find_gutter(ink)
+            max_line_height = self.MAX_LINE_RATIO * float(np.median([y1 - y0 for y0, y1 in bands]))
+
+        for y0, y1 in bands:
+            result = None
+            if self.previous_gray is not None:
+                result = self.carried_result(gray, y0, y1, dy)
+                if result is None and dy:
+                    result = self.carried_result(gray, y0, y1, 0)
+            if result is None:
+                x0, x1 = 0, gray.shape[1]
+                single_line = False
+                if self.line_mode:
+                    extent = ink_extent(ink[y0:y1], gutter)
+                    x0, x1 = extent if extent else (x0, x1)
+                    single_line = y1 - y0 <= max_line_height
+                band = frame[y0:y1, x0:x1]
+                tile = self.prepare_band(band)
+                (line_tiles if single_line else tiles).append(tile)
+                (line_transforms if single_line else transforms).append(self.band_transform(band, tile, x0))
+                # Segnaposto che ricorda in quale dei due gruppi è stata inviata la banda
+                result = LINE_PENDING if single_line else None
+            band_results[(y0, y1)] = result
+
+        self.last_scroll = dy
+        self.last_total_bands = len(bands)
+        self.last_ocr_bands = len(tiles) + len(line_tiles)
+        lines = self.ocr_processor.submit(line_tiles, self.LINE_PSM) if line_tiles else None
+        return ((band_results, gray.copy(), signature), (self.ocr_processor.submit(tiles), transforms),
+                (lines, line_transforms))
+
+    def collect(self, job):
+        """
+        Seconda fase: inserisce le letture al posto delle bande inviate e restituisce
+        l'OCRResult dell'area, con i box in coordinate del frame dell'area. Solo a
+        letture complete il frame e le sue bande diventano il riferimento del frame
+        successivo: se l'OCR solleva un'eccezione resta quello precedente, senza
+        segnaposto che carried_result potrebbe restituire come testo.
+        """
+        (band_results, gray, signature), (pending, transforms), (lines, line_transforms) = job
+        recognized = (result.transformed(*transform)
+                      for result, transform in zip(pending.result(), transforms))
+        recognized_lines = (result.transformed(*transform)
+                            for result, transform in zip(lines.result() if lines else (), line_transforms))
+        completed = {}
+        for key, result in band_results.items():
+            if result is None:
+                result = next(recognized)
+            elif result is LINE_PENDING:
+                result = next(recognized_lines)
+            completed[key] = result
+        self.previous_gray = gray
+        self.previous_signature = signature
+        self.band_results = completed
+        return OCRResult.join([result.transformed(dy=key[0]) for key, result in completed.items()])
+
+    def reset(self):
+        """Svuota lo stato delle bande"""
+        self.previous_gray = None
+        self.previous_signature = None
+        self.band_results = {}
@@ -0,0 +1,1030 @@
+import argparse
+import difflib
+import os
+import re
+import time
+import cv2
+import numpy as np
+
+SAMPLE_LINES = [
+    "Eliz Challenge BOT  Today at 21:49",
+    "Current Trade LIMIT ORDER",
+    "Token Name: SOL",
+    "Bought Token Amount: 12",
+    "Balance: 1000",
+    "Entry Price: 142.35",
+    "Stop Loss: 138.10",
+    "Take Profit: 151.00",
+    "EP Retest: false",
+]
+
+
+def make_sample_frame(lines=None, width=600, line_height=22):
+    """Genera un frame BGR stile tema scuro di Discord con testo chiaro"""
+    lines = lines if lines is not None else SAMPLE_LINES
+    frame = np.full((line_height * len(lines) + 10, width, 3), (54, 57, 63), dtype=np.uint8)
+    for i, line in enumerate(lines):
+        cv2.putText(frame, line, (10, line_height * (i + 1)), cv2.FONT_HERSHEY_SIMPLEX,
+                    0.5, (220, 221, 222), 1, cv2.LINE_AA)
+    return frame
+
+
+def legacy_preprocess(img_cv):
+    """Preprocessing originale di capture_and_preprocess (riferimento per i confronti)"""
+    gray = cv2.cvtColor(img_cv, cv2.COLOR_BGR2GRAY)
+    gray = cv2.resize(gray, None, fx=1.5, fy=1.5, interpolation=cv2.INTER_CUBIC)
+    sharp = cv2.filter2D(gray, -1, np.array([[0, -1, 0], [-1, 5, -1], [0, -1, 0]]))
+    return cv2.bitwise_not(sharp)
+
+
+def load_frame(image_path=None):
+    """Carica un frame da file o ne genera uno sintetico"""
+    if image_path:
+        frame = cv2.imread(image_path)
+        if frame is None:
+            raise FileNotFoundError(f"Immagine non trovata: {image_path}")
+        return frame
+    return make_sample_frame()
+
+
+def time_call(func, iterations):
+    """Esegue func più volte e restituisce (ms medi, ultimo risultato)"""
+    result = func()  # warm-up
+    start = time.perf_counter()
+    for _ in range(iterations):
+        result = func()
+    elapsed = time.perf_counter() - start
+    return elapsed * 1000 / iterations, result
+
+
+def benchmark_ocr(image_path=None, iterations=20):
+    """Confronta pytesseract (processo per frame) con libtesseract residente"""
+    from ocr_module import OCRProcessor
+
+    image = legacy_preprocess(load_frame(image_path))
+    results = {}
+
+    legacy = OCRProcessor(backend='pytesseract')
+    results['pytesseract'], text_legacy = time_call(lambda: legacy.extract_text(image), iterations)
+
+    resident = OCRProcessor(backend='tesseract_api')
+    try:
+        results['tesseract_api'], text_resident = time_call(lambda: resident.extract_text(image), iterations)
+        print(f"Testo identico: {text_legacy == text_resident}")
+    except (OSError, RuntimeError) as e:
+        print(f"Backend tesseract_api non disponibile: {e}")
+    finally:
+        resident.close()
+
+    for name, ms in results.items():
+        print(f"{name:>16}: {ms:8.2f} ms/frame")
+    return results
+
+
+def benchmark_bands(iterations=5):
+    """OCR dell'intera area vs OCR incrementale per bande (riga modificata e scorrimento)"""
+    from ocr_module import OCRProcessor
+    from band_module import BandOCR
+
+    lines = SAMPLE_LINES * 4
+    before = make_sample_frame(lines)
+    scenarios = {
+        'riga modificata': make_sample_frame(lines[:-1] + ["Edited message"]),
+        'scorrimento': make_sample_frame(lines[2:] + ["New message", "arrived now"]),
+    }
+
+    ocr = OCRProcessor()
+    band_ocr = BandOCR(ocr, legacy_preprocess)
+    full_ms, _ = time_call(lambda: ocr.extract_text(legacy_preprocess(before)), iterations)
+    print(f"{'area intera':>16}: {full_ms:8.2f} ms/frame")
+    results = {'full': full_ms}
+
+    for name, after in scenarios.items():
+        elapsed = 0.0
+        for _ in range(iterations):
+            band_ocr.reset()
+            band_ocr.extract_text(before)
+            start = time.perf_counter()
+            band_ocr.extract_text(after)
+            elapsed += time.perf_counter() - start
+        results[name] = elapsed * 1000 / iterations
+        print(f"{name:>16}: {results[name]:8.2f} ms/frame "
+              f"({band_ocr.last_ocr_bands}/{band_ocr.last_total_bands} bande OCR, scroll {band_ocr.last_scroll}px)")
+    return results
+
+
+def measure_fps(grab, seconds=3.0):
+    """Frame al secondo sostenuti da una funzione di cattura"""
+    grab()  # warm-up
+    frames = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        grab()
+        frames += 1
+    return frames / (time.perf_counter() - start)
+
+
+def benchmark_capture(area, seconds=3.0):
+    """pyautogui + PIL + conversioni colore vs sessione mss persistente con viste BGRA"""
+    import pyautogui
+    from capture_module import MssCapture
+
+    def legacy_grab():
+        screenshot = pyautogui.screenshot(region=area)
+        img_cv = cv2.cvtColor(np.array(screenshot), cv2.COLOR_RGB2BGR)
+        return cv2.cvtColor(img_cv, cv2.COLOR_BGR2GRAY)
+
+    capture = MssCapture()
+
+    def mss_grab():
+        return cv2.cvtColor(capture.grab(area), cv2.COLOR_BGRA2GRAY)
+
+    results = {'pyautogui': measure_fps(legacy_grab, seconds), 'mss': measure_fps(mss_grab, seconds)}
+    capture.close()
+    for name, fps in results.items():
+        print(f"{name:>16}: {fps:8.1f} frame/s")
+    return results
+
+
+def benchmark_preprocessing(image_path=None, iterations=200):
+    """Preprocessing originale vs PreprocessingPipeline: latenza e memoria allocata per frame"""
+    import tracemalloc
+    from preprocessing_module import PreprocessingPipeline
+
+    frame = load_frame(image_path)
+    pipeline = PreprocessingPipeline()
+    results = {}
+
+    for name, func in (('originale', legacy_preprocess), ('pipeline', pipeline.process)):
+        latency_ms, _ = time_call(lambda: func(frame), iterations)
+
+        # Picco di memoria tracciata durante un frame (numpy registra i buffer in tracemalloc)
+        tracemalloc.start()
+        peaks = []
+        for _ in range(20):
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            func(frame)
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+        tracemalloc.stop()
+
+        results[name] = {'latency_ms': latency_ms, 'allocated_kb': sum(peaks) / len(peaks) / 1024}
+        print(f"{name:>16}: {latency_ms:8.3f} ms/frame, {results[name]['allocated_kb']:10.1f} KB allocati/frame")
+    return results
+
+
+def text_accuracy(text, reference):
+    """Similarità a livello di carattere (0-1) tra testo OCR e riferimento, ignorando righe vuote e spazi doppi"""
+    def normalize(value):
+        return "\n".join(" ".join(line.split()) for line in value.splitlines() if line.strip())
+    return difflib.SequenceMatcher(None, normalize(text), normalize(reference)).ratio()
+
+
+def benchmark_binarization(image_paths=None, iterations=3):
+    """
+    Percorso sharpen+invert vs profili binarizzati: latenza di preprocessing+OCR e
+    accuratezza. Il riferimento è il testo noto per il frame sintetico, il file
+    <immagine>.txt accanto ai frame registrati se presente, altrimenti l'uscita
+    del profilo 'default'.
+    """
+    from ocr_module import OCRProcessor
+    from preprocessing_module import PreprocessingPipeline, PROFILES
+
+    profiles = {name: PreprocessingPipeline(**params) for name, params in PROFILES.items()}
+    profiles['binary-adaptive'] = PreprocessingPipeline(stages=('invert', 'threshold'), threshold='adaptive')
+    profiles['binary-1.5x'] = PreprocessingPipeline(stages=('scale', 'invert', 'threshold'))
+
+    frames = [('sintetico', make_sample_frame(), "\n".join(SAMPLE_LINES))]
+    for path in image_paths or []:
+        truth_path = os.path.splitext(path)[0] + ".txt"
+        truth = None
+        if os.path.exists(truth_path):
+            with open(truth_path, encoding='utf-8') as f:
+                truth = f.read()
+        frames.append((os.path.basename(path), load_frame(path), truth))
+
+    ocr = OCRProcessor()
+    results = {}
+    for frame_name, frame, truth in frames:
+        print(f"{frame_name}:")
+        reference = truth
+        for name, profile in profiles.items():
+            latency_ms, text = time_call(lambda: ocr.extract_text(profile(frame)), iterations)
+            if reference is None:
+                reference = text  # Senza testo noto si misura la concordanza con 'default'
+            accuracy = text_accuracy(text, reference)
+            results[(frame_name, name)] = {'latency_ms': latency_ms, 'accuracy': accuracy}
+            print(f"{name:>16}: {latency_ms:8.2f} ms/frame, accuratezza {accuracy * 100:6.2f}%")
+    ocr.close()
+    return results
+
+
+def benchmark_lines(image_paths=None, iterations=3):
+    """
+    OCR dell'intera area come blocco (psm 6) vs bande a tutta larghezza (psm 6) vs
+    righe ritagliate sul testo in modalità riga singola (psm 7): latenza e
+    accuratezza a livello di carattere rispetto al testo noto (<immagine>.txt).
+    """
+    from ocr_module import OCRProcessor
+    from band_module import BandOCR
+
+    frames = [('sintetico', make_sample_frame(), "\n".join(SAMPLE_LINES))]
+    for path in image_paths or []:
+        truth_path = os.path.splitext(path)[0] + ".txt"
+        with open(truth_path, encoding='utf-8') as f:
+            frames.append((os.path.basename(path), load_frame(path), f.read()))
+
+    ocr = OCRProcessor(cache_size=0)  # Ogni iterazione deve passare da Tesseract
+    modes = {
+        'blocco psm 6': lambda frame: ocr.extract_text(legacy_preprocess(frame)),
+        'bande psm 6': lambda frame: BandOCR(ocr, legacy_preprocess).extract_text(frame),
+        'righe psm 7': lambda frame: BandOCR(ocr, legacy_preprocess, line_mode=True).extract_text(frame),
+    }
+    results = {}
+    for frame_name, frame, truth in frames:
+        print(f"{frame_name}:")
+        for name, recognize in modes.items():
+            latency_ms, text = time_call(lambda: recognize(frame), iterations)
+            accuracy = text_accuracy(text, truth)
+            results[(frame_name, name)] = {'latency_ms': latency_ms, 'accuracy': accuracy}
+            print(f"{name:>16}: {latency_ms:8.2f} ms/frame, accuratezza {accuracy * 100:6.2f}%")
+    ocr.close()
+    return results
+
+
+def benchmark_confidence(image_paths=None, iterations=3, min_confidence=None):
+    """
+    Lettura solo testo vs lettura strutturata (testo, box e confidenze dalla stessa
+    passata) e righe che MessageAnalyzer scarterebbe sotto min_confidence.
+    """
+    from ocr_module import OCRProcessor
+    from analysis_module import DEFAULT_MIN_CONFIDENCE
+
+    min_confidence = DEFAULT_MIN_CONFIDENCE if min_confidence is None else min_confidence
+    frames = [('sintetico', make_sample_frame())]
+    frames += [(os.path.basename(path), load_frame(path)) for path in image_paths or []]
+    ocr = OCRProcessor(cache_size=0)
+    engine = ocr.get_engine()
+    results = {}
+    for frame_name, frame in frames:
+        image = legacy_preprocess(frame)
+        text_ms, text = time_call(lambda: engine.recognize(image).strip() if engine else ocr.extract_text(image),
+                                  iterations)
+        data_ms, result = time_call(lambda: ocr.recognize(image), iterations)
+        kept = sum(line.confidence >= min_confidence for line in result.lines)
+        results[frame_name] = {'text_ms': text_ms, 'data_ms': data_ms, 'lines': len(result.lines), 'kept': kept}
+        print(f"{frame_name}: solo testo {text_ms:.2f} ms, strutturato {data_ms:.2f} ms "
+              f"(+{data_ms - text_ms:.2f} ms), testo identico: {result.text == text}")
+        for line in result.lines:
+            marker = ' ' if line.confidence >= min_confidence else 'x'
+            print(f"  {marker} {line.confidence:5.1f}  {line.text}")
+        print(f"  {kept}/{len(result.lines)} righe sopra {min_confidence}")
+    ocr.close()
+    return results
+
+
+def benchmark_templates(image_path=None, templates_dir="templates", iterations=50, canvas=(1400, 900)):
+    """
+    Ricerca template originale (matchTemplate a piena risoluzione per ogni template)
+    vs TemplateMatcher, a freddo (piramide) e a caldo (intorno dell'ultimo match);
+    poi decodifica dei template con e senza cache e ricerca multi-scala.
+    Il frame è incollato su uno sfondo grande quanto un'area di monitoraggio reale.
+    """
+    from template_module import TemplateMatcher, TemplateCache, TEMPLATE_EXTENSIONS, DISCORD_ZOOM_SCALES
+
+    frame = cv2.imread(image_path or "test_screenshot_multi.png")
+    if frame is None:
+        raise FileNotFoundError(f"Immagine non trovata: {image_path}")
+    width, height = max(canvas[0], frame.shape[1]), max(canvas[1], frame.shape[0])
+    big = np.full((height, width, 3), (54, 57, 63), dtype=np.uint8)
+    y0, x0 = height - frame.shape[0], (width - frame.shape[1]) // 2
+    big[y0:y0 + frame.shape[0], x0:x0 + frame.shape[1]] = frame
+    big = cv2.cvtColor(big, cv2.COLOR_BGR2BGRA)  # Come i frame di mss
+
+    legacy_templates = {name: cv2.imread(os.path.join(templates_dir, name), 0)
+                        for name in os.listdir(templates_dir) if name.lower().endswith(TEMPLATE_EXTENSIONS)}
+
+    def legacy_find():
+        gray = cv2.cvtColor(big, cv2.COLOR_BGRA2GRAY)
+        return {name for name, template in legacy_templates.items()
+                if cv2.minMaxLoc(cv2.matchTemplate(gray, template, cv2.TM_CCOEFF_NORMED))[1] >= 0.8}
+
+    matcher = TemplateMatcher()
+    matcher.load_directory(templates_dir)
+
+    def cold_find():
+        matcher.last_matches.clear()
+        return matcher.find(big)
+
+    results = {}
+    for name, func in (('originale', legacy_find), ('piramide', cold_find), ('ultimo match', lambda: matcher.find(big))):
+        results[name], found = time_call(func, iterations)
+        print(f"{name:>16}: {results[name]:8.2f} ms/frame, trovati: {', '.join(sorted(found)) or '-'}")
+
+    # find_template: lettura e decodifica del PNG a ogni chiamata vs TemplateCache
+    path = os.path.join(templates_dir, sorted(legacy_templates)[0])
+    cache = TemplateCache()
+    results['imread'], _ = time_call(lambda: cv2.imread(path), iterations)
+    results['cache'], _ = time_call(lambda: cache.get(path), iterations)
+    for name in ('imread', 'cache'):
+        print(f"{name:>16}: {results[name] * 1000:8.1f} us/template")
+
+    # Multi-scala: frame ingrandito come con lo zoom di Discord al 125%
+    zoomed = cv2.resize(big, None, fx=1.25, fy=1.25, interpolation=cv2.INTER_LINEAR)
+    for name, scales in (('scala 1.0', (1.0,)), ('scale 0.9-1.25', (0.9, 1.0, 1.1, 1.25)),
+                         ('tutti gli zoom', DISCORD_ZOOM_SCALES)):
+        zoom_matcher = TemplateMatcher(scales=scales)
+        zoom_matcher.load_directory(templates_dir)
+
+        def zoom_find():
+            zoom_matcher.last_matches.clear()
+            return zoom_matcher.find(zoomed)
+
+        results[name], found = time_call(zoom_find, max(1, iterations // 5))
+        print(f"{name:>16}: {results[name]:8.2f} ms/frame al 125%, trovati: {', '.join(sorted(found)) or '-'}")
+    return results
+
+
+def make_trade_block(index):
+    """Righe di un messaggio 'Current Trade' sintetico, diverso per ogni index"""
+    tokens = ["SOL", "ARKM", "BTC", "ETH", "DOGE", "AVAX", "LINK", "NEAR"]
+    price = 100 + index * 7.25
+    return [
+        "Eliz Challenge BOT  Today at 21:49",
+        "Current Trade LIMIT ORDER",
+        f"Token Name: {tokens[index % len(tokens)]}",
+        f"Bought Token Amount: {10 + index}",
+        "Balance: 1000",
+        f"Entry Price: {price:.2f}",
+        f"Stop Loss: {price * 0.97:.2f}",
+        f"Take Profit: {price * 1.06:.2f}",
+        "EP Retest: false",
+    ]
+
+
+def make_replay(path, messages=6, repeat=3, fmt='images', fps=2.0, visible_lines=20, width=600, line_height=22):
+    """
+    Registrazione sintetica di una chat in cui arriva un trade alla volta: ogni
+    stato resta sullo schermo per repeat frame (frame invariati come dal vivo).
+    Scrive una sequenza PNG o un archivio grezzo e un replay.ini con l'area intera.
+    """
+    from source_module import save_raw_archive
+
+    lines = []
+    frames = []
+    for index in range(messages):
+        lines.extend(make_trade_block(index))
+        frame = make_sample_frame(lines[-visible_lines:] + [""] * max(0, visible_lines - len(lines)),
+                                  width=width, line_height=line_height)
+        frames.extend([frame] * repeat)
+    timestamps = [index / fps for index in range(len(frames))]
+
+    os.makedirs(path, exist_ok=True)
+    if fmt == 'raw':
+        save_raw_archive(path, frames, timestamps)
+    else:
+        for index, frame in enumerate(frames):
+            cv2.imwrite(os.path.join(path, f"frame_{index:05d}.png"), frame)
+
+    height, width = frames[0].shape[:2]
+    with open(os.path.join(path, "replay.ini"), 'w', encoding='utf-8') as f:
+        f.write(f"[monitoring]\nsource_filter = @Eliz Challenge\nkeywords_eliz = current trade\nsensitivity = 5\n\n"
+                f"[area]\nx = 0\ny = 0\nwidth = {width}\nheight = {height}\n")
+    print(f"{len(frames)} frame {width}x{height} scritti in {path} ({fmt}, {fps} frame/s)")
+    print(f"python monitor_service.py --config {os.path.join(path, 'replay.ini')} --replay {path} --dry-run"
+          + (f" --fps {fps}" if fmt != 'raw' else ""))
+    return path
+
+
+def benchmark_ocr_cache(messages=12, visible_lines=20, cache_size=1024):
+    """
+    Chat in cui arriva un trade alla volta, letta per bande: senza cache vs con la
+    cache OCR per contenuto. Le righe ricorrenti dei messaggi (intestazione del bot,
+    'Current Trade', 'Balance', 'EP Retest') vengono lette da Tesseract una volta sola.
+    """
+    from ocr_module import OCRProcessor
+    from band_module import BandOCR
+
+    lines = []
+    frames = []
+    for index in range(messages):
+        lines.extend(make_trade_block(index))
+        frames.append(make_sample_frame(lines[-visible_lines:] + [""] * max(0, visible_lines - len(lines))))
+
+    results = {}
+    for name, size in (('senza cache', 0), ('cache', cache_size)):
+        processor = OCRProcessor(cache_size=size)
+        band_ocr = BandOCR(processor, legacy_preprocess)
+        texts = []
+        bands = 0
+        start = time.perf_counter()
+        for frame in frames:
+            texts.append(band_ocr.extract_text(frame))
+            bands += band_ocr.last_ocr_bands
+        elapsed = time.perf_counter() - start
+        tesseract_calls = processor.cache.misses if processor.cache else bands
+        results[name] = {'ms_per_frame': elapsed * 1000 / len(frames), 'tesseract_calls': tesseract_calls,
+                         'texts': texts}
+        print(f"{name:>16}: {results[name]['ms_per_frame']:8.2f} ms/frame, {bands} bande da leggere, "
+              f"{tesseract_calls} letture Tesseract"
+              + (f" ({processor.cache.format_stats()})" if processor.cache else ""))
+        processor.close()
+    print(f"Testo identico: {results['cache']['texts'] == results['senza cache']['texts']}")
+    return results
+
+
+def benchmark_recorder(path, frames=60, budget_mb=8.0, chunk_mb=2.0):
+    """
+    Costo di SessionRecorder sul thread di cattura (submit) e del writer in
+    background: frame/s scritti, compressione e rotazione entro il budget.
+    Alla fine la sessione viene riletta con RecordingReader e confrontata (i chunk
+    della sessione in corso non vengono cancellati: oltre il budget si sospende).
+    """
+    from recorder_module import SessionRecorder, RecordingReader
+
+    lines = []
+    sequence = []
+    for index in range(frames):
+        if index % 2 == 0:  # Metà dei frame invariati, come con una chat ferma
+            lines.extend(make_trade_block(index // 2))
+        sequence.append(cv2.cvtColor(make_sample_frame(lines[-27:], width=1193), cv2.COLOR_BGR2BGRA))
+
+    recorder = SessionRecorder(path, budget_mb=budget_mb, chunk_mb=chunk_mb, queue_size=frames)
+    recorder.start()
+    started_at = time.perf_counter()
+    submit_times = []
+    for frame in sequence:
+        start = time.perf_counter()
+        recorder.submit(frame)
+        submit_times.append(time.perf_counter() - start)
+    recorder.stop(timeout=60)
+    elapsed = time.perf_counter() - started_at
+
+    stats = recorder.stats()
+    reader = RecordingReader(recorder.session_path)
+    head = [frame for index, frame in enumerate(sequence) if index % 2 == 0][:len(reader)]
+    identical = all(np.array_equal(reader.read(i), frame) for i, frame in enumerate(head))
+    reader.close()
+
+    print(f"{'submit':>16}: {np.mean(submit_times) * 1e6:8.1f} us medi (max {max(submit_times) * 1e6:.1f} us)")
+    print(f"{'writer':>16}: {frames / elapsed:8.1f} frame/s elaborati, "
+          f"{stats['written']} scritti, {stats['unchanged']} invariati, {stats['dropped']} scartati, "
+          f"{stats['over_budget']} oltre budget")
+    print(f"{'disco':>16}: {stats['bytes_written'] / 1048576:8.2f} MB, compressione {stats['compression_ratio']:.0f}x, "
+          f"chunk cancellati {stats['chunks_deleted']}, {len(head)} frame riletti identici: {identical}")
+    return stats
+
+
+def benchmark_ocr_pool(areas=4, workers=None, iterations=3):
+    """
+    OCR di più aree per tick: tutte le bande nel thread dello stadio vs OCRPool
+    (bande di tutte le aree lette in parallelo da processi con memoria condivisa).
+    """
+    from ocr_module import OCRProcessor
+    from ocrpool_module import OCRPool
+    from band_module import BandOCR, find_text_bands
+    from preprocessing_module import to_gray
+
+    frames = [make_sample_frame(SAMPLE_LINES[index % 3:] + [f"Area {index}"]) for index in range(areas)]
+    processor = OCRProcessor()
+
+    def run(ocr):
+        band_ocrs = [BandOCR(ocr, legacy_preprocess) for _ in frames]
+        jobs = [band_ocr.submit(frame) for band_ocr, frame in zip(band_ocrs, frames)]
+        return [band_ocr.collect(job).text for band_ocr, job in zip(band_ocrs, jobs)]
+
+    sequential_ms, reference = time_call(lambda: run(processor), iterations)
+    tiles = sum(len(find_text_bands(to_gray(frame))) for frame in frames)
+    print(f"{'sequenziale':>16}: {sequential_ms:8.2f} ms/tick ({tiles} bande, {os.cpu_count()} core)")
+    results = {'sequential': sequential_ms}
+
+    counts = [workers] if workers else sorted({1, 2, max(1, (os.cpu_count() or 2) - 1)})
+    for count in counts:
+        pool = OCRPool.for_processor(processor, workers=count)
+        try:
+            pool_ms, texts = time_call(lambda: run(pool), iterations)
+        finally:
+            pool.close()
+        results[count] = pool_ms
+        print(f"{f'pool {count} worker':>16}: {pool_ms:8.2f} ms/tick ({sequential_ms / pool_ms:.2f}x), "
+              f"testo identico: {texts == reference}")
+    processor.close()
+    return results
+
+
+def benchmark_glyphs(image_paths=None, train_messages=24, test_messages=4, iterations=3):
+    """
+    Backend 'glyph' vs Tesseract. L'atlante viene creato da trade sintetici e provato
+    su trade mai visti (e sui frame registrati, con <immagine>.txt come testo atteso):
+    latenza per riga sola lettura dei glifi vs Tesseract psm 7, poi OCR per bande
+    dell'intero frame con Tesseract e con il backend 'glyph' (righe incerte rilette).
+    """
+    import tempfile
+    from ocr_module import OCRProcessor
+    from band_module import BandOCR, find_text_bands
+    from preprocessing_module import to_gray
+    from glyph_module import GlyphReader, build_atlas
+
+    tesseract = OCRProcessor(cache_size=0)
+    train = [make_sample_frame(make_trade_block(index)) for index in range(train_messages)]
+    start = time.perf_counter()
+    atlas = build_atlas(train, legacy_preprocess, tesseract)
+    print(f"Atlante: {len(atlas.labels)} modelli ({''.join(sorted(set(atlas.labels)))}) "
+          f"da {train_messages} frame in {time.perf_counter() - start:.1f} s")
+    atlas_path = os.path.join(tempfile.mkdtemp(), "glyph_atlas.npz")
+    atlas.save(atlas_path)
+    glyph = OCRProcessor(backend='glyph', cache_size=0, glyph_atlas=atlas_path)
+    reader = GlyphReader(atlas)
+
+    frames = []
+    for index in range(100, 100 + test_messages):
+        lines = make_trade_block(index)
+        frames.append((f"trade {index}", make_sample_frame(lines), "\n".join(lines)))
+    for path in image_paths or []:
+        with open(os.path.splitext(path)[0] + ".txt", encoding='utf-8') as f:
+            frames.append((os.path.basename(path), load_frame(path), f.read()))
+
+    band_ocr = BandOCR(tesseract, legacy_preprocess)
+    tesseract_ms, glyph_ms, tiles = 0.0, 0.0, 0
+    for _, frame, _ in frames:
+        for y0, y1 in find_text_bands(to_gray(frame)):
+            tile = band_ocr.prepare_band(frame[y0:y1])
+            tesseract_ms += time_call(lambda: tesseract.recognize_tesseract(tile, 7), iterations)[0]
+            glyph_ms += time_call(lambda: reader.recognize(tile), iterations)[0]
+            tiles += 1
+    results = {'tesseract_line_ms': tesseract_ms / tiles, 'glyph_line_ms': glyph_ms / tiles}
+    print(f"{'Tesseract psm 7':>16}: {tesseract_ms / tiles:8.2f} ms/riga")
+    print(f"{'glifi':>16}: {glyph_ms / tiles:8.2f} ms/riga ({tesseract_ms / glyph_ms:.1f}x)")
+
+    for frame_name, frame, truth in frames:
+        print(f"{frame_name}:")
+        for name, processor in (('tesseract', tesseract), ('glyph', glyph)):
+            latency_ms, text = time_call(lambda: BandOCR(processor, legacy_preprocess).extract_text(frame), iterations)
+            accuracy = text_accuracy(text, truth)
+            results[(frame_name, name)] = {'latency_ms': latency_ms, 'accuracy': accuracy}
+            print(f"{name:>16}: {latency_ms:8.2f} ms/frame, accuratezza {accuracy * 100:6.2f}%")
+    print(glyph.get_glyph_reader().format_stats())
+    tesseract.close()
+    glyph.close()
+    return results
+
+
+def benchmark_dedup(entries=(30, 10000, 1000000), lookups=10000, adds=200):
+    """
+    Storico dei messaggi notificati: lista di hash esadecimali con ricerca lineare e
+    last_messages.json riscritto a ogni messaggio vs DedupStore (insieme in memoria,
+    journal binario a sola aggiunta). Per ogni dimensione: apertura, ricerca e
+    inserimento con salvataggio.
+    """
+    import hashlib
+    import json
+    import tempfile
+    from dedup_module import DedupStore
+
+    results = {}
+    for count in entries:
+        folder = tempfile.mkdtemp()
+        hashes = [hashlib.md5(str(index).encode()).hexdigest() for index in range(count + adds)]
+        present = hashes[:count]
+        # I messaggi ancora sullo schermo sono i più recenti (in fondo alla lista) o nuovi
+        probes = [present[-1 - index % 20] if index % 2 else hashes[count + index % adds] for index in range(lookups)]
+
+        json_path = os.path.join(folder, "last_messages.json")
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(present, f, ensure_ascii=False, indent=2)
+        journal_path = os.path.join(folder, "last_messages.journal")
+        DedupStore(journal_path, capacity=count + adds, legacy_path=json_path).close()  # Import della lista
+        start = time.perf_counter()
+        with open(json_path, 'r', encoding='utf-8') as f:
+            messages = json.load(f)
+        list_load_ms = (time.perf_counter() - start) * 1000
+        list_probes = probes[:max(1, min(lookups, 10 ** 8 // max(count, 1)))]  # La scansione lineare è O(n)
+        start = time.perf_counter()
+        list_hits = sum(message_hash in messages for message_hash in list_probes)
+        list_lookup_us = (time.perf_counter() - start) * 1e6 / len(list_probes)
+        add_hashes = hashes[count:count + max(1, min(adds, 10 ** 7 // max(count, 1)))]
+        start = time.perf_counter()
+        for message_hash in add_hashes:
+            messages.append(message_hash)
+            with open(json_path, 'w', encoding='utf-8') as f:
+                json.dump(messages, f, ensure_ascii=False, indent=2)
+        list_add_ms = (time.perf_counter() - start) * 1000 / len(add_hashes)
+
+        start = time.perf_counter()
+        store = DedupStore(journal_path, capacity=count + adds, legacy_path=None)
+        store_load_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        store_hits = sum(message_hash in store for message_hash in list_probes)
+        store_lookup_us = (time.perf_counter() - start) * 1e6 / len(list_probes)
+        start = time.perf_counter()
+        for message_hash in hashes[count:count + adds]:
+            store.add(message_hash)
+        store_add_ms = (time.perf_counter() - start) * 1000 / adds
+        store.close()
+
+        results[count] = {'list_load_ms': list_load_ms, 'list_lookup_us': list_lookup_us, 'list_add_ms': list_add_ms,
+                          'store_load_ms': store_load_ms, 'store_lookup_us': store_lookup_us,
+                          'store_add_ms': store_add_ms, 'journal_bytes': os.path.getsize(journal_path),
+                          'json_bytes': os.path.getsize(json_path)}
+        print(f"{count} messaggi (ricerche {len(list_probes)}, trovati {list_hits}/{store_hits}):")
+        print(f"{'lista + JSON':>16}: apertura {list_load_ms:8.2f} ms, ricerca {list_lookup_us:10.2f} us, "
+              f"inserimento {list_add_ms:8.3f} ms, {results[count]['json_bytes'] / 1024:.0f} KB")
+        print(f"{'DedupStore':>16}: apertura {store_load_ms:8.2f} ms, ricerca {store_lookup_us:10.2f} us, "
+              f"inserimento {store_add_ms:8.3f} ms, {results[count]['journal_bytes'] / 1024:.0f} KB")
+    return results
+
+
+def benchmark_keywords(keyword_counts=(3, 100, 1000), lines=2000, iterations=5):
+    """
+    Ricerca delle parole chiave nelle righe OCR: any(kw in line.lower() ...) che
+    scorre la riga una volta per parola vs KeywordMatcher compilato (una passata).
+    Le righe sono un dump OCR sintetico di messaggi 'Current Trade'; gli esiti dei
+    due metodi devono coincidere riga per riga.
+    """
+    import random
+    from keyword_module import KeywordMatcher
+
+    rng = random.Random(0)
+    dump = [line for index in range(lines // 9 + 1) for line in make_trade_block(index)][:lines]
+    alphabet = "abcdefghijklmnopqrstuvwxyz"
+    results = {}
+    for count in keyword_counts:
+        keywords = ["long", "short", "current trade"][:count]
+        while len(keywords) < count:
+            keywords.append("".join(rng.choice(alphabet) for _ in range(rng.randint(4, 12))))
+        start = time.perf_counter()
+        matcher = KeywordMatcher(",".join(keywords))
+        compile_ms = (time.perf_counter() - start) * 1000
+
+        def scan_any():
+            return [any(kw in line.lower() for kw in keywords if kw) for line in dump]
+
+        def scan_matcher():
+            return [matcher.search(line) is not None for line in dump]
+
+        any_ms, any_found = time_call(scan_any, iterations)
+        matcher_ms, matcher_found = time_call(scan_matcher, iterations)
+        results[count] = {'any_ms': any_ms, 'matcher_ms': matcher_ms, 'compile_ms': compile_ms,
+                          'same': any_found == matcher_found}
+        print(f"{count} parole chiave, {len(dump)} righe (righe trovate {sum(matcher_found)}, "
+              f"esiti {'identici' if any_found == matcher_found else 'DIVERSI'}):")
+        print(f"{'any()':>16}: {any_ms:8.2f} ms")
+        print(f"{'KeywordMatcher':>16}: {matcher_ms:8.2f} ms (compilazione {compile_ms:.2f} ms)")
+    return results
+
+
+def benchmark_segmenter(visible=(20, 100, 500), frames=300):
+    """
+    Analisi dei messaggi Eliz su una chat che scorre di una riga per frame, con
+    visible righe sullo schermo: segmentazione completa a ogni frame (hash e storico
+    per tutti i messaggi visibili, come prima) vs MessageSegmenter che riparte dalla
+    prima riga cambiata. I messaggi nuovi trovati devono essere gli stessi, a parte i
+    frammenti senza intestazione in cima allo schermo che la segmentazione completa
+    ritrova diversi a ogni scorrimento.
+    """
+    import hashlib
+    from analysis_module import MessageAnalyzer
+    from dedup_module import DedupStore
+
+    results = {}
+    for count in visible:
+        stream = [line for index in range((count + frames) // 9 + 2) for line in make_trade_block(index)]
+        texts = ["\n".join(stream[end - count:end]) for end in range(count, count + frames)]
+
+        def analyze(streaming):
+            analyzer = MessageAnalyzer(keywords_eliz="current trade")
+            store = DedupStore()
+            found = set()
+            start = time.perf_counter()
+            for text in texts:
+                if not streaming:
+                    analyzer.reset_segmentation()
+                for message in analyzer.analyze_messages(text, store):
+                    store.add(hashlib.md5(message.encode()).hexdigest())
+                    if analyzer.keyword_matcher_eliz.search(message.split('\n', 1)[0]):
+                        found.add(message)
+            return (time.perf_counter() - start) * 1000 / len(texts), found, analyzer
+
+        full_ms, full_found, _ = analyze(False)
+        stream_ms, stream_found, analyzer = analyze(True)
+        results[count] = {'full_ms': full_ms, 'streaming_ms': stream_ms, 'same': full_found == stream_found}
+        print(f"{count} righe visibili, {len(texts)} frame (messaggi {len(stream_found)}, "
+              f"{'identici' if full_found == stream_found else 'DIVERSI'}):")
+        print(f"{'completa':>16}: {full_ms:8.3f} ms/frame")
+        print(f"{'streaming':>16}: {stream_ms:8.3f} ms/frame, {analyzer.segmenter_eliz.format_stats()}")
+    return results
+
+
+def legacy_clean_classic(text):
+    """remove_before_lo_or_sh_ww_simple originale: ricerca di Lo/Sh carattere per carattere"""
+    for i in range(len(text) - 1):
+        if text[i:i+2] in ["Lo", "Sh"]:
+            result = text[i:].replace("w/", "")
+            at_pos = result.find("@")
+            if at_pos != -1:
+                result = result[:at_pos]
+            return result.strip()
+    return ""
+
+
+def legacy_parse_eliz_fields(text):
+    """parse_eliz_trade originale (startswith/replace/lower per riga), campi come dizionario"""
+    limit_order, token_name, bought_token_amount, balance, entry_price = False, "", 0, 0, 0.0
+    stop_loss, take_profit, e_retest, side = "", "", False, ""
+    for line in text.strip().split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+        if "long" in line.lower():
+            side = "Buy"
+        elif "short" in line.lower():
+            side = "Sell"
+        if line.endswith("LIMIT ORDER"):
+            limit_order = True
+        if line.startswith("Token Name:"):
+            token_name = line.replace("Token Name:", "").strip()
+        elif line.startswith("Bought Token Amount:"):
+            try:
+                bought_token_amount = int(line.replace("Bought Token Amount:", "").strip())
+            except ValueError:
+                bought_token_amount = 0
+        elif line.startswith("Balance:"):
+            try:
+                balance = int(line.replace("Balance:", "").strip())
+            except ValueError:
+                balance = 0
+        elif line.startswith("Entry Price:"):
+            try:
+                entry_price = float(line.replace("Entry Price:", "").strip())
+            except ValueError:
+                entry_price = 0.0
+        elif line.startswith("Stop Loss:"):
+            sl_str = line.replace("Stop Loss:", "").strip()
+            try:
+                stop_loss = float(sl_str)
+            except ValueError:
+                stop_loss = sl_str
+        elif line.startswith("Take Profit:"):
+            tp_str = line.replace("Take Profit:", "").strip()
+            try:
+                take_profit = float(tp_str)
+            except ValueError:
+                take_profit = tp_str
+        elif line.startswith("EP Retest:"):
+            e_retest = line.replace("EP Retest:", "").strip().lower() in ['true', 'yes', '1', 'si', 'sì']
+    return {'limit_order': limit_order, 'token_name': token_name, 'bought_token_amount': bought_token_amount,
+            'balance': balance, 'entry_price': entry_price, 'stop_loss': stop_loss, 'take_profit': take_profit,
+            'e_retest': e_retest, 'side': side}
+
+
+def load_signal_corpus(corpus_path=None, logs_dir="logs", eliz_messages=50):
+    """
+    Testi dei segnali: un file con i messaggi separati da una riga vuota, oppure i
+    segnali classici registrati nei log dell'applicazione ("Nuovo messaggio rilevato: ...")
+    più messaggi 'Current Trade' sintetici.
+    """
+    import glob
+    import json
+
+    if corpus_path:
+        with open(corpus_path, 'r', encoding='utf-8') as f:
+            messages = [block.strip() for block in f.read().split('\n\n') if block.strip()]
+        classic = [message for message in messages if "Current Trade" not in message]
+        return classic, [message for message in messages if "Current Trade" in message]
+
+    prefix = "Nuovo messaggio rilevato: "
+    classic = []
+    for path in sorted(glob.glob(os.path.join(logs_dir, "*.json"))):
+        with open(path, 'r', encoding='utf-8') as f:
+            for entry in json.load(f):
+                message = entry.get('message', '')
+                if message.startswith(prefix):
+                    classic.append(message[len(prefix):].removesuffix("..."))
+    eliz = ["\n".join(make_trade_block(index)[1:]) for index in range(eliz_messages)]
+    return classic, eliz
+
+
+def benchmark_signals(corpus_path=None, iterations=200):
+    """
+    Parsing dei segnali: parser originali (startswith/replace per riga, ricerca di Lo/Sh
+    carattere per carattere) vs TradeParser compilato di signal_module, in parse al
+    secondo sul corpus. I campi Eliz estratti devono coincidere con l'originale.
+    """
+    import dataclasses
+    from signal_module import clean_classic_signal, parse_classic_trade, parse_eliz_trade
+
+    classic, eliz = load_signal_corpus(corpus_path)
+    # Le righe classiche arrivano dall'OCR con nome utente e orario davanti
+    raw_classic = [f"Trader Today at 21:49 {message} w/ @Signals" for message in classic]
+    same = all(dataclasses.asdict(parse_eliz_trade(message)) == legacy_parse_eliz_fields(message) for message in eliz)
+
+    def rate(func, messages):
+        ms, _ = time_call(lambda: [func(message) for message in messages], iterations)
+        return len(messages) / ms * 1000
+
+    results = {
+        'eliz': (rate(legacy_parse_eliz_fields, eliz), rate(parse_eliz_trade, eliz)),
+        'clean': (rate(legacy_clean_classic, raw_classic), rate(clean_classic_signal, raw_classic)),
+        'classic': (None, rate(parse_classic_trade, classic)),
+    }
+    print(f"Corpus: {len(eliz)} messaggi Eliz, {len(classic)} segnali classici "
+          f"(campi Eliz {'identici' if same else 'DIVERSI'} all'originale)")
+    for name, (legacy, compiled) in results.items():
+        legacy_text = f"{legacy:10.0f} parse/s" if legacy else f"{'-':>10} (non funzionante)"
+        print(f"{name:>16}: originale {legacy_text}, compilato {compiled:10.0f} parse/s")
+    for message in list(dict.fromkeys(classic))[:3]:
+        print(f"{'':>16}  {message[:40]!r} -> {parse_classic_trade(message)}")
+    results['same'] = same
+    return results
+
+
+def jitter_text(text, edits, rng):
+    """
+    Rilettura OCR simulata: edits caratteri non numerici sostituiti, persi o aggiunti.
+    Le lettere maiuscole (ticker, sigle) restano intatte: una sigla letta diversa è un
+    altro trade per l'indice dei quasi duplicati, come un numero diverso.
+    """
+    chars = list(text)
+    for _ in range(edits):
+        index = rng.randrange(len(chars))
+        if chars[index].isdigit() or chars[index].isupper() or chars[index] in '.:':
+            continue
+        operation = rng.random()
+        if operation < 0.4:
+            chars[index] = rng.choice("abcdefghijklmnopqrstuvwxyz")
+        elif operation < 0.7:
+            del chars[index]
+        elif index == 0 or not chars[index - 1].isupper():
+            chars.insert(index, rng.choice("abc "))
+    return "".join(chars)
+
+
+def benchmark_near_duplicates(history=1000, probes=500, edits=2, max_distance=3):
+    """
+    Quasi duplicati: history trade sintetici notificati, poi riletture con edits
+    caratteri diversi (devono essere riconosciute) e trade nuovi con altri numeri
+    (non devono esserlo), e gli stessi trade con un altro ticker (nemmeno).
+    L'hash MD5 esatto considera nuova ogni rilettura.
+    """
+    import random
+    from dedup_module import NearDuplicateIndex
+
+    rng = random.Random(0)
+    messages = ["\n".join(make_trade_block(index)[1:]) for index in range(history)]
+    index = NearDuplicateIndex(capacity=history)
+    start = time.perf_counter()
+    for message in messages:
+        index.add(message)
+    add_us = (time.perf_counter() - start) * 1e6 / history
+
+    rereads = [jitter_text(messages[rng.randrange(history)], edits, rng) for _ in range(probes)]
+    start = time.perf_counter()
+    found = sum(index.find(message, max_distance) is not None for message in rereads)
+    reread_us = (time.perf_counter() - start) * 1e6 / probes
+    fresh = ["\n".join(make_trade_block(position)[1:]) for position in range(history, history + probes)]
+    start = time.perf_counter()
+    suppressed = sum(index.find(message, max_distance) is not None for message in fresh)
+    fresh_us = (time.perf_counter() - start) * 1e6 / probes
+    # Stesso trade, stessi numeri, altro ticker (ETH -> BTC, il resto -> ETH)
+    swapped = [re.sub(r'Token Name: (\w+)', lambda m: "Token Name: " + ("BTC" if m.group(1) == "ETH" else "ETH"), message)
+               for message in messages[:probes]]
+    swapped_suppressed = sum(index.find(message, max_distance) is not None for message in swapped)
+
+    results = {'add_us': add_us, 'reread_us': reread_us, 'fresh_us': fresh_us,
+               'recall': found / probes, 'suppressed': suppressed, 'swapped_suppressed': swapped_suppressed}
+    print(f"{history} messaggi, inserimento {add_us:.1f} us, distanza massima {max_distance}")
+    print(f"{'riletture':>16}: {found}/{probes} riconosciute ({found / probes * 100:.1f}%, hash esatto 0%), "
+          f"{reread_us:.1f} us/ricerca")
+    print(f"{'trade nuovi':>16}: {suppressed}/{probes} scartati per errore, {fresh_us:.1f} us/ricerca")
+    print(f"{'ticker diverso':>16}: {swapped_suppressed}/{len(swapped)} scartati per errore")
+    print(index.format_stats())
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark della pipeline di monitoraggio")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    ocr_parser = subparsers.add_parser("ocr", help="pytesseract vs libtesseract residente")
+    ocr_parser.add_argument("--image", help="Frame BGR da usare (default: sintetico)")
+    ocr_parser.add_argument("--iterations", type=int, default=20)
+
+    bands_parser = subparsers.add_parser("bands", help="OCR intera area vs OCR incrementale per bande")
+    bands_parser.add_argument("--iterations", type=int, default=5)
+
+    capture_parser = subparsers.add_parser("capture", help="pyautogui vs sessione mss persistente")
+    capture_parser.add_argument("--area", type=int, nargs=4, default=[0, 0, 800, 600],
+                                metavar=("X", "Y", "W", "H"))
+    capture_parser.add_argument("--seconds", type=float, default=3.0)
+
+    preprocess_parser = subparsers.add_parser("preprocess", help="Preprocessing originale vs pipeline preallocata")
+    preprocess_parser.add_argument("--image", help="Frame BGR da usare (default: sintetico)")
+    preprocess_parser.add_argument("--iterations", type=int, default=200)
+
+    binarize_parser = subparsers.add_parser("binarize", help="Accuratezza e latenza OCR: sharpen+invert vs binarizzato")
+    binarize_parser.add_argument("--image", action="append", help="Frame registrato (ripetibile; <immagine>.txt = testo atteso)")
+    binarize_parser.add_argument("--iterations", type=int, default=3)
+
+    templates_parser = subparsers.add_parser("templates", help="Ricerca template originale vs piramide e ultimo match")
+    templates_parser.add_argument("--image", help="Frame BGR con i template (default: test_screenshot_multi.png)")
+    templates_parser.add_argument("--templates", default="templates")
+    templates_parser.add_argument("--iterations", type=int, default=50)
+
+    replay_parser = subparsers.add_parser("replay", help="Scrive una registrazione sintetica per monitor_service --replay")
+    replay_parser.add_argument("path", help="Cartella di destinazione")
+    replay_parser.add_argument("--format", choices=("images", "raw"), default="images")
+    replay_parser.add_argument("--messages", type=int, default=6)
+    replay_parser.add_argument("--repeat", type=int, default=3, help="Frame per ogni stato della chat")
+    replay_parser.add_argument("--fps", type=float, default=2.0)
+
+    record_parser = subparsers.add_parser("record", help="Latenza di submit e throughput del registratore di sessione")
+    record_parser.add_argument("path", help="Cartella delle registrazioni")
+    record_parser.add_argument("--frames", type=int, default=60)
+    record_parser.add_argument("--budget-mb", type=float, default=8.0)
+    record_parser.add_argument("--chunk-mb", type=float, default=2.0)
+
+    pool_parser = subparsers.add_parser("ocrpool", help="OCR di più aree nel thread vs pool di processi")
+    pool_parser.add_argument("--areas", type=int, default=4)
+    pool_parser.add_argument("--workers", type=int, help="Default: 1, 2 e core - 1")
+    pool_parser.add_argument("--iterations", type=int, default=3)
+
+    cache_parser = subparsers.add_parser("ocrcache", help="OCR per bande senza e con cache del testo per contenuto")
+    cache_parser.add_argument("--messages", type=int, default=12)
+    cache_parser.add_argument("--cache-size", type=int, default=1024)
+
+    lines_parser = subparsers.add_parser("lines", help="OCR a blocco (psm 6) vs righe ritagliate (psm 7)")
+    lines_parser.add_argument("--image", action="append", help="Frame registrato con <immagine>.txt (ripetibile)")
+    lines_parser.add_argument("--iterations", type=int, default=3)
+
+    confidence_parser = subparsers.add_parser("confidence", help="OCR solo testo vs testo con box e confidenze")
+    confidence_parser.add_argument("--image", action="append", help="Frame registrato (ripetibile)")
+    confidence_parser.add_argument("--iterations", type=int, default=3)
+    confidence_parser.add_argument("--min-confidence", type=float, help="Default: DEFAULT_MIN_CONFIDENCE")
+
+    glyphs_parser = subparsers.add_parser("glyphs", help="Tesseract vs riconoscimento dei glifi con atlante")
+    glyphs_parser.add_argument("--image", action="append", help="Frame registrato con <immagine>.txt (ripetibile)")
+    glyphs_parser.add_argument("--train", type=int, default=24, help="Trade sintetici per l'atlante")
+    glyphs_parser.add_argument("--iterations", type=int, default=3)
+
+    dedup_parser = subparsers.add_parser("dedup", help="Lista last_messages.json vs DedupStore con journal")
+    dedup_parser.add_argument("--entries", type=int, nargs="+", default=[30, 10000, 1000000])
+    dedup_parser.add_argument("--lookups", type=int, default=10000)
+
+    segment_parser = subparsers.add_parser("segment", help="Segmentazione completa a ogni frame vs MessageSegmenter")
+    segment_parser.add_argument("--visible", type=int, nargs="+", default=[20, 100, 500])
+    segment_parser.add_argument("--frames", type=int, default=300)
+
+    signals_parser = subparsers.add_parser("signals", help="Parser dei segnali originali vs TradeParser compilato")
+    signals_parser.add_argument("--corpus", help="File con i messaggi separati da una riga vuota (default: log e sintetici)")
+    signals_parser.add_argument("--iterations", type=int, default=200)
+
+    near_parser = subparsers.add_parser("neardup", help="Riletture OCR riconosciute dall'indice dei quasi duplicati")
+    near_parser.add_argument("--history", type=int, default=1000)
+    near_parser.add_argument("--edits", type=int, default=2, help="Caratteri diversi per rilettura")
+    near_parser.add_argument("--max-distance", type=int, default=3)
+
+    keywords_parser = subparsers.add_parser("keywords", help="any() per parola chiave vs KeywordMatcher compilato")
+    keywords_parser.add_argument("--keywords", type=int, nargs="+", default=[3, 100, 1000])
+    keywords_parser.add_argument("--lines", type=int, default=2000)
+
+    args = parser.parse_args()
+    if args.command == "ocr":
+        benchmark_ocr(args.image, args.iterations)
+    elif args.command == "bands":
+        benchmark_bands(args.iterations)
+    elif args.command == "capture":
+        benchmark_capture(tuple(args.area), args.seconds)
+    elif args.command == "preprocess":
+        benchmark_preprocessing(args.image, args.iterations)
+    elif args.command == "binarize":
+        benchmark_binarization(args.image, args.iterations)
+    elif args.command == "templates":
+        benchmark_templates(args.image, args.templates, args.iterations)
+    elif args.command == "replay":
+        make_replay(args.path, args.messages, args.repeat, args.format, args.fps)
+    elif args.command == "record":
+        benchmark_recorder(args.path, args.frames, args.budget_mb, args.chunk_mb)
+    elif args.command == "ocrpool":
+        benchmark_ocr_pool(args.areas, args.workers, args.iterations)
+    elif args.command == "lines":
+        benchmark_lines(args.image, args.iterations)
+    elif args.command == "confidence":
+        benchmark_confidence(args.image, args.iterations, args.min_confidence)
+    elif args.command == "ocrcache":
+        benchmark_ocr_cache(args.messages, cache_size=args.cache_size)
+    elif args.command == "glyphs":
+        benchmark_glyphs(args.image, args.train, iterations=args.iterations)
+    elif args.command == "dedup":
+        benchmark_dedup(args.entries, args.lookups)
+    elif args.command == "keywords":
+        benchmark_keywords(tuple(args.keywords), args.lines)
+    elif args.command == "segment":
+        benchmark_segmenter(tuple(args.visible), args.frames)
+    elif args.command == "signals":
+        benchmark_signals(args.corpus, args.iterations)
+    elif args.command == "neardup":
+        benchmark_near_duplicates(args.history, edits=args.edits, max_distance=args.max_distance)
+
+
+if __name__ == "__main__":
+    main()
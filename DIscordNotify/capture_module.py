@@ -0,0 +1,45 @@
+import threading
+import mss
+import numpy as np
+
+class MssCapture:
+    """
+    Sessione mss persistente: il collegamento al display resta aperto per tutta
+    la durata del monitor e ogni grab restituisce una vista numpy BGRA sul buffer
+    catturato, senza passare da PIL e senza conversioni di colore.
+    mss non è thread-safe, quindi ogni thread ha la sua istanza.
+    """
+    finished = False  # La cattura dal vivo non termina (vedi ReplaySource in source_module)
+
+    def __init__(self):
+        self._local = threading.local()
+        self._sessions = []
+        self._lock = threading.Lock()
+
+    def _session(self):
+        """Istanza mss del thread corrente, creata al primo uso"""
+        sct = getattr(self._local, 'sct', None)
+        if sct is None:
+            sct = mss.mss()
+            self._local.sct = sct
+            with self._lock:
+                self._sessions.append(sct)
+        return sct
+
+    def grab(self, area):
+        """Cattura l'area (x, y, larghezza, altezza) e restituisce un array BGRA (altezza, larghezza, 4)"""
+        x, y, w, h = area
+        sct_img = self._session().grab({"left": x, "top": y, "width": w, "height": h})
+        # Vista sul bytearray di mss: nessuna copia
+        return np.frombuffer(sct_img.raw, dtype=np.uint8).reshape(sct_img.height, sct_img.width, 4)
+
+    def close(self):
+        """Chiude tutte le sessioni mss aperte"""
+        with self._lock:
+            for sct in self._sessions:
+                try:
+                    sct.close()
+                except Exception:
+                    pass
+            self._sessions = []
+        self._local = threading.local()
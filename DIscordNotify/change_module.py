@@ -0,0 +1,121 @@
+import cv2
+import numpy as np
+
+class FrameChangeDetector:
+    """
+    Rileva cambiamenti sul frame grezzo (prima del preprocessing) confrontando
+    pixel per pixel la scala di grigi con l'ultimo frame elaborato.
+    Un blocco block_size x block_size conta come cambiato se almeno min_changed_pixels
+    pixel superano la tolleranza: basta un carattere modificato (138.10 -> 138.70),
+    mentre il rumore isolato di antialiasing resta sotto soglia e non fa ripartire l'OCR.
+    """
+    def __init__(self, sensitivity=5, block_size=16, min_changed_blocks=1, min_changed_pixels=3):
+        self.block_size = block_size
+        self.min_changed_blocks = min_changed_blocks
+        self.min_changed_pixels = min_changed_pixels
+        self.reference = None
+        self.last_changed_blocks = 0
+        self.set_sensitivity(sensitivity)
+
+    def set_sensitivity(self, sensitivity):
+        """Sensibilità in %: differenza minima (su 255) perché un pixel conti come cambiato"""
+        self.sensitivity = max(0.0, float(sensitivity))
+        self.tolerance = self.sensitivity * 255 / 100
+
+    def signature(self, frame):
+        """Firma del frame: scala di grigi a piena risoluzione"""
+        if frame.ndim == 3:
+            code = cv2.COLOR_BGRA2GRAY if frame.shape[2] == 4 else cv2.COLOR_BGR2GRAY
+            return cv2.cvtColor(frame, code)
+        return frame.copy()
+
+    def grid(self, signature):
+        """Righe e colonne di blocchi che coprono la firma (l'ultimo blocco può essere parziale)"""
+        h, w = signature.shape
+        return -(-h // self.block_size), -(-w // self.block_size)
+
+    def changed_blocks(self, signature):
+        """Numero di blocchi con almeno min_changed_pixels pixel oltre la tolleranza"""
+        mask = (cv2.absdiff(signature, self.reference) > self.tolerance).astype(np.uint16)
+        h, w = mask.shape
+        size = self.block_size
+        rows, cols = self.grid(mask)
+        # Padding a multipli del blocco: i pixel sul bordo finiscono nell'ultimo blocco
+        padded = np.zeros((rows * size, cols * size), dtype=np.uint16)
+        padded[:h, :w] = mask
+        counts = padded.reshape(rows, size, cols, size).sum(axis=(1, 3))
+        return int(np.count_nonzero(counts >= self.min_changed_pixels))
+
+    def has_changed(self, frame):
+        """True se il frame differisce dall'ultimo frame accettato oltre la tolleranza"""
+        signature = self.signature(frame)
+        if self.reference is None or self.reference.shape != signature.shape:
+            self.reference = signature
+            rows, cols = self.grid(signature)
+            self.last_changed_blocks = rows * cols
+            return True
+
+        changed = self.changed_blocks(signature)
+        self.last_changed_blocks = changed
+        if changed >= max(1, self.min_changed_blocks):
+            # Il riferimento avanza solo sui frame accettati: le derive lente si accumulano
+            self.reference = signature
+            return True
+        return False
+
+    def reset(self):
+        """Dimentica il riferimento: il prossimo frame sarà considerato cambiato"""
+        self.reference = None
+
+class ScrollEstimator:
+    """
+    Stima lo scorrimento verticale tra due frame grezzi con firme per riga:
+    ogni riga con contenuto ha un hash, le righe uguali nei due frame votano per
+    lo spostamento che le allinea e vince lo spostamento più votato. Una riga
+    modificata o la striscia appena comparsa non falsano la stima.
+    """
+    def __init__(self, min_overlap=0.5):
+        self.min_overlap = min_overlap
+        self._weights = {}
+
+    def _row_weights(self, width):
+        """Pesi casuali fissi per larghezza, usati per l'hash delle righe"""
+        if width not in self._weights:
+            rng = np.random.default_rng(width)
+            self._weights[width] = rng.integers(1, 2**63, size=width, dtype=np.uint64)
+        return self._weights[width]
+
+    def row_signature(self, gray):
+        """Hash per riga e maschera delle righe con contenuto (le righe uniformi votano per ogni spostamento)"""
+        hashes = gray.astype(np.uint64) @ self._row_weights(gray.shape[1])
+        informative = gray.min(axis=1) != gray.max(axis=1)
+        return hashes, informative
+
+    def estimate(self, previous, current):
+        """
+        Restituisce lo spostamento dy tale che current[y] == previous[y + dy]
+        (dy > 0: il contenuto è salito, come all'arrivo di un nuovo messaggio),
+        oppure None se nessuno spostamento spiega il nuovo frame.
+        """
+        if previous is None or previous[0].shape != current[0].shape:
+            return None
+        prev_hashes, prev_informative = previous
+        hashes, informative = current
+
+        rows_by_hash = {}
+        for y in np.flatnonzero(prev_informative):
+            rows_by_hash.setdefault(int(prev_hashes[y]), []).append(int(y))
+
+        votes = {}
+        for y in np.flatnonzero(informative):
+            for prev_y in rows_by_hash.get(int(hashes[y]), ()):
+                shift = prev_y - int(y)
+                votes[shift] = votes.get(shift, 0) + 1
+        if not votes:
+            return None
+
+        # A parità di voti vince lo spostamento più piccolo
+        best_shift = max(votes, key=lambda d: (votes[d], -abs(d)))
+        if votes[best_shift] < self.min_overlap * np.count_nonzero(informative):
+            return None
+        return best_shift
@@ -0,0 +1,505 @@
+import json
+import os
+import re
+import struct
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+
+JOURNAL_MAGIC = b"DDJ1"
+# digest MD5 del messaggio, istante dell'inserimento (epoch)
+JOURNAL_RECORD = struct.Struct('<16sd')
+# Lo stesso record visto come tre int64: due metà del digest e bit dell'istante
+RECORD_WORDS = 3
+DIGEST_WORDS = struct.Struct('<qq')
+# Ricerche nel journal ricordate (i messaggi sullo schermo vengono cercati a ogni frame)
+BASE_LOOKUP_CACHE = 4096
+LEGACY_FILE = 'last_messages.json'
+DEFAULT_JOURNAL = 'last_messages.journal'
+# Testi dei messaggi notificati per i quasi duplicati: all'avvio le chiavi vengono ricalcolate
+# dal testo, così normalizzazione e fasce possono cambiare senza invalidare il journal
+DEFAULT_NEAR_JOURNAL = 'last_messages.near'
+DEDUP_SECTION_PREFIX = "dedup:"
+
+# Quasi duplicati: scambi tipici dell'OCR ricondotti allo stesso carattere prima del confronto
+OCR_CONFUSABLES = str.maketrans({'O': '0', 'o': '0', 'I': '1', 'l': '1', '|': '1'})
+EDITED_MARK = re.compile(r'\(edited\)', re.IGNORECASE)
+# Numeri interi (anche con O al posto di 0 o l al posto di 1) non attaccati a una parola
+NUMBER = re.compile(r'(?<![A-Za-z0-9|])[0-9OoIl|]*[0-9][0-9OoIl|.,:]*(?![A-Za-z0-9.,:|])')
+# Ticker e sigle tutte maiuscole (ETH, BTC, SL): come i numeri devono coincidere
+SYMBOL = re.compile(r'(?<![A-Za-z0-9|])[A-Z][A-Z0-9|]*[A-Z0-9](?![A-Za-z0-9|])')
+# 8 fasce da 8 bit: un messaggio a poche modifiche ne condivide quasi sempre una con l'originale
+SIMHASH_BANDS = 8
+SIMHASH_BAND_BITS = 8
+# 0 = solo hash esatto: i quasi duplicati vanno attivati con near_distance in [dedup]
+DEFAULT_NEAR_DISTANCE = 0
+# Al più una modifica ogni 16 caratteri del testo normalizzato: un messaggio corto tollera meno
+NEAR_CHARS_PER_EDIT = 16
+
+def to_digest(message_hash):
+    """Digest binario (16 byte) da un hash MD5 esadecimale o già binario"""
+    return message_hash if isinstance(message_hash, bytes) else bytes.fromhex(message_hash)
+
+class DedupStore:
+    """
+    Hash dei messaggi già notificati, con capacità massima e scadenza, persistiti in
+    un journal binario a sola aggiunta: ogni messaggio costa un record da 24 byte in
+    coda al file, senza riscrivere nulla.
+
+    Le voci lette dal journal restano un array numpy nell'ordine del file, con un
+    indice ordinato sul digest (apertura senza creare un oggetto Python per voce); le
+    voci aggiunte durante l'esecuzione stanno in un OrderedDict. Le più vecchie escono
+    dalla testa: prima l'array (avanza un indice), poi l'OrderedDict. Quando i record
+    del journal superano compact_ratio volte le voci vive il file viene riscritto con
+    le sole voci vive e diventa il nuovo array.
+
+    Un record troncato in coda (chiusura improvvisa) viene ignorato. Senza path
+    l'insieme resta solo in memoria (dry-run, analizzatori delle singole aree).
+    """
+    def __init__(self, path=None, capacity=100000, ttl=0, compact_ratio=2.0, min_compact_records=1024,
+                 legacy_path=LEGACY_FILE):
+        self.path = path
+        self.capacity = capacity
+        self.ttl = ttl  # Secondi, 0 = nessuna scadenza
+        self.compact_ratio = compact_ratio
+        self.min_compact_records = min_compact_records
+        self._lock = threading.RLock()  # add() compatta tenendo il lock
+        self._recent = OrderedDict()  # digest -> istante; toglie la voce più vecchia in O(1), un dict no
+        self._set_base(np.empty((0, RECORD_WORDS), dtype='<i8'))
+        self._journal = None
+        self._journal_records = 0
+        self.compactions = 0
+        self.evicted = 0
+        if path:
+            self._open(legacy_path)
+
+    def _set_base(self, records):
+        """Voci (n, 3) int64 nell'ordine del journal e indice ordinato sulla prima metà del digest"""
+        self._base = records
+        self._base_times = records[:, 2].view('<f8')
+        self._base_start = 0  # Le voci prima di questa sono uscite (capacità o scadenza)
+        self._base_order = np.argsort(np.ascontiguousarray(records[:, 0]))
+        self._base_keys = records[self._base_order, 0]
+        self._base_low = records[self._base_order, 1]
+        self._base_lookups = {}  # digest -> (indice dell'ultimo record, istante), -1 se assente
+
+    def _open(self, legacy_path):
+        """Carica il journal (o importa la vecchia lista JSON) e lo apre in aggiunta"""
+        valid = False
+        if os.path.exists(self.path):
+            valid = self._load()
+        elif legacy_path and os.path.exists(legacy_path):
+            self._import_legacy(legacy_path)
+        self._evict_base(time.time())
+        self._evict(time.time())
+        if not valid or self._needs_compaction():
+            self.compact()
+        else:
+            self._journal = open(self.path, 'ab')
+
+    def _load(self):
+        """Voci dal journal esistente, False se il file non è un journal"""
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        if data[:len(JOURNAL_MAGIC)] != JOURNAL_MAGIC:
+            print(f"Journal dei messaggi non valido, ricreato: {self.path}")
+            return False
+        count = (len(data) - len(JOURNAL_MAGIC)) // JOURNAL_RECORD.size
+        self._set_base(np.frombuffer(data, dtype='<i8', count=count * RECORD_WORDS,
+                                     offset=len(JOURNAL_MAGIC)).reshape(count, RECORD_WORDS))
+        self._journal_records = count
+        return True
+
+    def _import_legacy(self, legacy_path):
+        try:
+            with open(legacy_path, 'r', encoding='utf-8') as f:
+                hashes = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Errore nel caricamento dei messaggi: {e}")
+            return
+        now = time.time()
+        for message_hash in hashes:
+            self._recent[to_digest(message_hash)] = now
+        print(f"{len(hashes)} messaggi importati da {legacy_path} in {self.path}")
+
+    def _needs_compaction(self):
+        return self._journal_records >= max(self.min_compact_records, self.compact_ratio * len(self))
+
+    def _evict_base(self, now):
+        """All'apertura: salta in blocco le voci del journal oltre la capacità o scadute"""
+        start = max(0, len(self._base) + len(self._recent) - self.capacity)
+        if self.ttl:
+            fresh = np.flatnonzero(self._base_times[start:] >= now - self.ttl)
+            start = start + int(fresh[0]) if fresh.size else len(self._base)
+        self.evicted += min(start, len(self._base))
+        self._base_start = min(start, len(self._base))
+
+    def _evict(self, now):
+        """Toglie dalla testa (voci più vecchie) le scadute e quelle oltre la capacità"""
+        expiry = now - self.ttl if self.ttl else None
+        while len(self):
+            if self._base_start < len(self._base):
+                timestamp = self._base_times[self._base_start]
+            else:
+                timestamp = self._recent[next(iter(self._recent))]
+            if len(self) <= self.capacity and (expiry is None or timestamp >= expiry):
+                break
+            if self._base_start < len(self._base):
+                self._base_start += 1
+            else:
+                self._recent.popitem(last=False)
+            self.evicted += 1
+
+    def _base_timestamp(self, digest):
+        """Istante di un digest tra le voci vive del journal, None se assente"""
+        # Il journal caricato non cambia fino alla compattazione: basta ricontrollare l'indice
+        # rispetto alle voci uscite
+        lookup = self._base_lookups.get(digest)
+        if lookup is None:
+            if len(self._base_lookups) >= BASE_LOOKUP_CACHE:
+                self._base_lookups.clear()
+            lookup = self._base_lookups[digest] = self._base_search(digest)
+        latest, timestamp = lookup
+        return timestamp if latest >= self._base_start else None
+
+    def _base_search(self, digest):
+        """(indice dell'ultimo record del digest nel journal, istante), (-1, None) se assente"""
+        high, low = DIGEST_WORDS.unpack(digest)
+        keys = self._base_keys
+        index = int(keys.searchsorted(high))
+        latest = -1  # Un digest reinserito compare più volte: vale l'ultimo record
+        while index < len(keys) and keys[index] == high:
+            if self._base_low[index] == low:
+                latest = max(latest, int(self._base_order[index]))
+            index += 1
+        return (latest, float(self._base_times[latest])) if latest >= 0 else (-1, None)
+
+    def __contains__(self, message_hash):
+        digest = to_digest(message_hash)
+        with self._lock:
+            timestamp = self._recent.get(digest)
+            if timestamp is None:
+                timestamp = self._base_timestamp(digest)
+        return timestamp is not None and (not self.ttl or time.time() - timestamp <= self.ttl)
+
+    def __len__(self):
+        return len(self._base) - self._base_start + len(self._recent)
+
+    def add(self, message_hash):
+        """Registra un messaggio notificato (hash esadecimale o digest) e lo scrive nel journal"""
+        digest = to_digest(message_hash)
+        now = time.time()
+        with self._lock:
+            self._recent[digest] = now
+            self._recent.move_to_end(digest)
+            self._evict(now)
+            if self._journal:
+                self._journal.write(JOURNAL_RECORD.pack(digest, now))
+                self._journal.flush()
+                self._journal_records += 1
+                if self._needs_compaction():
+                    self.compact()
+
+    def compact(self):
+        """Riscrive il journal con le sole voci vive (file temporaneo sostituito atomicamente)"""
+        if not self.path:
+            return
+        with self._lock:
+            if self._journal:
+                self._journal.close()
+            recent = np.frombuffer(b"".join(JOURNAL_RECORD.pack(digest, timestamp)
+                                            for digest, timestamp in self._recent.items()), dtype='<i8')
+            records = np.concatenate((self._base[self._base_start:], recent.reshape(-1, RECORD_WORDS)))
+            # Un digest presente più volte (reinserito dopo la scadenza) tiene solo l'ultimo record
+            keys = np.ascontiguousarray(records[::-1, :2]).view([('high', '<i8'), ('low', '<i8')]).ravel()
+            _, last = np.unique(keys, return_index=True)
+            records = records[np.sort(len(records) - 1 - last)]
+
+            temp_path = self.path + ".tmp"
+            with open(temp_path, 'wb') as f:
+                f.write(JOURNAL_MAGIC)
+                f.write(records.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.path)
+            self._set_base(records)
+            self._recent.clear()
+            self._journal = open(self.path, 'ab')
+            self._journal_records = len(records)
+            self.compactions += 1
+
+    def close(self):
+        with self._lock:
+            if self._journal:
+                self._journal.close()
+                self._journal = None
+
+    def stats(self):
+        return {'entries': len(self), 'journal_records': self._journal_records,
+                'compactions': self.compactions, 'evicted': self.evicted}
+
+    def format_stats(self):
+        s = self.stats()
+        return (f"dedup: {s['entries']} messaggi, journal {s['journal_records']} record, "
+                f"{s['compactions']} compattazioni, {s['evicted']} scaduti o oltre capacità")
+
+def dedup_store_from_config(section=None):
+    """DedupStore dalla sezione [dedup] di config.ini (senza sezione: valori di default)"""
+    if section is None:
+        return DedupStore(DEFAULT_JOURNAL)
+    return DedupStore(
+        path=section.get('path', DEFAULT_JOURNAL),
+        capacity=section.getint('capacity', 100000),
+        ttl=section.getfloat('ttl_hours', 0) * 3600,
+        compact_ratio=section.getfloat('compact_ratio', 2.0)
+    )
+
+def normalize_message(message):
+    """Testo confrontabile tra due letture: senza '(edited)', spazi e maiuscole, con 0/O e 1/l/I unificati"""
+    return "".join(EDITED_MARK.sub('', message).translate(OCR_CONFUSABLES).lower().split())
+
+def message_numbers(message):
+    """Numeri del messaggio (con gli scambi O/0 e l/1 corretti): due quasi duplicati devono averli uguali"""
+    return tuple(number.translate(OCR_CONFUSABLES).strip('.,:') for number in NUMBER.findall(message))
+
+def message_symbols(message):
+    """Sigle maiuscole del messaggio (ticker, SL/TP) con O/0 e I/l/1 unificati: un ticker diverso è un altro trade"""
+    return tuple(SYMBOL.findall(message.translate(OCR_CONFUSABLES)))
+
+def splitmix64(values):
+    """Mescolamento di splitmix64 su un array uint64 (l'aritmetica modulo 2**64 di numpy fa da troncamento)"""
+    with np.errstate(over='ignore'):
+        values = values + np.uint64(0x9E3779B97F4A7C15)
+        values = (values ^ (values >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        values = (values ^ (values >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return values ^ (values >> np.uint64(31))
+
+def simhash(text):
+    """
+    Simhash a 64 bit sui trigrammi di caratteri: testi simili hanno pochi bit diversi.
+    Ogni trigramma (tre code point da 21 bit) passa dal mescolamento di splitmix64 e non
+    da hash(), così la firma è la stessa in ogni processo.
+    """
+    codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+    if len(codes) < 3:
+        codes = np.concatenate([codes, np.zeros(3 - len(codes), dtype=np.uint64)])
+    grams = (codes[:-2] << np.uint64(42)) | (codes[1:-1] << np.uint64(21)) | codes[2:]
+    hashes = splitmix64(grams).view(np.uint8).reshape(-1, 8)
+    bits = np.unpackbits(hashes, axis=1, bitorder='little').sum(axis=0) * 2 > len(grams)
+    return int.from_bytes(np.packbits(bits, bitorder='little').tobytes(), 'little')
+
+def within_distance(a, b, max_distance):
+    """True se la distanza di edit tra a e b è al massimo max_distance (programmazione dinamica sulla diagonale)"""
+    if abs(len(a) - len(b)) > max_distance:
+        return False
+    if a == b:
+        return True
+    # Prefisso e suffisso comuni non cambiano la distanza: resta solo il tratto riletto diversamente
+    prefix = 0
+    while prefix < min(len(a), len(b)) and a[prefix] == b[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < min(len(a), len(b)) - prefix and a[-1 - suffix] == b[-1 - suffix]:
+        suffix += 1
+    a, b = a[prefix:len(a) - suffix], b[prefix:len(b) - suffix]
+    limit = max_distance + 1
+    previous = [column if column <= max_distance else limit for column in range(len(b) + 1)]
+    for row in range(1, len(a) + 1):
+        current = [limit] * (len(b) + 1)
+        current[0] = row if row <= max_distance else limit
+        first, last = max(1, row - max_distance), min(len(b), row + max_distance)
+        char = a[row - 1]
+        for column in range(first, last + 1):  # Confronti espliciti: min() per cella costa il doppio
+            value = previous[column - 1] + (char != b[column - 1])
+            if current[column - 1] < value:
+                value = current[column - 1] + 1
+            if previous[column] < value:
+                value = previous[column] + 1
+            current[column] = value
+        if min(current[first - 1:last + 1]) > max_distance:
+            return False
+        previous = current
+    return previous[-1] <= max_distance
+
+class NearDuplicateIndex:
+    """
+    Ultimi messaggi notificati, per riconoscere una rilettura con qualche carattere
+    diverso (0 letto O, uno spazio perso, '(edited)' aggiunto) che ha un hash MD5 nuovo.
+
+    Ogni messaggio è indicizzato per (numeri, sigle, fascia del simhash): i candidati
+    sono i messaggi con gli stessi numeri, le stesse sigle maiuscole e almeno una fascia
+    di 8 bit uguale, verificati con la distanza di edit sul testo normalizzato. Numeri e
+    ticker devono coincidere: 'Long BTC' dopo 'Long ETH' o un importo diverso non sono
+    mai un duplicato. La distanza tollerata scala con la lunghezza del testo
+    (NEAR_CHARS_PER_EDIT caratteri per modifica, fino a max_distance).
+
+    Con path i testi sono anche aggiunti a un journal (una riga JSON [istante, testo]
+    per messaggio) e all'avvio l'indice viene ricostruito dagli ultimi capacity, così
+    una rilettura dopo un riavvio non viene notificata di nuovo. Come per DedupStore,
+    una riga troncata in coda viene ignorata, le voci più vecchie di ttl secondi non
+    valgono più e il file viene riscritto quando le righe superano compact_ratio
+    volte la capacità.
+    """
+    def __init__(self, capacity=1000, path=None, ttl=0, compact_ratio=2.0):
+        self.capacity = capacity
+        self.path = path
+        self.ttl = ttl  # Secondi, 0 = nessuna scadenza
+        self.compact_ratio = compact_ratio
+        self._lock = threading.RLock()  # add() compatta tenendo il lock
+        self._entries = OrderedDict()  # id -> (messaggio, testo normalizzato, chiavi delle fasce, istante)
+        self._buckets = {}  # chiave della fascia -> id dei messaggi
+        self._next_id = 0
+        self._journal = None
+        self._journal_records = 0
+        self.lookups = 0
+        self.candidates = 0
+        self.matches = 0
+        if path:
+            self._open()
+
+    def _open(self):
+        """Ricostruisce l'indice dal journal dei testi e lo apre in aggiunta"""
+        records = []
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8', errors='replace') as f:
+                for line in f:
+                    try:
+                        timestamp, message = json.loads(line)
+                    except (ValueError, TypeError):
+                        continue  # Riga troncata da una chiusura improvvisa
+                    records.append((float(timestamp), message))
+        expiry = time.time() - self.ttl if self.ttl else None
+        for timestamp, message in records[-self.capacity:]:
+            if expiry is None or timestamp >= expiry:
+                self._insert(message, timestamp)
+        self._journal_records = len(records)
+        if self._journal_records > self.compact_ratio * self.capacity:
+            self.compact()
+        else:
+            self._journal = open(self.path, 'a', encoding='utf-8')
+
+    def _insert(self, message, timestamp):
+        """Indicizza un messaggio ed esclude i più vecchi oltre la capacità (con il lock)"""
+        normalized, keys = self._keys(message)
+        entry_id = self._next_id
+        self._next_id += 1
+        self._entries[entry_id] = (message, normalized, keys, timestamp)
+        for key in keys:
+            self._buckets.setdefault(key, set()).add(entry_id)
+        while len(self._entries) > self.capacity:
+            old_id, (_, _, old_keys, _) = self._entries.popitem(last=False)
+            for key in old_keys:
+                bucket = self._buckets[key]
+                bucket.discard(old_id)
+                if not bucket:
+                    del self._buckets[key]
+
+    def _keys(self, message):
+        normalized = normalize_message(message)
+        exact = (message_numbers(message), message_symbols(message))
+        signature = simhash(normalized)
+        mask = (1 << SIMHASH_BAND_BITS) - 1
+        keys = [(exact, band, (signature >> (band * SIMHASH_BAND_BITS)) & mask) for band in range(SIMHASH_BANDS)]
+        return normalized, keys
+
+    def add(self, message):
+        """Registra un messaggio notificato (e lo scrive nel journal dei testi)"""
+        now = time.time()
+        with self._lock:
+            self._insert(message, now)
+            if self._journal:
+                self._journal.write(json.dumps([now, message], ensure_ascii=False) + "\n")
+                self._journal.flush()
+                self._journal_records += 1
+                if self._journal_records > self.compact_ratio * self.capacity:
+                    self.compact()
+
+    def find(self, message, max_distance):
+        """Messaggio registrato entro max_distance modifiche (stessi numeri e ticker), None se non c'è"""
+        normalized, keys = self._keys(message)
+        max_distance = min(max_distance, len(normalized) // NEAR_CHARS_PER_EDIT)
+        expiry = time.time() - self.ttl if self.ttl else None
+        with self._lock:
+            self.lookups += 1
+            if max_distance <= 0:
+                return None  # Troppo corto per tollerare modifiche: decide solo l'hash esatto
+            candidates = set()
+            for key in keys:
+                candidates.update(self._buckets.get(key, ()))
+            self.candidates += len(candidates)
+            for entry_id in sorted(candidates, reverse=True):  # Prima i più recenti
+                stored, stored_normalized, _, timestamp = self._entries[entry_id]
+                if expiry is not None and timestamp < expiry:
+                    break  # Scaduto, come i più vecchi che seguono
+                if within_distance(normalized, stored_normalized, max_distance):
+                    self.matches += 1
+                    return stored
+        return None
+
+    def compact(self):
+        """Riscrive il journal dei testi con le sole voci nell'indice (file temporaneo sostituito atomicamente)"""
+        if not self.path:
+            return
+        with self._lock:
+            if self._journal:
+                self._journal.close()
+            temp_path = self.path + ".tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                for message, _, _, timestamp in self._entries.values():
+                    f.write(json.dumps([timestamp, message], ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.path)
+            self._journal = open(self.path, 'a', encoding='utf-8')
+            self._journal_records = len(self._entries)
+
+    def close(self):
+        with self._lock:
+            if self._journal:
+                self._journal.close()
+                self._journal = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        return {'entries': len(self._entries), 'lookups': self.lookups, 'candidates': self.candidates,
+                'matches': self.matches}
+
+    def format_stats(self):
+        s = self.stats()
+        return (f"quasi duplicati: {s['matches']} su {s['lookups']} ricerche, "
+                f"{s['candidates']} candidati verificati, {s['entries']} messaggi")
+
+def near_index_from_config(section=None, persistent=True):
+    """
+    NearDuplicateIndex dalla sezione [dedup] di config.ini (senza sezione: valori di
+    default); con persistent=False resta solo in memoria (dry-run).
+    """
+    if section is None:
+        return NearDuplicateIndex(path=DEFAULT_NEAR_JOURNAL if persistent else None)
+    return NearDuplicateIndex(
+        capacity=section.getint('near_capacity', 1000),
+        path=section.get('near_path', DEFAULT_NEAR_JOURNAL) if persistent else None,
+        ttl=section.getfloat('ttl_hours', 0) * 3600,
+        compact_ratio=section.getfloat('compact_ratio', 2.0)
+    )
+
+def load_near_distances(config):
+    """
+    Distanza di edit tollerata per filtro sorgente: near_distance di [dedup] vale per
+    tutti, ogni sezione [dedup:filtro] (es. [dedup:@Eliz Challenge]) la ridefinisce.
+    La chiave '' è il valore di default; 0 disattiva i quasi duplicati.
+    """
+    default = config.getint('dedup', 'near_distance', fallback=DEFAULT_NEAR_DISTANCE)
+    distances = {'': default}
+    for section_name in config.sections():
+        if section_name.startswith(DEDUP_SECTION_PREFIX):
+            source_filter = section_name[len(DEDUP_SECTION_PREFIX):].strip()
+            distances[source_filter] = config[section_name].getint('near_distance', default)
+    return distances
+
+def select_near_distance(distances, source_filter):
+    """Distanza tollerata per un filtro sorgente (default se non ha una sezione propria)"""
+    return distances.get(source_filter, distances[''])
@@ -0,0 +1,308 @@
+import argparse
+import configparser
+from collections import Counter
+import cv2
+import numpy as np
+from band_module import BandOCR, estimate_background, find_text_bands
+from ocr_module import OCRLine, OCRProcessor, OCRResult, OCRWord
+from preprocessing_module import to_gray
+
+INK_THRESHOLD = 48  # Come ink_mask: distanza minima dallo sfondo di un pixel di testo
+CORE_RATIO = 0.45  # Il nucleo dei glifi: l'alone dell'antialiasing unisce i caratteri vicini
+BASELINE_RATIO = 0.25  # Righe con almeno questa frazione dell'inchiostro massimo stanno sopra la linea di base
+CLUSTER_SIMILARITY = 0.95  # Campioni almeno così simili sono la stessa variante di un glifo
+FALLBACK_PSM = 7
+FALLBACK_PADDING = 10
+
+def ink_intensity(gray):
+    """Distanza dallo sfondo di ogni pixel, in [0, 1]"""
+    return np.abs(gray.astype(np.float32) - estimate_background(gray)) / 255.0
+
+def segment_glyphs(core):
+    """
+    Glifi di una riga dal nucleo dell'inchiostro: componenti connesse, con punti e
+    accenti (separati in verticale e sovrapposti in orizzontale) uniti al carattere.
+    Restituisce per ogni pixel l'indice del glifo (-1 fuori), esteso di un pixel
+    sull'alone, e i glifi in ordine di x come [x_inizio, x_fine, y_inizio, y_fine, componenti].
+    """
+    count, labels, stats, _ = cv2.connectedComponentsWithStats(core.view(np.uint8), connectivity=8)
+    stats = stats.tolist()  # Interi Python: il ciclo sulle componenti resta leggero
+    glyphs = []
+    for index in sorted(range(1, count), key=lambda index: stats[index][0]):
+        x, y, w, h, area = stats[index]
+        if area < 2:
+            continue  # Rumore di un pixel
+        for glyph in glyphs[-2:]:
+            overlap = min(glyph[1], x + w) - max(glyph[0], x)
+            if overlap >= 0.5 * min(w, glyph[1] - glyph[0]) and (y >= glyph[3] or y + h <= glyph[2]):
+                glyph[:4] = min(glyph[0], x), max(glyph[1], x + w), min(glyph[2], y), max(glyph[3], y + h)
+                glyph[4].append(index)
+                break
+        else:
+            glyphs.append([x, x + w, y, y + h, [index]])
+    lookup = np.full(count, -1, np.intp)
+    for index, glyph in enumerate(glyphs):
+        lookup[glyph[4]] = index
+    owners = lookup[cv2.dilate(labels.astype(np.float32), np.ones((3, 3), np.uint8)).astype(np.intp)]
+    return owners, glyphs
+
+def find_baseline(core):
+    """Linea di base di una riga: ultima riga con inchiostro pieno (sotto restano solo i discendenti)"""
+    profile = core.sum(axis=1)
+    return int(np.flatnonzero(profile >= BASELINE_RATIO * profile.max())[-1])
+
+def line_glyphs(intensity, y0, y1):
+    """Banda, mappa dei glifi, glifi e linea di base della banda di righe [y0, y1)"""
+    band = intensity[y0:y1]
+    core = band > CORE_RATIO * band.max()
+    owners, glyphs = segment_glyphs(core)
+    return band, owners, glyphs, find_baseline(core) if glyphs else 0
+
+def glyph_patches(band, owners, glyphs, baseline, ascent, height, width):
+    """
+    Un'immagine (altezza, larghezza) per glifo, tutte insieme con indicizzazione
+    vettoriale: la linea di base va sulla riga ascent - 1 e il baricentro
+    dell'inchiostro sulla colonna centrale, così lo spostamento di un pixel dovuto
+    all'antialiasing non cambia il confronto. I pixel degli altri glifi sono azzerati.
+    """
+    padded = np.zeros((band.shape[0] + 2 * height, band.shape[1] + 2 * width), np.float32)
+    padded[height:-height, width:-width] = band
+    padded_owners = np.full(padded.shape, -1, np.intp)
+    padded_owners[height:-height, width:-width] = owners
+    rows = (baseline - ascent + 1 + height + np.arange(height))[None, :, None]
+    own = np.arange(len(glyphs))[:, None, None]
+    offsets = np.arange(width)
+
+    def gather(left):
+        columns = (left[:, None] + offsets)[:, None, :]
+        return padded[rows, columns] * (padded_owners[rows, columns] == own)
+
+    left = np.array([glyph[0] for glyph in glyphs]) - 1 + width
+    columns = gather(left).sum(axis=1)
+    totals = columns.sum(axis=1)
+    centers = np.divide(columns @ offsets, totals, out=np.full(len(glyphs), width / 2), where=totals > 0)
+    return gather(left - np.round(width / 2 - centers).astype(np.intp))
+
+def dice(glyphs, templates, template_norms=None):
+    """
+    Similarità di Dice (0-1) tra ogni riga di glyphs (n, pixel) e ogni riga di
+    templates (k, pixel): tutte le coppie con un solo prodotto matriciale.
+    """
+    if template_norms is None:
+        template_norms = (templates ** 2).sum(axis=1)
+    return 2 * (glyphs @ templates.T) / ((glyphs ** 2).sum(axis=1)[:, None] + template_norms[None, :] + 1e-6)
+
+class GlyphAtlas:
+    """
+    Un modello per carattere del font dell'interfaccia, nella risoluzione delle
+    immagini preprocessate: ascent righe sopra la linea di base, descent sotto,
+    glifo centrato sul baricentro. space_gap è la distanza minima in colonne tra due parole.
+    """
+    def __init__(self, labels, templates, ascent, descent, space_gap):
+        self.labels = list(labels)
+        self.templates = np.asarray(templates, dtype=np.float32)
+        self.ascent = int(ascent)
+        self.descent = int(descent)
+        self.space_gap = float(space_gap)
+        self._flat = self.templates.reshape(len(self.labels), -1)
+        self._norms = (self._flat ** 2).sum(axis=1)
+
+    @property
+    def height(self):
+        return self.ascent + self.descent
+
+    @property
+    def width(self):
+        return self.templates.shape[2]
+
+    def similarity(self, glyphs):
+        """Similarità di ogni glifo (n, altezza, larghezza) con ogni modello"""
+        return dice(glyphs.reshape(len(glyphs), -1), self._flat, self._norms)
+
+    def match(self, glyphs):
+        """Carattere (indice in labels) e confidenza (0-100) di ogni glifo"""
+        similarity = self.similarity(glyphs)
+        best = similarity.argmax(axis=1)
+        return best, similarity[np.arange(len(glyphs)), best] * 100
+
+    def save(self, path):
+        np.savez_compressed(path, labels=np.array(self.labels), templates=self.templates,
+                            metrics=np.array([self.ascent, self.descent, self.space_gap]))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            ascent, descent, space_gap = data['metrics']
+            return cls(data['labels'].tolist(), data['templates'], ascent, descent, space_gap)
+
+class GlyphReader:
+    """
+    OCR per confronto di glifi: l'area di Discord usa sempre lo stesso font alla
+    stessa dimensione, quindi ogni carattere si riconosce confrontandolo con i
+    modelli di un GlyphAtlas invece di passare dal riconoscitore LSTM di Tesseract.
+
+    Le righe vengono separate col profilo di proiezione e i caratteri dalle colonne
+    vuote. Una riga in cui un glifo resta sotto min_confidence (caratteri attaccati,
+    simboli che non sono nell'atlante) viene riletta con il fallback (Tesseract, psm 7).
+    """
+    def __init__(self, atlas, min_confidence=90):
+        self.atlas = atlas
+        self.min_confidence = min_confidence
+        self.lines_read = 0
+        self.fallback_lines = 0
+
+    def read_line(self, intensity, y0, y1):
+        """OCRLine della banda di righe [y0, y1), None se non contiene glifi"""
+        band, owners, glyphs, baseline = line_glyphs(intensity, y0, y1)
+        if not glyphs:
+            return None
+        atlas = self.atlas
+        patches = glyph_patches(band, owners, glyphs, baseline, atlas.ascent, atlas.height, atlas.width)
+        best, confidence = atlas.match(patches)
+        starts = np.array([glyph[0] for glyph in glyphs])
+        ends = np.array([glyph[1] for glyph in glyphs])
+        confidence[ends - starts + 4 > atlas.width] = 0  # Più largo di ogni modello: caratteri attaccati
+
+        words = []
+        breaks = np.flatnonzero(starts[1:] - ends[:-1] >= atlas.space_gap) + 1
+        for first, last in zip(np.concatenate(([0], breaks)), np.concatenate((breaks, [len(glyphs)]))):
+            text = "".join(atlas.labels[index] for index in best[first:last])
+            words.append(OCRWord(text, float(starts[first]), float(y0), float(ends[last - 1] - starts[first]),
+                                 float(y1 - y0), float(confidence[first:last].min())))
+        return OCRLine(tuple(words))
+
+    def recognize(self, image, fallback=None):
+        """
+        OCRResult di un'immagine preprocessata. fallback(tile, psm) -> OCRResult rilegge
+        le righe incerte; senza fallback restano i caratteri più simili.
+        """
+        image = np.asarray(image)
+        gray = to_gray(image)
+        intensity = ink_intensity(gray)
+        ink = intensity > INK_THRESHOLD / 255.0
+        lines = []
+        for y0, y1 in find_text_bands(gray, ink=ink):
+            line = self.read_line(intensity, y0, y1)
+            if line is None:
+                continue
+            self.lines_read += 1
+            if fallback is not None and min(word.confidence for word in line.words) < self.min_confidence:
+                self.fallback_lines += 1
+                tile = cv2.copyMakeBorder(np.ascontiguousarray(gray[y0:y1]), FALLBACK_PADDING, FALLBACK_PADDING,
+                                          FALLBACK_PADDING, FALLBACK_PADDING, cv2.BORDER_CONSTANT,
+                                          value=estimate_background(gray))
+                result = fallback(tile, FALLBACK_PSM)
+                lines.extend(result.transformed(dx=-FALLBACK_PADDING, dy=y0 - FALLBACK_PADDING).lines)
+            else:
+                lines.append(line)
+        return OCRResult("\n".join(line.text for line in lines), tuple(lines))
+
+    def stats(self):
+        return {'lines': self.lines_read, 'fallback_lines': self.fallback_lines}
+
+    def format_stats(self):
+        return f"Glifi: {self.lines_read} righe lette, {self.fallback_lines} rilette da Tesseract"
+
+def build_atlas(frames, preprocess, ocr_processor=None, min_word_confidence=60, padding=10):
+    """
+    GlyphAtlas da frame grezzi di esempio. Ogni banda viene preparata come in BandOCR
+    (stesso preprocessing, quindi stessa risoluzione dei glifi da riconoscere) e letta
+    da Tesseract: le parole con confidenza almeno min_word_confidence in cui il numero
+    di glifi separati coincide con quello dei caratteri diventano campioni etichettati.
+    Ogni modello è la mediana di un gruppo di campioni quasi identici, con l'etichetta
+    più frequente nel gruppo.
+    """
+    ocr = ocr_processor or OCRProcessor(cache_size=0)
+    band_ocr = BandOCR(ocr, preprocess, padding)
+    lines = []  # (banda, mappa dei glifi, glifi, linea di base, [(carattere, indice del glifo)])
+    word_gaps, space_gaps = [], []
+    for frame in frames:
+        for band_y0, band_y1 in find_text_bands(to_gray(frame)):
+            tile = band_ocr.prepare_band(frame[band_y0:band_y1])
+            result = ocr.recognize_tesseract(tile)
+            gray = to_gray(tile)
+            intensity = ink_intensity(gray)
+            ink = intensity > INK_THRESHOLD / 255.0
+            for y0, y1 in find_text_bands(gray, ink=ink):
+                band, owners, glyphs, baseline = line_glyphs(intensity, y0, y1)
+                if not glyphs:
+                    continue
+                centers = np.array([(glyph[0] + glyph[1]) / 2 for glyph in glyphs])
+                labelled = []
+                for line in result.lines:
+                    previous_end = None  # Fine della parola precedente sulla stessa riga
+                    for word in line.words:
+                        if not y0 <= word.y + word.height / 2 < y1:
+                            continue
+                        inside = np.flatnonzero((centers >= word.x) & (centers < word.x + word.width))
+                        if word.confidence < min_word_confidence or len(inside) != len(word.text):
+                            previous_end = None
+                            continue
+                        if previous_end is not None:
+                            space_gaps.append(glyphs[inside[0]][0] - previous_end)
+                        previous_end = glyphs[inside[-1]][1]
+                        word_gaps.extend(glyphs[b][0] - glyphs[a][1] for a, b in zip(inside[:-1], inside[1:]))
+                        labelled.extend(zip(word.text, inside))
+                if labelled:
+                    lines.append((band, owners, glyphs, baseline, labelled))
+    if not lines:
+        raise ValueError("Nessun glifo etichettato nei frame di esempio")
+
+    sample_glyphs = [(glyphs[index], baseline) for _, _, glyphs, baseline, labelled in lines for _, index in labelled]
+    ascent = max(baseline - glyph[2] + 1 for glyph, baseline in sample_glyphs)
+    descent = max(max(glyph[3] - 1 - baseline for glyph, baseline in sample_glyphs), 0)
+    width = max(glyph[1] - glyph[0] for glyph, _ in sample_glyphs) + 4  # Alone e margine per il centraggio
+    chars = [char for _, _, _, _, labelled in lines for char, _ in labelled]
+    canvases = np.concatenate([
+        glyph_patches(band, owners, glyphs, baseline, ascent, ascent + descent, width)[[index for _, index in labelled]]
+        for band, owners, glyphs, baseline, labelled in lines])
+
+    # Campioni raggruppati per forma, non per etichetta: lo stesso carattere può avere più
+    # varianti (fase dell'antialiasing) e una parola letta male da Tesseract viene messa in
+    # minoranza dai campioni identici etichettati bene
+    flat = canvases.reshape(len(chars), -1)
+    clusters = []
+    leaders = flat[:0]
+    for index in range(len(chars)):
+        similarity = dice(flat[index:index + 1], leaders)[0]
+        if similarity.size and similarity.max() >= CLUSTER_SIMILARITY:
+            clusters[int(similarity.argmax())].append(index)
+        else:
+            clusters.append([index])
+            leaders = flat[[members[0] for members in clusters]]
+    labels = [Counter(chars[index] for index in members).most_common(1)[0][0] for members in clusters]
+    templates = np.stack([np.median(canvases[members], axis=0) for members in clusters])
+
+    # Soglia dello spazio a metà tra le distanze più grandi tra lettere e la distanza tipica tra parole
+    if word_gaps and space_gaps:
+        space_gap = (np.percentile(word_gaps, 95) + np.median(space_gaps)) / 2
+    else:
+        space_gap = ascent * 0.3
+    return GlyphAtlas(labels, templates, ascent, descent, space_gap)
+
+def main():
+    from preprocessing_module import load_profiles, select_profile
+
+    parser = argparse.ArgumentParser(description="Crea l'atlante dei glifi per il backend OCR 'glyph'")
+    parser.add_argument("atlas", help="File .npz di destinazione (glyph_atlas di [ocr])")
+    parser.add_argument("frames", nargs="+", help="Frame grezzi di esempio dell'area (PNG)")
+    parser.add_argument("--config", default="config.ini", help="config.ini con i profili di preprocessing")
+    parser.add_argument("--profile", default="default", help="Profilo di preprocessing dell'area")
+    args = parser.parse_args()
+
+    config = configparser.ConfigParser()
+    config.read(args.config, encoding='utf-8')
+    preprocess = select_profile(load_profiles(config), args.profile)
+    frames = []
+    for path in args.frames:
+        frame = cv2.imread(path)
+        if frame is None:
+            raise FileNotFoundError(f"Immagine non trovata: {path}")
+        frames.append(frame)
+    atlas = build_atlas(frames, preprocess)
+    atlas.save(args.atlas)
+    print(f"{len(atlas.labels)} caratteri ({''.join(atlas.labels)}), glifi {atlas.height}x{atlas.width} px, "
+          f"spazio da {atlas.space_gap:.1f} px: {args.atlas}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import re
+from dataclasses import dataclass
+
+@dataclass(frozen=True)
+class KeywordMatch:
+    """Parola chiave trovata e sua posizione (caratteri) nella riga cercata"""
+    keyword: str
+    start: int
+    end: int
+
+def parse_keywords(keywords):
+    """Lista di parole chiave da una stringa separata da virgole (vuote scartate)"""
+    return [kw.strip() for kw in keywords.split(',') if kw.strip()]
+
+def trie_pattern(keywords):
+    """
+    Espressione regolare equivalente all'alternanza delle parole chiave, fattorizzata
+    come un trie: i prefissi comuni vengono confrontati una volta sola e in ogni
+    posizione del testo si segue un solo ramo, qualunque sia il numero di parole.
+    """
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def pattern(node):
+        branches = [re.escape(char) + pattern(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        # Parola chiave che termina qui: il resto del ramo è facoltativo (greedy, vince la più lunga)
+        return '(?:' + body + ')?' if '' in node else body
+
+    return pattern(trie)
+
+class KeywordMatcher:
+    """
+    Insieme di parole chiave compilato una volta in un'unica espressione regolare:
+    ogni riga viene scorsa una sola volta dal motore C di re invece di una volta
+    per parola chiave. Le parole sono confrontate così come sono con la riga in
+    minuscolo, come il vecchio controllo any(kw in line.lower() ...).
+    """
+    def __init__(self, keywords=""):
+        self.keywords = parse_keywords(keywords) if isinstance(keywords, str) else [kw for kw in keywords if kw]
+        self.pattern = re.compile(trie_pattern(self.keywords)) if self.keywords else None
+
+    def __bool__(self):
+        return self.pattern is not None
+
+    def __len__(self):
+        return len(self.keywords)
+
+    def search(self, line):
+        """Prima parola chiave (la più lunga a parità di posizione) nella riga, o None"""
+        if self.pattern is None:
+            return None
+        match = self.pattern.search(line.lower())
+        return KeywordMatch(match.group(), match.start(), match.end()) if match else None
+
+    def find_all(self, text):
+        """Tutte le parole chiave nel testo, senza sovrapposizioni, in ordine di posizione"""
+        if self.pattern is None:
+            return []
+        return [KeywordMatch(match.group(), match.start(), match.end())
+                for match in self.pattern.finditer(text.lower())]
@@ -9,7 +9,17 @@ import os
 # Import dei moduli
 from screenshot_module import AreaSelector, ScreenshotManager
 from ocr_module import OCRProcessor
-from analysis_module import MessageAnalyzer
+from ocrpool_module import ocr_pool_from_config
+from area_module import MonitorArea, MultiAreaCapture, AreaState, load_areas
+from pipeline_module import Pipeline
+from scheduler_module import AdaptiveScheduler
+from source_module import source_from_config
+from recorder_module import recorder_from_config
+from postmortem_module import area_layout, ring_buffer_from_config
+from preprocessing_module import load_profiles, select_profile
+from analysis_module import DEFAULT_MIN_CONFIDENCE, MessageAnalyzer
+from dedup_module import (DEFAULT_NEAR_DISTANCE, DedupStore, NearDuplicateIndex, dedup_store_from_config,
+                          load_near_distances, near_index_from_config, select_near_distance)
 from notification_module import TelegramNotifier
 from logging_module import LogManager, LogWidget
 from logicheapiexchange import BybitTrader
@@ -21,12 +31,30 @@ try:
 except ImportError:
     pass
 
+CLOSE_TIMEOUT = 20  # Secondi concessi alla pipeline per svuotarsi alla chiusura
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+
 class AdvancedDiscordMonitor:
     def __init__(self):
         # Inizializza i moduli
-        self.screenshot_manager = ScreenshotManager()
+        self.screenshot_manager = ScreenshotManager(templates_dir=TEMPLATES_DIR if os.path.isdir(TEMPLATES_DIR) else None)
         self.ocr_processor = OCRProcessor()
-        self.message_analyzer = MessageAnalyzer()
+        self.use_band_ocr = True
+        self.line_mode = False
+        self.min_confidence = DEFAULT_MIN_CONFIDENCE
+        self.ocr_pool = None
+        self.extra_areas = []
+        self.preprocessing_profiles = load_profiles(configparser.ConfigParser())
+        self.main_preprocessing = "default"
+        self.stats_interval = 60
+        self.idle_interval = 10.0
+        self.interval_decay = 1.5
+        self.recorder_config = None
+        self.postmortem_config = None
+        self.frame_buffer = None
+        self.pipeline = None
+        self.near_distances = {'': DEFAULT_NEAR_DISTANCE}
+        self.message_analyzer = MessageAnalyzer()  # Storico e quasi duplicati impostati da load_config
         self.telegram_notifier = TelegramNotifier()
         self.bybit_trader = BybitTrader() # BybitTrader ora carica le credenziali da config.ini al suo interno
 
@@ -339,71 +367,192 @@ class AdvancedDiscordMonitor:
         self.message_analyzer.set_keywords_eliz(self.keywords_entry_eliz.get())
         self.message_analyzer.set_source_filter(self.source_filter.get())
 
-        # Carica messaggi precedenti
-        self.message_analyzer.last_messages = self.message_analyzer.load_last_messages()
+    def build_areas(self):
+        """Area principale (GUI) più le aree aggiuntive [area:nome] di config.ini"""
+        x, y, w, h = self.screenshot_manager.monitor_area
+        main_area = MonitorArea(
+            name="main", x=x, y=y, width=w, height=h,
+            source_filter=self.source_filter.get(),
+            keywords=self.keywords_entry.get(),
+            keywords_eliz=self.keywords_entry_eliz.get(),
+            preprocessing=self.main_preprocessing
+        )
+        return [main_area] + self.extra_areas
 
     def monitor_loop(self):
-        """Loop principale di monitoraggio"""
-        last_hash = None
-        first_message_dropped = False
+        """
+        Loop principale di monitoraggio: cattura, OCR, analisi e invio girano su
+        stadi separati collegati da code limitate, così una chiamata lenta a
+        Telegram o Bybit non ritarda la cattura successiva.
+        """
+        areas = self.build_areas()
+        area_capture = MultiAreaCapture(self.screenshot_manager.capture, areas)
+        sensitivity = int(self.sensitivity_var.get())
+        area_states = [
+            AreaState(area, self.ocr_pool or self.ocr_processor,
+                      select_profile(self.preprocessing_profiles, area.preprocessing),
+                      sensitivity=sensitivity, use_band_ocr=self.use_band_ocr, line_mode=self.line_mode,
+                      min_confidence=self.min_confidence, near_duplicates=self.message_analyzer.near_duplicates,
+                      near_distance=select_near_distance(self.near_distances, area.source_filter))
+            for area in areas
+        ]
+        self.in_flight_messages = set()
+        self.in_flight_lock = threading.Lock()
+        self.scheduler = AdaptiveScheduler(
+            active_interval=float(self.interval_var.get()),
+            idle_interval=self.idle_interval,
+            decay=self.interval_decay
+        )
 
+        # Ultimi frame in memoria, scritti su disco su errore ([postmortem] in config.ini)
+        self.frame_buffer = ring_buffer_from_config(self.postmortem_config) if self.postmortem_config else None
+        if self.frame_buffer:
+            self.frame_buffer.allocate(area_layout(area_states))
+
+        # Registrazione opzionale dei frame cambiati ([recorder] in config.ini)
+        recorder = recorder_from_config(self.recorder_config) if self.recorder_config else None
+        if recorder:
+            recorder.start(origin=area_capture.union[:2])
+            self.log_manager.info(f"Registrazione della sessione in {recorder.session_path}")
+
+        def capture_areas():
+            self.scheduler.set_active_interval(float(self.interval_var.get()))
+            # Una sola cattura per tick, ogni area è una vista sul frame
+            frames = area_capture.grab()
+            if recorder:
+                recorder.submit(area_capture.last_frame)
+            self.log_manager.debug("Screen taken")
+            return frames
+
+        self.pipeline = pipeline = Pipeline(on_error=self.on_pipeline_error)
+        pipeline.add_queue("frames", maxsize=2, drop_oldest=True)
+        pipeline.add_queue("texts", maxsize=8)
+        pipeline.add_queue("messages", maxsize=50)
+        pipeline.add_source("capture", capture_areas, "frames", self.scheduler)
+        pipeline.add_stage("ocr", lambda frames: self.recognize_areas(area_states, frames), "frames", "texts")
+        pipeline.add_stage("analysis", self.analyze_area_text, "texts", "messages")
+        pipeline.add_stage("dispatch", self.dispatch_message, "messages")
+        pipeline.start()
+
+        last_stats = time.monotonic()
         while self.is_monitoring:
-            try:
-                # Cattura e preprocessa screenshot
-                preprocessed_image = self.screenshot_manager.capture_and_preprocess()
-                self.log_manager.debug("Screen taken")
-
-                # Calcola hash per rilevare cambiamenti
-                img_hash = self.ocr_processor.calculate_image_hash(preprocessed_image)
-
-                if last_hash != img_hash:
-                    last_hash = img_hash
-
-                    # OCR
-                    text = self.ocr_processor.extract_text(preprocessed_image)
-                    if "spot.png" not in self.screenshot_manager.find_templates_in_image(preprocessed_image):
-                        if text.strip():
-                            # Analizza messaggi
-                            new_messages = self.message_analyzer.analyze_messages(text, self.message_analyzer.last_messages)
-
-                            for message in new_messages:
-                                if first_message_dropped:
-                                    self.log_manager.info(f"Nuovo messaggio rilevato: {message[:50]}...")
-
-                                    # Invia notifica Telegram
-                                    result = self.telegram_notifier.send_discord_notification(message)
-                                    if result['success']:
-                                        self.log_manager.success("Notifica Telegram inviata")
-                                        message_hash = hashlib.md5(message.encode()).hexdigest()
-                                        self.message_analyzer.update_last_messages(message_hash)
-                                        self.message_analyzer.save_last_messages(self.message_analyzer.last_messages)
-    
-                                    else:
-                                        self.log_manager.error(f"Errore Telegram: {result['error']}")
-
-                                    # Logica di Trading
-                                    if "Current Trade" in message:
-                                        if trade_data := self.message_analyzer.extract_trade_data(message):
-                                            self.log_manager.info(f"Trade rilevato: {trade_data.token_name} - Entry: {trade_data.entry_price} - Side: {trade_data.side}")
-                                            self.execute_trade(trade_data)
-
-                                    # Aggiorna storico messaggi
-                                    
-
-                                else:
-                                    first_message_dropped = True
-                                    continue
-                    else:
-                        self.log_manager.error(f"SPOT trade rilevato e saltato")
-                        
-
-                # Aspetta prima del prossimo controllo
-                interval = int(self.interval_var.get())
-                time.sleep(interval)
+            time.sleep(0.5)
+            if time.monotonic() - last_stats >= self.stats_interval:
+                last_stats = time.monotonic()
+                self.log_manager.debug(f"Pipeline: {pipeline.format_stats()}")
+                if self.ocr_processor.cache:
+                    self.log_manager.debug(self.ocr_processor.cache.format_stats())
+
+        # I frame e i messaggi già accodati vengono completati prima di fermare gli stadi
+        pipeline.drain()
+        if not pipeline.stop():
+            self.log_manager.warning("Alcuni stadi della pipeline sono ancora attivi")
+        self.log_manager.info(f"Pipeline: {pipeline.format_stats()}")
+        if self.ocr_processor.cache:
+            self.log_manager.info(self.ocr_processor.cache.format_stats())
+        glyph_reader = self.ocr_processor.get_glyph_reader()
+        if glyph_reader and glyph_reader.lines_read:  # Con [ocr] workers i glifi vengono letti nei worker
+            self.log_manager.info(glyph_reader.format_stats())
+        self.log_manager.info(self.message_analyzer.last_messages.format_stats())
+        self.log_manager.info(self.message_analyzer.near_duplicates.format_stats())
+        for state in area_states:
+            self.log_manager.info(f"[{state.area.name}] {state.message_analyzer.format_segmentation_stats()}")
+        if recorder:
+            recorder.stop()
+            self.log_manager.info(f"Recorder: {recorder.format_stats()}")
+
+    def on_pipeline_error(self, stage, error):
+        """Errore in uno stadio: log e dump degli ultimi frame"""
+        self.log_manager.error(f"Errore nel monitoraggio ({stage}): {error}")
+        if self.frame_buffer:
+            self.dump_frames(f"errore_{stage}", str(error), error)
+
+    def dump_frames(self, reason, details=None, error=None):
+        """Scrive su disco gli ultimi frame del buffer post-mortem"""
+        try:
+            folder = self.frame_buffer.dump(reason, details, error)
+            if folder:
+                self.log_manager.warning(f"Ultimi frame salvati in {folder}")
+        except Exception as e:
+            self.log_manager.error(f"Errore nel salvataggio dei frame post-mortem: {e}")
+
+    def recognize_areas(self, area_states, frames):
+        """Stadio OCR: rilevamento cambiamenti, OCR e controllo template per ogni area"""
+        slot = None
+        jobs = []
+        for state in area_states:
+            frame = frames[state.area.name]
+
+            # Rileva cambiamenti sul frame grezzo, prima del preprocessing
+            if not state.change_detector.has_changed(frame):
+                continue
+            self.scheduler.notify_activity()
+
+            # Controllo template sul frame grezzo, prima dell'OCR
+            if "spot.png" in self.screenshot_manager.find_templates_in_image(frame, context=state.area.name):
+                self.log_manager.error(f"[{state.area.name}] SPOT trade rilevato e saltato")
+                continue
+
+            # OCR, con copia del frame grezzo nel buffer post-mortem.
+            # Tutte le aree cambiate vengono inviate prima di attendere i risultati
+            if self.frame_buffer:
+                if slot is None:
+                    slot = self.frame_buffer.next_slot()
+                self.frame_buffer.store_raw(slot, state.area.name, frame)
+            jobs.append((state, state.submit(frame)))
+
+        for state, job in jobs:
+            result = state.collect(job)
+            if self.frame_buffer and self.frame_buffer.store_result(slot, state.area.name, result.text):
+                self.dump_frames(f"ocr_vuoto_{state.area.name}",
+                                 f"{self.frame_buffer.empty_streak} letture OCR vuote consecutive")
+            if result.text.strip():
+                yield state, result
+
+    def analyze_area_text(self, item):
+        """Stadio analisi: estrae i nuovi messaggi dal testo (OCRResult) di un'area"""
+        state, result = item
+
+        # Lo storico dei messaggi è condiviso tra le aree; le righe poco affidabili sono scartate
+        new_messages = state.message_analyzer.analyze_messages(result, self.message_analyzer.last_messages)
+
+        for message in new_messages:
+            if not state.first_message_dropped:
+                state.first_message_dropped = True
+                continue
+
+            # Un messaggio già in attesa di invio non viene accodato di nuovo
+            message_hash = hashlib.md5(message.encode()).hexdigest()
+            with self.in_flight_lock:
+                if message_hash in self.in_flight_messages:
+                    continue
+                self.in_flight_messages.add(message_hash)
+            yield state, message, message_hash
+
+    def dispatch_message(self, item):
+        """Stadio invio: notifica Telegram e logica di trading per un messaggio"""
+        state, message, message_hash = item
+        try:
+            self.log_manager.info(f"[{state.area.name}] Nuovo messaggio rilevato: {message[:50]}...")
 
-            except Exception as e:
-                self.log_manager.error(f"Errore nel monitoraggio: {e}")
-                time.sleep(5)
+            # Invia notifica Telegram
+            result = self.telegram_notifier.send_discord_notification(message)
+            if result['success']:
+                self.log_manager.success("Notifica Telegram inviata")
+                self.message_analyzer.update_last_messages(message_hash, message)
+            else:
+                self.log_manager.error(f"Errore Telegram: {result['error']}")
+
+            # Logica di Trading
+            if "Current Trade" in message:
+                if trade_data := state.message_analyzer.extract_trade_data(message):
+                    if self.frame_buffer and not (trade_data.token_name and trade_data.side):
+                        self.dump_frames("parsing", message)
+                    self.log_manager.info(f"Trade rilevato: {trade_data.token_name} - Entry: {trade_data.entry_price} - Side: {trade_data.side}")
+                    self.execute_trade(trade_data)
+        finally:
+            with self.in_flight_lock:
+                self.in_flight_messages.discard(message_hash)
 
     def execute_trade(self, trade_data):
         """Esegue il trade rilevato"""
@@ -486,6 +635,8 @@ class AdvancedDiscordMonitor:
                 'width': str(w),
                 'height': str(h)
             }
+            if self.main_preprocessing != "default":
+                config['area']['preprocessing'] = self.main_preprocessing
 
         try:
             with open('config.ini', 'w') as configfile:
@@ -521,30 +672,107 @@ class AdvancedDiscordMonitor:
                     self.keywords_entry_eliz.delete(0, tk.END)
                     self.keywords_entry_eliz.insert(0, config['monitoring'].get('keywords_eliz', 'current trade'))
 
+                # Carica sezione OCR (backend Tesseract)
+                if 'ocr' in config:
+                    self.ocr_processor.set_backend(
+                        config['ocr'].get('backend', 'auto'),
+                        library_path=config['ocr'].get('library_path', ''),
+                        datapath=config['ocr'].get('tessdata', '')
+                    )
+                    self.use_band_ocr = config['ocr'].getboolean('incremental_bands', True)
+                    self.line_mode = config['ocr'].getboolean('line_mode', False)
+                    self.min_confidence = config['ocr'].getfloat('min_confidence', DEFAULT_MIN_CONFIDENCE)
+                    self.ocr_processor.set_glyph_atlas(
+                        config['ocr'].get('glyph_atlas', 'glyph_atlas.npz'),
+                        min_confidence=config['ocr'].getfloat('glyph_min_confidence', 90)
+                    )
+                    self.ocr_processor.set_cache_size(config['ocr'].getint('cache_size', 1024))
+                    if self.ocr_pool:
+                        self.ocr_pool.close()
+                    self.ocr_pool = ocr_pool_from_config(config['ocr'], self.ocr_processor)
+
+                # Carica profili di preprocessing ([preprocessing] e [preprocessing:nome])
+                self.preprocessing_profiles = load_profiles(config)
+                self.screenshot_manager.set_preprocessing(self.preprocessing_profiles['default'])
+
+                # Carica sezione Template (scale per gli zoom di Discord)
+                if 'templates' in config:
+                    scales = [float(scale) for scale in config['templates'].get('scales', '1.0').split(',') if scale.strip()]
+                    self.screenshot_manager.set_template_scales(scales)
+
+                # Carica sezione Source (replay di frame registrati al posto dello schermo)
+                if 'source' in config:
+                    self.screenshot_manager.set_frame_source(source_from_config(config['source']))
+
+                # Carica sezione Recorder (registrazione opzionale della sessione)
+                if 'recorder' in config:
+                    self.recorder_config = config['recorder']
+
+                # Carica sezione Postmortem (ultimi frame salvati su errore)
+                if 'postmortem' in config:
+                    self.postmortem_config = config['postmortem']
+
+                # Carica sezione Scheduler (polling adattivo)
+                if 'scheduler' in config:
+                    self.idle_interval = config['scheduler'].getfloat('idle_interval', 10.0)
+                    self.interval_decay = config['scheduler'].getfloat('decay', 1.5)
+
+                # Carica aree aggiuntive [area:nome]
+                self.extra_areas = load_areas(config, include_main=False)
+                if self.extra_areas:
+                    self.log_manager.info(f"Aree aggiuntive: {', '.join(area.name for area in self.extra_areas)}")
+
                 # Carica sezione Area
                 if 'area' in config:
                     x = int(config['area'].get('x', '0'))
                     y = int(config['area'].get('y', '0'))
                     w = int(config['area'].get('width', '0'))
                     h = int(config['area'].get('height', '0'))
+                    self.main_preprocessing = config['area'].get('preprocessing', 'default')
                     self.screenshot_manager.set_monitor_area((x, y, w, h))
                     self.area_label.config(text=f"Area: {x},{y} - {w}x{h}")
 
                 self.log_manager.info("Configurazione caricata da config.ini")
             else:
                 self.log_manager.info("Nessun file di configurazione trovato. Utilizzo i valori di default.")
+
         except Exception as e:
             self.log_manager.error(f"Errore nel caricamento della configurazione: {e}")
 
+        # Storico persistente dei messaggi notificati e quasi duplicati ([dedup] o valori di default),
+        # impostato anche se il resto della configurazione non è leggibile
+        try:
+            dedup_section = config['dedup'] if 'dedup' in config else None
+            self.message_analyzer.set_dedup_store(dedup_store_from_config(dedup_section))
+            self.message_analyzer.set_near_duplicates(near_index_from_config(dedup_section))
+            self.near_distances = load_near_distances(config)
+        except Exception as e:
+            self.log_manager.error(f"Errore nella configurazione [dedup], storico solo in memoria: {e}")
+            self.message_analyzer.set_dedup_store(DedupStore())
+            self.message_analyzer.set_near_duplicates(NearDuplicateIndex())
+        self.log_manager.info(self.message_analyzer.last_messages.format_stats())
+
     def on_closing(self):
         """Gestisce la chiusura del programma"""
         try:
-            # Salva i messaggi prima di chiudere
-            self.message_analyzer.save_last_messages(self.message_analyzer.last_messages)
-
-            # Ferma il monitoraggio se attivo
+            # Ferma il monitoraggio se attivo e attende che la pipeline sia svuotata e ferma
             if self.is_monitoring:
                 self.stop_monitor()
+            if self.monitor_thread:
+                self.monitor_thread.join(timeout=CLOSE_TIMEOUT)
+
+            # Chiude il journal dei messaggi notificati solo quando nessuno stadio può più scriverci
+            if self.pipeline and self.pipeline.alive():
+                self.log_manager.warning("Pipeline ancora attiva: journal dei messaggi non chiuso")
+            else:
+                self.message_analyzer.last_messages.close()
+                self.message_analyzer.near_duplicates.close()
+
+            # Rilascia il motore OCR residente e la sessione di cattura
+            self.ocr_processor.close()
+            if self.ocr_pool:
+                self.ocr_pool.close()
+            self.screenshot_manager.close()
 
             # Chiudi la finestra
             self.root.destroy()
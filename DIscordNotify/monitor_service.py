@@ -1,19 +1,30 @@
 # monitor_service.py
 
+import argparse
 import configparser
-import cv2
-import numpy as np
 import time
+import threading
 import hashlib
-import mss
 import json
 import os
 import requests
-import pytesseract
 from datetime import datetime
-from dataclasses import dataclass
 import logging
 from logicheapiexchange import BybitTrader
+from ocr_module import OCRProcessor
+from signal_module import parse_eliz_trade
+from analysis_module import DEFAULT_MIN_CONFIDENCE
+from dedup_module import (DedupStore, dedup_store_from_config, load_near_distances, near_index_from_config,
+                          select_near_distance)
+from ocrpool_module import ocr_pool_from_config
+from capture_module import MssCapture
+from source_module import ReplaySource, create_source, source_from_config
+from recorder_module import recorder_from_config
+from postmortem_module import area_layout, ring_buffer_from_config
+from area_module import AreaState, MultiAreaCapture, load_areas
+from pipeline_module import Pipeline
+from preprocessing_module import load_profiles, select_profile
+from scheduler_module import AdaptiveScheduler
 
 # --- Setup Logging ---
 logging.basicConfig(
@@ -25,132 +36,78 @@ logging.basicConfig(
     ]
 )
 
-# --- Data Classes and Parsers (Copied from main.py) ---
-@dataclass
-class eliz_data_trade:
-    limit_order: bool
-    token_name: str
-    bought_token_amount: int
-    balance: int
-    entry_price: float
-    stop_loss: any
-    take_profit: any
-    e_retest: bool
-    side: str # 'Buy' or 'Sell'
-
-def parse_eliz_trade(text: str) -> eliz_data_trade:
-    try:
-        limit_order = False
-        token_name = ""
-        bought_token_amount = 0
-        balance = 0
-        entry_price = 0.0
-        stop_loss = ""
-        take_profit = ""
-        e_retest = False
-        side = ""
-
-        lines = text.strip().split('\n')
-
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-
-            if "long" in line.lower():
-                side = "Buy"
-            elif "short" in line.lower():
-                side = "Sell"
-
-            if line.endswith("LIMIT ORDER"):
-                limit_order = True
-
-            if line.startswith("Token Name:"):
-                token_name = line.replace("Token Name:", "").strip()
-            elif line.startswith("Bought Token Amount:"):
-                try:
-                    bought_token_amount = int(line.replace("Bought Token Amount:", "").strip())
-                except ValueError:
-                    bought_token_amount = 0
-            elif line.startswith("Balance:"):
-                try:
-                    balance = int(line.replace("Balance:", "").strip())
-                except ValueError:
-                    balance = 0
-            elif line.startswith("Entry Price:"):
-                try:
-                    entry_price = float(line.replace("Entry Price:", "").strip())
-                except ValueError:
-                    entry_price = 0.0
-            elif line.startswith("Stop Loss:"):
-                sl_str = line.replace("Stop Loss:", "").strip()
-                try:
-                    stop_loss = float(sl_str)
-                except ValueError:
-                    stop_loss = sl_str
-            elif line.startswith("Take Profit:"):
-                tp_str = line.replace("Take Profit:", "").strip()
-                try:
-                    take_profit = float(tp_str)
-                except ValueError:
-                    take_profit = tp_str
-            elif line.startswith("EP Retest:"):
-                retest_str = line.replace("EP Retest:", "").strip()
-                e_retest = retest_str.lower() in ['true', 'yes', '1', 'si', 'sì']
-
-        return eliz_data_trade(
-            limit_order=limit_order, token_name=token_name,
-            bought_token_amount=bought_token_amount, balance=balance,
-            entry_price=entry_price, stop_loss=stop_loss,
-            take_profit=take_profit, e_retest=e_retest, side=side
-        )
-    except Exception as e:
-        logging.error(f"Errore nel parsing del trade: {e}")
-        return eliz_data_trade(
-            limit_order=False, token_name="", bought_token_amount=0, balance=0,
-            entry_price=0.0, stop_loss="", take_profit="", e_retest=False, side=""
-        )
-
 # --- Core Monitor Class ---
 class HeadlessMonitor:
-    def __init__(self, config):
+    def __init__(self, config, frame_source=None, dry_run=False, collect_messages=False):
         self.config = config
+        self.dry_run = dry_run  # Nessuna notifica né ordine, storico messaggi non persistito
         self.bybit_trader = BybitTrader()
-        self.last_messages = self.load_last_messages()
+        # Schermo dal vivo oppure replay ([source] o frame_source) per benchmark e test offline
+        if frame_source is not None:
+            self.capture = frame_source
+        elif config.has_section('source'):
+            self.capture = source_from_config(config['source'])
+        else:
+            self.capture = MssCapture()
+        # Replay alla massima velocità: nessuna attesa tra i tick e nessun frame scartato
+        self.replay_fast = isinstance(self.capture, ReplaySource) and not self.capture.realtime
+        # Testi dei messaggi inviati solo per il report del replay (--report): dal vivo il
+        # servizio gira per giorni e basta il conteggio
+        self.dispatched_messages = [] if collect_messages else None
+        self.dispatched_count = 0
+        self.replay_summary = None
+        # Registrazione opzionale dei frame cambiati per riprodurre i casi di produzione
+        self.recorder = recorder_from_config(config['recorder']) if config.has_section('recorder') else None
+        # Ultimi frame grezzi e preprocessati in memoria, scritti su disco quando qualcosa va storto
+        self.frame_buffer = ring_buffer_from_config(config['postmortem']) if config.has_section('postmortem') else None
+        self.ocr_processor = OCRProcessor(
+            backend=config.get('ocr', 'backend', fallback='auto'),
+            library_path=config.get('ocr', 'library_path', fallback='') or None,
+            datapath=config.get('ocr', 'tessdata', fallback='') or None,
+            cache_size=config.getint('ocr', 'cache_size', fallback=1024),
+            glyph_atlas=config.get('ocr', 'glyph_atlas', fallback='glyph_atlas.npz'),
+            glyph_min_confidence=config.getfloat('ocr', 'glyph_min_confidence', fallback=90)
+        )
+        # Con [ocr] workers le bande e le aree di un tick vengono lette in parallelo da più processi
+        self.ocr_pool = ocr_pool_from_config(config['ocr'], self.ocr_processor) if config.has_section('ocr') else None
+        self.use_band_ocr = config.getboolean('ocr', 'incremental_bands', fallback=True)
+        self.line_mode = config.getboolean('ocr', 'line_mode', fallback=False)
+        self.min_confidence = config.getfloat('ocr', 'min_confidence', fallback=DEFAULT_MIN_CONFIDENCE)
+        self.preprocessing_profiles = load_profiles(config)
+        # Hash dei messaggi già notificati (journal persistente, solo in memoria in dry-run)
+        if dry_run:
+            self.last_messages = DedupStore()
+        else:
+            self.last_messages = dedup_store_from_config(config['dedup'] if config.has_section('dedup') else None)
+        # Testi degli ultimi messaggi notificati, per le riletture con qualche carattere diverso
+        self.near_duplicates = near_index_from_config(config['dedup'] if config.has_section('dedup') else None,
+                                                      persistent=not dry_run)
+        self.near_distances = load_near_distances(config)
+        self.in_flight_messages = set()
+        self.in_flight_lock = threading.Lock()
         self.is_monitoring = False
-
-        self.telegram_token = config.get('telegram', 'token')
-        self.telegram_chat_id = config.get('telegram', 'chat_id')
-        self.interval = config.getint('monitoring', 'interval', fallback=2)
-        self.source_filter = config.get('monitoring', 'source_filter', fallback='@Eliz Challenge')
-        self.keywords = [kw.strip() for kw in config.get('monitoring', 'keywords', fallback='long,short,@').split(',')]
-        self.keywords_eliz = [kw.strip() for kw in config.get('monitoring', 'keywords_eliz', fallback='current trade').split(',')]
-        
-        self.monitor_area = (
-            config.getint('area', 'x'),
-            config.getint('area', 'y'),
-            config.getint('area', 'width'),
-            config.getint('area', 'height')
+        self.pipeline = None
+        self.area_states = []
+        self.stats_interval = 60
+
+        self.telegram_token = config.get('telegram', 'token', fallback='')
+        self.telegram_chat_id = config.get('telegram', 'chat_id', fallback='')
+        self.interval = 0.0 if self.replay_fast else config.getfloat('monitoring', 'interval', fallback=2)
+        self.scheduler = AdaptiveScheduler(
+            active_interval=self.interval,
+            idle_interval=0.0 if self.replay_fast else config.getfloat('scheduler', 'idle_interval', fallback=10.0),
+            decay=config.getfloat('scheduler', 'decay', fallback=1.5)
         )
+        self.sensitivity = config.getint('monitoring', 'sensitivity', fallback=5)
 
-    def load_last_messages(self):
-        try:
-            if os.path.exists('last_messages.json'):
-                with open('last_messages.json', 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            return []
-        except Exception as e:
-            logging.error(f"Errore caricamento messaggi: {e}")
-            return []
-
-    def save_last_messages(self):
-        try:
-            with open('last_messages.json', 'w', encoding='utf-8') as f:
-                json.dump(self.last_messages, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            logging.error(f"Errore salvataggio messaggi: {e}")
+        # [area] più eventuali [area:nome], catturate con un solo grab per tick
+        self.areas = load_areas(config)
+        self.area_capture = MultiAreaCapture(self.capture, self.areas)
 
     def send_telegram_notification(self, message):
+        if self.dry_run:
+            logging.info("[dry-run] Notifica Telegram non inviata")
+            return
         try:
             url = f"https://api.telegram.org/bot{self.telegram_token}/sendMessage"
             telegram_message = f"🔔 **Nuovo messaggio Discord**\n📱 Rilevato: {datetime.now().strftime('%H:%M:%S')}\n📝 Contenuto:\n{message}"
@@ -163,46 +120,6 @@ class HeadlessMonitor:
         except Exception as e:
             logging.error(f"Errore invio Telegram: {e}")
 
-    def detect_new_messages(self, text, last_messages):
-        new_messages = []
-        for line in text.split('\n'):
-            if any(kw in line.lower() for kw in self.keywords if kw):
-                current_message = self.remove_before_lo_or_sh_ww_simple(line)
-                if current_message:
-                    message_hash = hashlib.md5(current_message.encode()).hexdigest()
-                    if message_hash not in last_messages:
-                        new_messages.append(current_message)
-        return new_messages
-
-    def detect_new_messages_eliz(self, text, last_messages):
-        new_messages = []
-        current_message = []
-        for line in text.split('\n'):
-            line = line.strip()
-            if any(kw in line.lower() for kw in self.keywords_eliz if kw):
-                if current_message:
-                    message_text = '\n'.join(current_message)
-                    if hashlib.md5(message_text.encode()).hexdigest() not in last_messages:
-                        new_messages.append(message_text)
-                current_message = [line]
-            elif not line.startswith("(Edited"):
-                current_message.append(line)
-        if current_message:
-            message_text = '\n'.join(current_message)
-            if hashlib.md5(message_text.encode()).hexdigest() not in last_messages:
-                new_messages.append(message_text)
-        return new_messages
-
-    def remove_before_lo_or_sh_ww_simple(self, text):
-        for i in range(len(text) - 1):
-            if text[i:i+2] in ["Lo", "Sh"]:
-                result = text[i:].replace("w/", "")
-                at_pos = result.find("@")
-                if at_pos != -1:
-                    result = result[:at_pos]
-                return result.strip()
-        return ""
-
     def start(self):
         self.is_monitoring = True
         logging.info("Monitoraggio headless avviato.")
@@ -210,91 +127,230 @@ class HeadlessMonitor:
 
     def stop(self):
         self.is_monitoring = False
+        if self.pipeline:
+            # I frame e i messaggi già accodati vengono completati prima di fermare gli stadi
+            self.pipeline.drain()
+            if not self.pipeline.stop():
+                logging.warning("Alcuni stadi della pipeline sono ancora attivi")
+            logging.info(f"Pipeline: {self.pipeline.format_stats()}")
+        if self.recorder:
+            self.recorder.stop()
+            logging.info(f"Recorder: {self.recorder.format_stats()}")
+        if self.ocr_processor.cache:
+            logging.info(self.ocr_processor.cache.format_stats())
+        glyph_reader = self.ocr_processor.get_glyph_reader()
+        if glyph_reader and glyph_reader.lines_read:  # Con [ocr] workers i glifi vengono letti nei worker
+            logging.info(glyph_reader.format_stats())
+        logging.info(self.last_messages.format_stats())
+        logging.info(self.near_duplicates.format_stats())
+        for state in self.area_states:
+            logging.info(f"[{state.area.name}] {state.message_analyzer.format_segmentation_stats()}")
         logging.info("Monitoraggio headless fermato.")
-        self.save_last_messages()
+        # Il journal viene chiuso solo quando nessuno stadio può più scriverci
+        if not (self.pipeline and self.pipeline.alive()):
+            self.last_messages.close()
+            self.near_duplicates.close()
+        self.ocr_processor.close()
+        if self.ocr_pool:
+            self.ocr_pool.close()
+        self.capture.close()
 
     def monitor_loop(self):
-        last_hash = None
-        first_message_dropped = False
-
-        while self.is_monitoring:
-            try:
-                with mss.mss() as sct:
-                    monitor = {"top": self.monitor_area[1], "left": self.monitor_area[0], "width": self.monitor_area[2], "height": self.monitor_area[3]}
-                    sct_img = sct.grab(monitor)
-                    img_cv = cv2.cvtColor(np.array(sct_img), cv2.COLOR_BGRA2BGR)
-
+        self.area_states = area_states = [
+            AreaState(area, self.ocr_pool or self.ocr_processor,
+                      select_profile(self.preprocessing_profiles, area.preprocessing),
+                      sensitivity=self.sensitivity, use_band_ocr=self.use_band_ocr, line_mode=self.line_mode,
+                      min_confidence=self.min_confidence, near_duplicates=self.near_duplicates,
+                      near_distance=select_near_distance(self.near_distances, area.source_filter))
+            for area in self.areas
+        ]
+        if self.frame_buffer:
+            self.frame_buffer.allocate(area_layout(area_states))
+            logging.info(f"Buffer post-mortem: {self.frame_buffer.capacity} frame, "
+                         f"{self.frame_buffer.nbytes / 1048576:.1f} MB")
+
+        def capture_areas():
+            frames = self.area_capture.grab()
+            if self.recorder:
+                self.recorder.submit(self.area_capture.last_frame)
+            if not self.replay_fast:
                 logging.info("Screen taken")
+            return frames
+
+        # Cattura, OCR, analisi e invio su thread separati collegati da code limitate
+        self.pipeline = Pipeline(on_error=self.on_pipeline_error)
+        self.pipeline.add_queue("frames", maxsize=2, drop_oldest=not self.replay_fast)
+        self.pipeline.add_queue("texts", maxsize=8)
+        self.pipeline.add_queue("messages", maxsize=50)
+        self.pipeline.add_source("capture", capture_areas, "frames", self.scheduler, error_backoff=1)
+        self.pipeline.add_stage("ocr", lambda frames: self.recognize_areas(area_states, frames), "frames", "texts")
+        self.pipeline.add_stage("analysis", self.analyze_area_text, "texts", "messages")
+        self.pipeline.add_stage("dispatch", self.dispatch_message, "messages")
+        if self.recorder:
+            self.recorder.start(origin=self.area_capture.union[:2])
+            logging.info(f"Registrazione della sessione in {self.recorder.session_path}")
+        started_at = time.monotonic()
+        self.pipeline.start()
+
+        last_stats = time.monotonic()
+        while self.is_monitoring:
+            time.sleep(0.05 if self.capture.finished else 0.5)
+            if time.monotonic() - last_stats >= self.stats_interval:
+                last_stats = time.monotonic()
+                logging.info(f"Pipeline: {self.pipeline.format_stats()}")
+                if self.ocr_processor.cache:
+                    logging.info(self.ocr_processor.cache.format_stats())
+                if self.recorder:
+                    logging.info(f"Recorder: {self.recorder.format_stats()}")
+            # Replay terminato: si esce quando l'ultimo frame ha attraversato tutti gli stadi
+            if self.capture.finished and self.pipeline.drained():
+                self.is_monitoring = False
+                self.log_replay_summary(time.monotonic() - started_at)
+
+    def on_pipeline_error(self, stage, error):
+        logging.error(f"Errore nel loop ({stage}): {error}", exc_info=True)
+        if self.frame_buffer:
+            self.dump_frames(f"errore_{stage}", str(error), error)
+
+    def dump_frames(self, reason, details=None, error=None):
+        """Scrive su disco gli ultimi frame del buffer post-mortem"""
+        try:
+            folder = self.frame_buffer.dump(reason, details, error)
+            if folder:
+                logging.warning(f"Ultimi frame salvati in {folder}")
+        except Exception as e:
+            logging.error(f"Errore nel salvataggio dei frame post-mortem: {e}")
+
+    def log_replay_summary(self, elapsed):
+        """Frame elaborati, durata e frame/s sostenuti dal replay"""
+        frames = self.capture.frames_served
+        fps = frames / elapsed if elapsed > 0 else 0.0
+        self.replay_summary = {
+            'frames': frames,
+            'elapsed_s': elapsed,
+            'fps': fps,
+            'message_count': self.dispatched_count,
+            'pipeline': self.pipeline.stats(),
+        }
+        logging.info(f"Replay terminato: {frames} frame in {elapsed:.2f} s ({fps:.1f} frame/s), "
+                     f"{self.dispatched_count} messaggi")
+
+    def recognize_areas(self, area_states, frames):
+        # Tutte le aree cambiate vengono inviate all'OCR prima di attendere i risultati
+        slot = None
+        jobs = []
+        for state in area_states:
+            frame = frames[state.area.name]
+            if not state.change_detector.has_changed(frame):
+                continue
+            self.scheduler.notify_activity()
+
+            if self.frame_buffer:
+                if slot is None:
+                    slot = self.frame_buffer.next_slot()
+                self.frame_buffer.store_raw(slot, state.area.name, frame)
+            jobs.append((state, state.submit(frame)))
+
+        for state, job in jobs:
+            result = state.collect(job)
+            if self.frame_buffer and self.frame_buffer.store_result(slot, state.area.name, result.text):
+                self.dump_frames(f"ocr_vuoto_{state.area.name}",
+                                 f"{self.frame_buffer.empty_streak} letture OCR vuote consecutive")
+            if result.text.strip():
+                yield state, result
+
+    def analyze_area_text(self, item):
+        state, result = item
+        new_messages = state.message_analyzer.analyze_messages(result, self.last_messages)
+
+        for message in new_messages:
+            if not state.first_message_dropped:
+                state.first_message_dropped = True
+                continue
 
-                gray = cv2.cvtColor(img_cv, cv2.COLOR_BGR2GRAY)
-                gray = cv2.resize(gray, None, fx=1.5, fy=1.5, interpolation=cv2.INTER_CUBIC)
-                sharp = cv2.filter2D(gray, -1, np.array([[0, -1, 0], [-1, 5,-1], [0, -1, 0]]))
-                inverted = cv2.bitwise_not(sharp)
-                img_hash = hashlib.md5(inverted.tobytes()).hexdigest()
-
-                if last_hash != img_hash:
-                    last_hash = img_hash
-                    text = pytesseract.image_to_string(inverted, config=r'--oem 3 --psm 6 -l eng')
-
-                    if text.strip():
-                        detector = self.detect_new_messages_eliz if self.source_filter == "@Eliz Challenge" else self.detect_new_messages
-                        new_messages = detector(text, self.last_messages)
-
-                        for message in new_messages:
-                            if not first_message_dropped:
-                                first_message_dropped = True
-                                continue
-
-                            logging.info(f"Nuovo messaggio: {message[:50]}...")
-                            self.send_telegram_notification(message)
-
-                            if "Current Trade" in message:
-                                trade_data = parse_eliz_trade(message)
-                                logging.info(f"Trade rilevato: {trade_data.token_name} - Side: {trade_data.side}")
-                                # Trading logic here...
-                                symbol = trade_data.token_name + "USDT"
-                                qty = str(trade_data.bought_token_amount)
-                                side = trade_data.side
-                                order_type = "Limit" if trade_data.limit_order else "Market"
-                                price = str(trade_data.entry_price) if trade_data.limit_order else None
-                                
-                                order_result = self.bybit_trader.place_order(symbol, side, qty, order_type, price)
-                                if order_result and order_result.get('retCode') == 0:
-                                    logging.info(f"Ordine {order_type} piazzato per {symbol}")
-                                    if order_type == "Market": time.sleep(2)
-                                    
-                                    sl = str(trade_data.stop_loss) if trade_data.stop_loss else None
-                                    tp = str(trade_data.take_profit) if trade_data.take_profit else None
-                                    if sl or tp:
-                                        sl_tp_result = self.bybit_trader.set_stop_loss_take_profit(symbol, sl, tp)
-                                        if sl_tp_result and sl_tp_result.get('retCode') == 0:
-                                            logging.info(f"SL/TP impostati per {symbol}.")
-                                        else:
-                                            logging.error(f"Errore impostazione SL/TP: {sl_tp_result.get('retMsg')}")
-                                else:
-                                    logging.error(f"Errore piazzamento ordine: {order_result.get('retMsg')}")
-
-
-                            self.last_messages.append(hashlib.md5(message.encode()).hexdigest())
-                            self.last_messages = self.last_messages[-30:]
-                            self.save_last_messages()
+            message_hash = hashlib.md5(message.encode()).hexdigest()
+            with self.in_flight_lock:
+                if message_hash in self.in_flight_messages:
+                    continue
+                self.in_flight_messages.add(message_hash)
+            yield state, message, message_hash
 
-                time.sleep(self.interval)
-            except Exception as e:
-                logging.error(f"Errore nel loop: {e}", exc_info=True)
-                time.sleep(1)
+    def dispatch_message(self, item):
+        state, message, message_hash = item
+        try:
+            logging.info(f"[{state.area.name}] Nuovo messaggio: {message[:50]}...")
+            self.dispatched_count += 1
+            if self.dispatched_messages is not None:
+                self.dispatched_messages.append({'area': state.area.name, 'message': message})
+            self.send_telegram_notification(message)
+
+            if "Current Trade" in message:
+                trade_data = parse_eliz_trade(message)
+                logging.info(f"Trade rilevato: {trade_data.token_name} - Side: {trade_data.side}")
+                if self.frame_buffer and not (trade_data.token_name and trade_data.side):
+                    self.dump_frames("parsing", message)
+                self.execute_trade(trade_data)
+
+            self.last_messages.add(message_hash)
+            self.near_duplicates.add(message)
+        finally:
+            with self.in_flight_lock:
+                self.in_flight_messages.discard(message_hash)
+
+    def execute_trade(self, trade_data):
+        if self.dry_run:
+            logging.info(f"[dry-run] Ordine non piazzato: {trade_data}")
+            return
+        symbol = trade_data.token_name + "USDT"
+        qty = str(trade_data.bought_token_amount)
+        side = trade_data.side
+        order_type = "Limit" if trade_data.limit_order else "Market"
+        price = str(trade_data.entry_price) if trade_data.limit_order else None
+
+        order_result = self.bybit_trader.place_order(symbol, side, qty, order_type, price)
+        if order_result and order_result.get('retCode') == 0:
+            logging.info(f"Ordine {order_type} piazzato per {symbol}")
+            if order_type == "Market": time.sleep(2)
+
+            sl = str(trade_data.stop_loss) if trade_data.stop_loss else None
+            tp = str(trade_data.take_profit) if trade_data.take_profit else None
+            if sl or tp:
+                sl_tp_result = self.bybit_trader.set_stop_loss_take_profit(symbol, sl, tp)
+                if sl_tp_result and sl_tp_result.get('retCode') == 0:
+                    logging.info(f"SL/TP impostati per {symbol}.")
+                else:
+                    logging.error(f"Errore impostazione SL/TP: {sl_tp_result.get('retMsg')}")
+        else:
+            logging.error(f"Errore piazzamento ordine: {order_result.get('retMsg')}")
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Monitor Discord headless")
+    parser.add_argument("--config", default="config.ini")
+    parser.add_argument("--replay", help="Frame registrati al posto dello schermo: cartella di immagini, video o archivio grezzo")
+    parser.add_argument("--realtime", action="store_true", help="Replay ai tempi registrati invece che alla massima velocità")
+    parser.add_argument("--fps", type=float, help="Frame/s di una sequenza di immagini (default: date dei file)")
+    parser.add_argument("--dry-run", action="store_true", help="Non invia notifiche né ordini e non salva lo storico")
+    parser.add_argument("--report", help="File JSON con frame/s del replay e messaggi rilevati")
+    args = parser.parse_args()
+
     config = configparser.ConfigParser()
-    if not os.path.exists('config.ini'):
-        logging.error("Errore: config.ini non trovato. Esegui main.py per crearlo.")
+    if not os.path.exists(args.config):
+        logging.error(f"Errore: {args.config} non trovato. Esegui main.py per crearlo.")
     else:
-        config.read('config.ini')
-        if not config.has_section('area') or not config.has_section('telegram'):
+        config.read(args.config)
+        if not config.has_section('area') or not (config.has_section('telegram') or args.dry_run):
              logging.error("Errore: config.ini incompleto. Esegui main.py per salvarlo correttamente.")
         else:
-            monitor = HeadlessMonitor(config)
+            frame_source = create_source('auto', args.replay, args.realtime, args.fps) if args.replay else None
+            monitor = HeadlessMonitor(config, frame_source=frame_source, dry_run=args.dry_run,
+                                      collect_messages=bool(args.report))
             try:
                 monitor.start()
             except KeyboardInterrupt:
+                pass
+            finally:
                 monitor.stop()
+            if args.report and monitor.replay_summary:
+                report = dict(monitor.replay_summary, messages=monitor.dispatched_messages)
+                with open(args.report, 'w', encoding='utf-8') as f:
+                    json.dump(report, f, ensure_ascii=False, indent=2)
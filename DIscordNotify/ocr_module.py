@@ -1,20 +1,473 @@
 import pytesseract
 import hashlib
-import re
-from dataclasses import dataclass
+import os
+import glob
+import ctypes
+import ctypes.util
+import threading
+from collections import OrderedDict
+import numpy as np
+from dataclasses import dataclass, field
+from signal_module import classic_data_trade, clean_classic_signal, eliz_data_trade, parse_classic_trade, parse_eliz_trade
+
+@dataclass(frozen=True)
+class OCRWord:
+    """Parola riconosciuta: box in pixel e confidenza di Tesseract (0-100)"""
+    text: str
+    x: float
+    y: float
+    width: float
+    height: float
+    confidence: float
+
+@dataclass(frozen=True)
+class OCRLine:
+    """Riga di testo: le parole nell'ordine di lettura"""
+    words: tuple
+
+    @property
+    def text(self):
+        return " ".join(word.text for word in self.words)
+
+    @property
+    def confidence(self):
+        """Confidenza media delle parole"""
+        return sum(word.confidence for word in self.words) / len(self.words) if self.words else 0.0
+
+    @property
+    def box(self):
+        """(x, y, larghezza, altezza) che racchiude le parole"""
+        x0 = min(word.x for word in self.words)
+        y0 = min(word.y for word in self.words)
+        x1 = max(word.x + word.width for word in self.words)
+        y1 = max(word.y + word.height for word in self.words)
+        return x0, y0, x1 - x0, y1 - y0
+
+@dataclass(frozen=True)
+class OCRResult:
+    """
+    Uscita strutturata di un'unica lettura OCR: il testo (identico a extract_text)
+    e le righe con box e confidenza delle parole, nelle coordinate dell'immagine letta
+    finché transformed() non le riporta su quelle del frame.
+    """
+    text: str
+    lines: tuple = field(default=())
+
+    def confident_text(self, min_confidence=0):
+        """Testo senza le righe con confidenza media sotto min_confidence"""
+        if min_confidence <= 0 or all(line.confidence >= min_confidence for line in self.lines):
+            return self.text
+        return "\n".join(line.text for line in self.lines if line.confidence >= min_confidence)
+
+    def transformed(self, scale_x=1.0, scale_y=1.0, dx=0.0, dy=0.0):
+        """Stesso risultato con i box scalati e traslati (es. da immagine preprocessata a frame)"""
+        return OCRResult(self.text, tuple(
+            OCRLine(tuple(OCRWord(word.text, word.x * scale_x + dx, word.y * scale_y + dy,
+                                  word.width * scale_x, word.height * scale_y, word.confidence)
+                          for word in line.words))
+            for line in self.lines))
+
+    @classmethod
+    def join(cls, results):
+        """Un risultato da più risultati già nelle stesse coordinate (es. le bande di un'area)"""
+        results = [result for result in results if result.text]
+        return cls("\n".join(result.text for result in results),
+                   tuple(line for result in results for line in result.lines))
+
+EMPTY_RESULT = OCRResult("")
+
+def parse_tsv(tsv):
+    """
+    Righe OCRLine dall'output TSV di Tesseract (GetTsvText o image_to_data): le righe
+    di livello 5 sono parole, raggruppate per (blocco, paragrafo, riga).
+    """
+    lines = {}
+    for row in tsv.splitlines():
+        columns = row.split('\t')
+        if len(columns) < 12 or columns[0] != '5' or not columns[11].strip():
+            continue  # intestazione di image_to_data, livelli superiori, parole vuote
+        word = OCRWord(columns[11], float(columns[6]), float(columns[7]),
+                       float(columns[8]), float(columns[9]), float(columns[10]))
+        lines.setdefault((columns[2], columns[3], columns[4]), []).append(word)
+    return tuple(OCRLine(tuple(words)) for words in lines.values())
+
+class TesseractEngine:
+    """
+    Handle persistente di libtesseract caricato via ctypes.
+    Il modello viene caricato una sola volta e le immagini numpy vengono passate
+    direttamente in memoria, senza file temporanei né un processo per frame.
+    """
+    LIBRARY_NAMES = [
+        'libtesseract.so.5', 'libtesseract.so.4', 'libtesseract.so',
+        'libtesseract.5.dylib', 'libtesseract.dylib',
+        'libtesseract-5.dll', 'libtesseract-4.dll', 'tesseract53.dll', 'tesseract50.dll',
+    ]
+
+    def __init__(self, lang='eng', oem=3, psm=6, datapath=None, library_path=None):
+        self.lang = lang
+        self.oem = oem
+        self.psm = psm
+        self._lock = threading.Lock()
+        self._lib = self._load_library(library_path)
+        self._declare_api()
+
+        self._handle = self._lib.TessBaseAPICreate()
+        if not self._handle:
+            raise RuntimeError("Impossibile creare l'handle Tesseract")
+
+        datapath = datapath or self._default_datapath()
+        datapath_arg = datapath.encode() if datapath else None
+        if self._lib.TessBaseAPIInit2(self._handle, datapath_arg, lang.encode(), oem) != 0:
+            self._lib.TessBaseAPIDelete(self._handle)
+            self._handle = None
+            raise RuntimeError(f"Inizializzazione Tesseract fallita (lang={lang}, tessdata={datapath})")
+        self._lib.TessBaseAPISetPageSegMode(self._handle, psm)
+
+    @classmethod
+    def _load_library(cls, library_path=None):
+        """Cerca libtesseract: percorso esplicito, librerie di sistema, cartella di tesseract_cmd"""
+        candidates = [library_path] if library_path else []
+        found = ctypes.util.find_library('tesseract')
+        if found:
+            candidates.append(found)
+        candidates.extend(cls.LIBRARY_NAMES)
+
+        # Su Windows la DLL sta accanto a tesseract.exe
+        cmd_dir = os.path.dirname(pytesseract.pytesseract.tesseract_cmd)
+        if cmd_dir:
+            candidates.extend(glob.glob(os.path.join(cmd_dir, '*tesseract*.dll')))
+
+        for candidate in candidates:
+            try:
+                return ctypes.CDLL(candidate)
+            except OSError:
+                continue
+        raise OSError("libtesseract non trovata. Specifica library_path nella sezione [ocr] di config.ini")
+
+    @staticmethod
+    def _default_datapath():
+        """Cartella tessdata: TESSDATA_PREFIX oppure accanto a tesseract_cmd"""
+        if os.environ.get('TESSDATA_PREFIX'):
+            return None  # Tesseract la legge da solo
+        cmd_dir = os.path.dirname(pytesseract.pytesseract.tesseract_cmd)
+        tessdata = os.path.join(cmd_dir, 'tessdata') if cmd_dir else ''
+        return tessdata if os.path.isdir(tessdata) else None
+
+    def _declare_api(self):
+        """Dichiara le firme C usate dell'API di Tesseract"""
+        lib = self._lib
+        lib.TessBaseAPICreate.restype = ctypes.c_void_p
+        lib.TessBaseAPICreate.argtypes = []
+        lib.TessBaseAPIInit2.restype = ctypes.c_int
+        lib.TessBaseAPIInit2.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_char_p, ctypes.c_int]
+        lib.TessBaseAPISetPageSegMode.restype = None
+        lib.TessBaseAPISetPageSegMode.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        lib.TessBaseAPISetImage.restype = None
+        lib.TessBaseAPISetImage.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_int,
+                                            ctypes.c_int, ctypes.c_int, ctypes.c_int]
+        lib.TessBaseAPIGetUTF8Text.restype = ctypes.c_void_p
+        lib.TessBaseAPIGetUTF8Text.argtypes = [ctypes.c_void_p]
+        lib.TessBaseAPIGetTsvText.restype = ctypes.c_void_p
+        lib.TessBaseAPIGetTsvText.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        lib.TessDeleteText.restype = None
+        lib.TessDeleteText.argtypes = [ctypes.c_void_p]
+        lib.TessBaseAPIClear.restype = None
+        lib.TessBaseAPIClear.argtypes = [ctypes.c_void_p]
+        lib.TessBaseAPIEnd.restype = None
+        lib.TessBaseAPIEnd.argtypes = [ctypes.c_void_p]
+        lib.TessBaseAPIDelete.restype = None
+        lib.TessBaseAPIDelete.argtypes = [ctypes.c_void_p]
+
+    def _set_image(self, image):
+        """Passa a Tesseract un buffer numpy uint8 (grayscale o RGB) senza copie superflue"""
+        image = np.ascontiguousarray(np.asarray(image), dtype=np.uint8)
+        height, width = image.shape[:2]
+        bytes_per_pixel = 1 if image.ndim == 2 else image.shape[2]
+        self._lib.TessBaseAPISetImage(self._handle, image.ctypes.data_as(ctypes.c_void_p),
+                                      width, height, bytes_per_pixel, image.strides[0])
+        return image  # Il chiamante deve tenere vivo il buffer fino al riconoscimento
+
+    def _take_text(self, text_ptr):
+        """Copia una stringa allocata da Tesseract e la libera"""
+        if not text_ptr:
+            return ""
+        try:
+            return ctypes.string_at(text_ptr).decode('utf-8', errors='replace')
+        finally:
+            self._lib.TessDeleteText(text_ptr)
+
+    def recognize(self, image, psm=None):
+        """Riconosce il testo di un'immagine numpy e restituisce la stringa UTF-8"""
+        return self._recognize(image, psm, False)[0]
+
+    def recognize_data(self, image, psm=None):
+        """
+        Testo e TSV di parole (box e confidenze) dalla stessa lettura: GetTsvText
+        riusa il riconoscimento già fatto da GetUTF8Text, circa 1 ms in più.
+        """
+        return self._recognize(image, psm, True)
+
+    def _recognize(self, image, psm, with_tsv):
+        if not self._handle:
+            raise RuntimeError("TesseractEngine già chiuso")
+        with self._lock:
+            if psm is not None and psm != self.psm:
+                self._lib.TessBaseAPISetPageSegMode(self._handle, psm)
+            try:
+                buffer = self._set_image(image)
+                text = self._take_text(self._lib.TessBaseAPIGetUTF8Text(self._handle))
+                tsv = self._take_text(self._lib.TessBaseAPIGetTsvText(self._handle, 0)) if with_tsv else None
+                del buffer
+                return text, tsv
+            finally:
+                self._lib.TessBaseAPIClear(self._handle)
+                if psm is not None and psm != self.psm:
+                    self._lib.TessBaseAPISetPageSegMode(self._handle, self.psm)
+
+    def close(self):
+        """Rilascia l'handle Tesseract"""
+        with self._lock:
+            if self._handle:
+                self._lib.TessBaseAPIEnd(self._handle)
+                self._lib.TessBaseAPIDelete(self._handle)
+                self._handle = None
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+class CompletedBatch:
+    """Risultato di OCRProcessor.submit: l'OCR è già stato eseguito nel thread chiamante"""
+    def __init__(self, results):
+        self.results = results
+
+    def result(self):
+        """Un OCRResult per immagine, nell'ordine di invio"""
+        return self.results
+
+class OCRCache:
+    """
+    Cache LRU delle letture (OCRResult), indicizzata per contenuto: forma e hash SHA-1
+    dei pixel dell'immagine preprocessata. Righe che ricompaiono identiche (intestazioni,
+    embed ricorrenti dei bot, nomi utente) non passano di nuovo da Tesseract.
+    La memoria è limitata da maxsize voci.
+    """
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._items = OrderedDict()  # (psm, forma, digest) -> OCRResult
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.in_flight_hits = 0  # Hit su un tile identico ancora in lettura (OCRPool)
+
+    @staticmethod
+    def key(image, psm=None):
+        """Chiave di un'immagine letta con una modalità psm: pixel uguali danno la stessa chiave"""
+        image = np.ascontiguousarray(image)
+        return psm, image.shape, hashlib.sha1(image).digest()
+
+    def get(self, key):
+        """Lettura in cache per la chiave, None se assente"""
+        with self._lock:
+            result = self._items.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def record_in_flight_hit(self):
+        """Tile non in cache ma già in lettura: condivide quella lettura, quindi è un hit"""
+        with self._lock:
+            self.hits += 1
+            self.in_flight_hits += 1
+
+    def put(self, key, result):
+        with self._lock:
+            self._items[key] = result
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def stats(self):
+        """Voci in cache, hit, miss e percentuale di hit"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._items),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'in_flight_hits': self.in_flight_hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+    def format_stats(self):
+        """Riepilogo leggibile per il log"""
+        s = self.stats()
+        in_flight = f" ({s['in_flight_hits']} su letture in corso)" if s['in_flight_hits'] else ""
+        return (f"cache OCR: {s['hits']} hit{in_flight}, {s['misses']} miss ({s['hit_rate']:.0%}), "
+                f"{s['entries']}/{s['maxsize']} voci")
 
 class OCRProcessor:
-    def __init__(self):
+    # 'glyph': confronto con l'atlante dei glifi del font di Discord, Tesseract per le righe incerte
+    BACKENDS = ('auto', 'tesseract_api', 'pytesseract', 'glyph')
+
+    def __init__(self, backend='auto', library_path=None, datapath=None, cache_size=1024,
+                 glyph_atlas='glyph_atlas.npz', glyph_min_confidence=90):
         self.custom_config = r'--oem 3 --psm 6 -l eng'
-    
-    def extract_text(self, preprocessed_image):
-        """Estrae testo da un'immagine preprocessata"""
+        self.backend = backend
+        self.library_path = library_path
+        self.datapath = datapath
+        self._engine = None
+        self._engine_failed = False
+        # Creazione pigra di motore e atlante: la chiamano sia il thread di cattura sia quello OCR
+        self._init_lock = threading.Lock()
+        self.glyph_atlas = glyph_atlas
+        self.glyph_min_confidence = glyph_min_confidence
+        self._glyph_reader = None
+        self._glyph_failed = False
+        # cache_size=0 disattiva la cache (es. nei worker di OCRPool, che usano quella del processo principale)
+        self.cache = OCRCache(cache_size) if cache_size else None
+
+    def set_backend(self, backend='auto', library_path=None, datapath=None):
+        """Imposta il backend OCR: 'auto', 'tesseract_api' (libtesseract residente) o 'pytesseract'"""
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Backend OCR non valido: {backend}")
+        self.close()
+        self.backend = backend
+        self.library_path = library_path or None
+        self.datapath = datapath or None
+        self._engine_failed = False
+        self._glyph_reader = None
+        self._glyph_failed = False
+        if self.cache is not None:
+            self.cache.clear()  # Un altro backend può leggere le stesse immagini in modo diverso
+
+    def set_glyph_atlas(self, glyph_atlas, min_confidence=90):
+        """Atlante dei glifi (.npz creato con glyph_module.py) e confidenza minima per il backend 'glyph'"""
+        self.glyph_atlas = glyph_atlas
+        self.glyph_min_confidence = min_confidence
+        self._glyph_reader = None
+        self._glyph_failed = False
+        if self.cache is not None:
+            self.cache.clear()
+
+    def set_cache_size(self, cache_size):
+        """Dimensione della cache OCR (0 la disattiva); la cache viene svuotata"""
+        self.cache = OCRCache(cache_size) if cache_size else None
+
+    def get_engine(self):
+        """
+        Restituisce il motore Tesseract residente (creato al primo uso), None se si usa
+        pytesseract. Se libtesseract non si carica o non si inizializza il fallimento
+        viene ricordato: un solo avviso e pytesseract per tutte le letture successive,
+        anche con backend 'tesseract_api' (fino al prossimo set_backend).
+        """
+        if self.backend == 'pytesseract' or self._engine_failed:
+            return None
+        if self._engine is None:
+            with self._init_lock:
+                if self._engine is None and not self._engine_failed:
+                    try:
+                        self._engine = TesseractEngine(oem=3, psm=6, lang='eng',
+                                                       datapath=self.datapath, library_path=self.library_path)
+                    except (OSError, RuntimeError, AttributeError) as e:
+                        required = " (backend tesseract_api richiesto)" if self.backend == 'tesseract_api' else ""
+                        print(f"libtesseract non disponibile{required}, uso pytesseract: {e}")
+                        self._engine_failed = True
+        return self._engine
+
+    def get_glyph_reader(self):
+        """GlyphReader del backend 'glyph' (atlante caricato al primo uso), None con gli altri backend"""
+        if self.backend != 'glyph' or self._glyph_failed:
+            return None
+        if self._glyph_reader is None:
+            from glyph_module import GlyphAtlas, GlyphReader  # glyph_module importa questo modulo
+            with self._init_lock:
+                if self._glyph_reader is None and not self._glyph_failed:
+                    try:
+                        self._glyph_reader = GlyphReader(GlyphAtlas.load(self.glyph_atlas),
+                                                         self.glyph_min_confidence)
+                    except (OSError, KeyError, ValueError) as e:
+                        print(f"Atlante dei glifi non disponibile ({self.glyph_atlas}), uso Tesseract: {e}")
+                        self._glyph_failed = True
+        return self._glyph_reader
+
+    def close(self):
+        """Rilascia il motore Tesseract residente"""
+        with self._init_lock:
+            if self._engine is not None:
+                self._engine.close()
+                self._engine = None
+
+    def recognize(self, preprocessed_image, psm=None):
+        """
+        Lettura strutturata (OCRResult: testo, righe, box e confidenze) di un'immagine
+        preprocessata, dalla cache se gli stessi pixel sono già stati letti.
+        psm sostituisce la modalità 6 (blocco uniforme), es. 7 per una riga.
+        """
+        key = None
+        if self.cache is not None:
+            key = self.cache.key(preprocessed_image, psm)
+            result = self.cache.get(key)
+            if result is not None:
+                return result
+        try:
+            glyph_reader = self.get_glyph_reader()
+            if glyph_reader is not None:
+                result = glyph_reader.recognize(preprocessed_image, self.recognize_tesseract)
+            else:
+                result = self.recognize_tesseract(preprocessed_image, psm)
+        except Exception as e:
+            print(f"Errore OCR: {e}")
+            return EMPTY_RESULT  # Un errore non viene messo in cache
+        if key is not None:
+            self.cache.put(key, result)
+        return result
+
+    def recognize_tesseract(self, preprocessed_image, psm=None):
+        """Lettura con Tesseract (libtesseract residente o pytesseract), senza cache"""
+        engine = self.get_engine()
+        if engine is not None:
+            text, tsv = engine.recognize_data(preprocessed_image, psm)
+            return OCRResult(text.strip(), parse_tsv(tsv))
+        # Con pytesseract ogni lettura è un processo: image_to_data dà righe e confidenze in una
+        # sola esecuzione e il testo si ricostruisce dalle parole (senza spazi multipli e righe
+        # vuote, a differenza di image_to_string; extract_text resta image_to_string)
+        lines = parse_tsv(pytesseract.image_to_data(preprocessed_image, config=self.pytesseract_config(psm)))
+        return OCRResult("\n".join(line.text for line in lines), lines)
+
+    def pytesseract_config(self, psm=None):
+        """Opzioni da riga di comando di pytesseract, con psm al posto della modalità 6"""
+        return self.custom_config if psm is None else self.custom_config.replace('--psm 6', f'--psm {psm}')
+
+    def extract_text(self, preprocessed_image, psm=None):
+        """
+        Estrae il testo da un'immagine preprocessata (vedi recognize). Con pytesseract
+        il testo è quello di image_to_string, senza passare per image_to_data.
+        """
+        if self.get_glyph_reader() is not None or self.get_engine() is not None:
+            return self.recognize(preprocessed_image, psm).text
         try:
-            text = pytesseract.image_to_string(preprocessed_image, config=self.custom_config)
-            return text.strip()
+            return pytesseract.image_to_string(preprocessed_image, config=self.pytesseract_config(psm)).strip()
         except Exception as e:
             print(f"Errore OCR: {e}")
             return ""
+
+    def submit(self, images, psm=None):
+        """Stessa interfaccia di OCRPool.submit: qui le immagini vengono lette subito, in ordine"""
+        return CompletedBatch([self.recognize(image, psm) for image in images])
+
+    def extract_texts(self, images, psm=None):
+        return [self.extract_text(image, psm) for image in images]
     
     def calculate_image_hash(self, image):
         """Calcola hash dell'immagine per rilevare cambiamenti"""
@@ -29,283 +482,20 @@ class OCRProcessor:
             'success': bool(text.strip())
         }
 
-@dataclass
-class eliz_data_trade:
-    limit_order: bool
-    token_name: str
-    bought_token_amount: int
-    balance: int       
-    entry_price: float
-    stop_loss: any
-    take_profit: any
-    e_retest: bool
-    side: str  # 'Buy' or 'Sell'
-    
-@dataclass
-class classic_data_trade:
-    limit_order: bool
-    token_name:str
-    balance: int       
-    entry_price: float
-    stop_loss: any
-    take_profit: any
-    side: str  # 'Buy' or 'Sell'
-    
-    
 class TextAnalyzer:
-    def __init__(self):
-        pass
-    
+    """Pulizia e parsing dei segnali: l'implementazione è condivisa in signal_module"""
     def remove_before_lo_or_sh_ww_simple(self, text):
         """Rimuove caratteri prima di Lo/Sh, rimuove w/ e tutto dopo @"""
-        # 1. Trova la prima occorrenza di "Lo" o "Sh"
-        for i in range(len(text) - 1):
-            if text[i:i+2] in ["Lo", "Sh"]:
-                # Rimuovi tutto prima di Lo/Sh
-                result = text[i:]
-                
-                # 2. Rimuovi "w/" se presente
-                result = result.replace("w/", "")
-                
-                # 3. Trova il primo "@" e rimuovi tutto da lì in poi
-                at_pos = result.find("@")
-                if at_pos != -1:
-                    result = result[:at_pos]
-                
-                return result.strip()  # Rimuovi spazi extra
-        return ""
-    
-    
+        return clean_classic_signal(text)
     
     def parse_classic_trade(self, text: str) -> classic_data_trade:
-        """Parser per estrarre i dati del trade dalla stringa di Eliz"""
-        try:
-            # Inizializza variabili con valori di default
-            limit_order = True
-            token_name = ""
-            balance = 1000
-            entry_price = 0.0
-            stop_loss = ""
-            take_profit = ""
-            side = ""
-            
-            # Dividi il testo in righe
-            lines = text.strip().split('\n')
-            
-            for line in lines:
-                line = line.strip()
-                if not line:
-                    continue
-                
-                if "long" in line.lower():
-                    side = "Buy"
-                elif "short" in line.lower():
-                    side = "Sell"
-                
-                #if line.endswith("LIMIT ORDER"):
-                #   limit_str = line.replace("LIMIT ORDER", "")
-                #  limit_order = True
-
-                #Token Name
-                splitted = line.split()  # Fa lo split per controllare il ticker eliminando l'eventuale signature LIMIT
-                token_name = splitted[0] if splitted[0] != "LIMIT" else splitted[1]
-                
-                #Entry Price
-                try:
-                    # Cerca il pattern "Entry: numero-numero-numero..."
-                    pattern = r'Entry:\s*((?:[\d.]+\s*-\s*)*[\d.]+)'
-                    match = re.search(pattern, text)
-                    
-                    if match:
-                        entry_part = match.group(1)
-                        # Pulisce spazi extra e divide per trattini
-                        numbers = []
-                        for num_str in entry_part.split('-'):
-                            num_str = num_str.strip()
-                            if num_str and re.match(r'^\d+\.?\d*$', num_str):
-                                numbers.append(float(num_str))                     
-                                entry_price = numbers[0]                      
-                
-                except Exception as e:
-                    print(f"Errore nell'estrazione dei numeri Entry: {e}")
-                
-                            
-                # Balance
-
-                        
-                # Entry Price
-                elif line.startswith("Entry Price:"):
-                    price_str = line.replace("Entry Price:", "").strip()
-                    try:
-                        entry_price = float(price_str)
-                    except ValueError:
-                        entry_price = 0.0
-                        
-                # Stop Loss - può essere numero o stringa
-                elif line.startswith("Stop Loss:"):
-                    sl_str = line.replace("Stop Loss:", "").strip()
-                    try:
-                        # Prova prima come float
-                        stop_loss = float(sl_str)
-                    except ValueError:
-                        # Se non è un numero, mantieni come stringa
-                        stop_loss = sl_str
-                        
-                # Take Profit - può essere numero o stringa
-                elif line.startswith("Take Profit:"):
-                    tp_str = line.replace("Take Profit:", "").strip()
-                    try:
-                        # Prova prima come float
-                        take_profit = float(tp_str)
-                    except ValueError:
-                        # Se non è un numero, mantieni come stringa
-                        take_profit = tp_str
-                    
-                # EP Retest
-                elif line.startswith("EP Retest:"):
-                    retest_str = line.replace("EP Retest:", "").strip()
-                    e_retest = retest_str.lower() in ['true', 'yes', '1', 'si', 'sì']
-            
-            # Crea e restituisci l'oggetto dataclass
-            return eliz_data_trade(
-                limit_order=limit_order,
-                token_name=token_name,
-                bought_token_amount=bought_token_amount,
-                balance=balance,
-                entry_price=entry_price,
-                stop_loss=stop_loss,
-                take_profit=take_profit,
-                e_retest=e_retest,
-                side=side
-            )
-            
-        except Exception as e:
-            print(f"Errore nel parsing del trade: {e}")
-            # Restituisci un oggetto con valori di default in caso di errore
-            return eliz_data_trade(
-                limit_order=False,
-                token_name="",
-                bought_token_amount=0,
-                balance=0,
-                entry_price=0.0,
-                stop_loss="",
-                take_profit="",
-                e_retest=False,
-                side=""
-            )
+        """Parser dei segnali classici (Long/Short, Entry: a-b-c, SL, TP)"""
+        return parse_classic_trade(text)
     
     def parse_eliz_trade(self, text: str) -> eliz_data_trade:
         """Parser per estrarre i dati del trade dalla stringa di Eliz"""
-        try:
-            # Inizializza variabili con valori di default
-            limit_order = False
-            token_name = ""
-            bought_token_amount = 0
-            balance = 0
-            entry_price = 0.0
-            stop_loss = ""
-            take_profit = ""
-            e_retest = False
-            side = ""
-            
-            # Dividi il testo in righe
-            lines = text.strip().split('\n')
-            
-            for line in lines:
-                line = line.strip()
-                if not line:
-                    continue
-                
-                if "long" in line.lower():
-                    side = "Buy"
-                elif "short" in line.lower():
-                    side = "Sell"
-                
-                if line.endswith("LIMIT ORDER"):
-                    limit_str = line.replace("LIMIT ORDER", "")
-                    limit_order = True
-                
-                # Token Name
-                if line.startswith("Token Name:"):
-                    token_name = line.replace("Token Name:", "").strip()
-                    
-                # Bought Token Amount
-                elif line.startswith("Bought Token Amount:"):
-                    amount_str = line.replace("Bought Token Amount:", "").strip()
-                    try:
-                        bought_token_amount = int(amount_str)
-                    except ValueError:
-                        bought_token_amount = 0
-                        
-                # Balance
-                elif line.startswith("Balance:"):
-                    balance_str = line.replace("Balance:", "").strip()
-                    try:
-                        balance = int(balance_str)
-                    except ValueError:
-                        balance = 0
-                        
-                # Entry Price
-                elif line.startswith("Entry Price:"):
-                    price_str = line.replace("Entry Price:", "").strip()
-                    try:
-                        entry_price = float(price_str)
-                    except ValueError:
-                        entry_price = 0.0
-                        
-                # Stop Loss - può essere numero o stringa
-                elif line.startswith("Stop Loss:"):
-                    sl_str = line.replace("Stop Loss:", "").strip()
-                    try:
-                        # Prova prima come float
-                        stop_loss = float(sl_str)
-                    except ValueError:
-                        # Se non è un numero, mantieni come stringa
-                        stop_loss = sl_str
-                        
-                # Take Profit - può essere numero o stringa
-                elif line.startswith("Take Profit:"):
-                    tp_str = line.replace("Take Profit:", "").strip()
-                    try:
-                        # Prova prima come float
-                        take_profit = float(tp_str)
-                    except ValueError:
-                        # Se non è un numero, mantieni come stringa
-                        take_profit = tp_str
-                    
-                # EP Retest
-                elif line.startswith("EP Retest:"):
-                    retest_str = line.replace("EP Retest:", "").strip()
-                    e_retest = retest_str.lower() in ['true', 'yes', '1', 'si', 'sì']
-            
-            # Crea e restituisci l'oggetto dataclass
-            return eliz_data_trade(
-                limit_order=limit_order,
-                token_name=token_name,
-                bought_token_amount=bought_token_amount,
-                balance=balance,
-                entry_price=entry_price,
-                stop_loss=stop_loss,
-                take_profit=take_profit,
-                e_retest=e_retest,
-                side=side
-            )
-            
-        except Exception as e:
-            print(f"Errore nel parsing del trade: {e}")
-            # Restituisci un oggetto con valori di default in caso di errore
-            return eliz_data_trade(
-                limit_order=False,
-                token_name="",
-                bought_token_amount=0,
-                balance=0,
-                entry_price=0.0,
-                stop_loss="",
-                take_profit="",
-                e_retest=False,
-                side=""
-            )
-
+        return parse_eliz_trade(text)
+    
     def format_eliz_trade(self, trade: eliz_data_trade) -> str:
         """Converte un oggetto eliz_data_trade in una stringa formattata"""
         try:
@@ -0,0 +1,185 @@
+import atexit
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+import numpy as np
+
+ARENA_ALIGNMENT = 64
+
+# Stato dei processi worker: un OCRProcessor residente e i segmenti condivisi già aperti
+_worker_processor = None
+_worker_segments = {}
+
+def _init_worker(backend, library_path, datapath, glyph_atlas='glyph_atlas.npz', glyph_min_confidence=90):
+    """Inizializzazione di un worker: il modello Tesseract (o l'atlante dei glifi) viene caricato una sola volta"""
+    global _worker_processor
+    # Il parallelismo è tra processi: thread OpenMP di Tesseract in più si contenderebbero i core
+    os.environ.setdefault('OMP_THREAD_LIMIT', '1')
+    from ocr_module import OCRProcessor
+    _worker_processor = OCRProcessor(backend, library_path, datapath, cache_size=0,
+                                     glyph_atlas=glyph_atlas, glyph_min_confidence=glyph_min_confidence)
+    atexit.register(_close_worker)
+
+def _close_worker():
+    for segment in _worker_segments.values():
+        segment.close()
+    _worker_segments.clear()
+    if _worker_processor is not None:
+        _worker_processor.close()
+
+def _recognize_tile(arena_name, offset, shape, psm=None):
+    """Riconosce un tile letto direttamente dall'arena condivisa (nessun array serializzato)"""
+    segment = _worker_segments.get(arena_name)
+    if segment is None:
+        # Arena nuova (ingrandita dal processo principale): le precedenti non servono più
+        for old in _worker_segments.values():
+            old.close()
+        _worker_segments.clear()
+        segment = _worker_segments[arena_name] = shared_memory.SharedMemory(name=arena_name)
+    image = np.ndarray(shape, dtype=np.uint8, buffer=segment.buf, offset=offset)
+    try:
+        return _worker_processor.recognize(image, psm)
+    finally:
+        del image  # Nessuna vista deve restare aperta sul buffer del segmento
+
+class PendingBatch:
+    """Tile inviati ai worker: result() restituisce gli OCRResult nell'ordine di invio"""
+    def __init__(self, futures):
+        self.futures = futures
+
+    def result(self):
+        return [future.result() for future in self.futures]
+
+class OCRPool:
+    """
+    OCR su un pool di processi, ognuno con il proprio Tesseract residente: le bande
+    e le aree di un tick vengono riconosciute in parallelo su più core.
+
+    I tile non viaggiano serializzati: submit() li copia in un'arena di memoria
+    condivisa (multiprocessing.shared_memory) e ai worker arrivano solo nome
+    dell'arena, offset e forma. L'arena viene riusata dall'inizio quando nessun
+    batch è in corso e ricreata più grande solo se un tick non ci sta.
+    Con una OCRCache i tile già letti (o in lettura) non vengono inviati di nuovo.
+    Stessa interfaccia di OCRProcessor per recognize, extract_text e submit.
+    """
+    def __init__(self, workers=None, backend='auto', library_path=None, datapath=None, arena_mb=16, cache=None,
+                 glyph_atlas='glyph_atlas.npz', glyph_min_confidence=90):
+        self.workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                             initargs=(backend, library_path, datapath,
+                                                       glyph_atlas, glyph_min_confidence))
+        self._lock = threading.Lock()
+        self._arena = shared_memory.SharedMemory(create=True, size=int(arena_mb * 1024 * 1024))
+        self._offset = 0
+        self._outstanding = []
+        self.cache = cache
+        self._in_flight = {}  # chiave della cache -> future del tile in lettura
+        # Lock proprio della mappa: il callback di fine lettura gira sul thread del pool, che
+        # non deve mai attendere self._lock (submit lo tiene mentre attende i batch in corso)
+        self._in_flight_lock = threading.Lock()
+        self.tiles = 0
+        self.arena_resets = 0
+
+    @classmethod
+    def for_processor(cls, processor, workers=None, arena_mb=16):
+        """Pool con lo stesso backend e la stessa cache di un OCRProcessor"""
+        return cls(workers, processor.backend, processor.library_path, processor.datapath, arena_mb, processor.cache,
+                   processor.glyph_atlas, processor.glyph_min_confidence)
+
+    def _reserve(self, size):
+        """Offset libero nell'arena per size byte; attende i batch in corso o la ingrandisce se serve"""
+        self._outstanding = [future for future in self._outstanding if not future.done()]
+        if not self._outstanding:
+            self._offset = 0
+        if self._offset + size > self._arena.size:
+            wait(self._outstanding)
+            self._outstanding = []
+            self._offset = 0
+            self.arena_resets += 1
+            if size > self._arena.size:
+                self._arena.close()
+                self._arena.unlink()
+                self._arena = shared_memory.SharedMemory(create=True, size=size * 2)
+        offset = self._offset
+        self._offset += -(-size // ARENA_ALIGNMENT) * ARENA_ALIGNMENT
+        return offset
+
+    def _cached(self, key):
+        """Tile identico già in lettura o future già risolto dalla cache, None se va letto"""
+        with self._in_flight_lock:
+            future = self._in_flight.get(key)
+        if future is not None:
+            self.cache.record_in_flight_hit()  # Nessuna lettura in più: conta come hit, non come miss
+            return future
+        result = self.cache.get(key)
+        if result is not None:
+            future = Future()
+            future.set_result(result)
+            return future
+        return None
+
+    def _store(self, key, future):
+        """Callback di fine lettura: il risultato entra in cache (gli errori no) ed esce dai tile in lettura"""
+        if not future.cancelled() and future.exception() is None:
+            self.cache.put(key, future.result())
+        with self._in_flight_lock:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+    def submit(self, images, psm=None):
+        """Copia le immagini (uint8, grigie o a colori) nell'arena e le invia ai worker"""
+        futures = []
+        with self._lock:
+            batch = {}  # Lo stesso tile due volte nello stesso batch viene letto una volta sola
+            for image in images:
+                image = np.asarray(image, dtype=np.uint8)
+                key = None
+                if self.cache is not None:
+                    key = self.cache.key(image, psm)
+                    future = batch.get(key) or self._cached(key)
+                    if future is not None:
+                        futures.append(future)
+                        continue
+
+                offset = self._reserve(image.nbytes)
+                view = np.ndarray(image.shape, dtype=np.uint8, buffer=self._arena.buf, offset=offset)
+                np.copyto(view, image)
+                del view
+                future = self._executor.submit(_recognize_tile, self._arena.name, offset, image.shape, psm)
+                self._outstanding.append(future)
+                self.tiles += 1
+                if key is not None:
+                    with self._in_flight_lock:
+                        batch[key] = self._in_flight[key] = future
+                    # Se la lettura è già finita il callback gira subito qui, fuori da _in_flight_lock
+                    future.add_done_callback(lambda done, key=key: self._store(key, done))
+                futures.append(future)
+        return PendingBatch(futures)
+
+    def extract_texts(self, images, psm=None):
+        """Testi di più immagini, riconosciute in parallelo e restituite in ordine"""
+        return [result.text for result in self.submit(images, psm).result()]
+
+    def recognize(self, preprocessed_image, psm=None):
+        return self.submit([preprocessed_image], psm).result()[0]
+
+    def extract_text(self, preprocessed_image, psm=None):
+        return self.recognize(preprocessed_image, psm).text
+
+    def close(self):
+        """Ferma i worker e rilascia l'arena condivisa"""
+        if self._executor is None:
+            return
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._executor = None
+        self._arena.close()
+        self._arena.unlink()
+
+def ocr_pool_from_config(section, processor):
+    """OCRPool da [ocr] workers (0 o assente: OCR nel thread dello stadio, None)"""
+    workers = section.get('workers', '0').strip().lower()
+    if workers in ('', '0'):
+        return None
+    return OCRPool.for_processor(processor, None if workers == 'auto' else int(workers),
+                                 section.getfloat('arena_mb', 16))
@@ -0,0 +1,247 @@
+import threading
+import time
+from collections import deque
+
+class StageQueue:
+    """
+    Coda limitata tra due stadi. Con drop_oldest=True (frame) una put su coda piena
+    scarta l'elemento più vecchio invece di bloccare; altrimenti (messaggi) la put
+    aspetta che si liberi spazio, rendendo visibile la contropressione.
+    """
+    def __init__(self, maxsize=2, drop_oldest=False):
+        self.maxsize = maxsize
+        self.drop_oldest = drop_oldest
+        self.items = deque()
+        self.unfinished = 0  # Elementi accodati e non ancora completati dallo stadio successivo
+        self.dropped = 0
+        self.blocked_time = 0.0
+        self.condition = threading.Condition()
+
+    def put(self, item, stop_event=None):
+        """Inserisce un elemento con il suo timestamp di accodamento"""
+        with self.condition:
+            if len(self.items) >= self.maxsize:
+                if self.drop_oldest:
+                    self.items.popleft()
+                    self.dropped += 1
+                    self.unfinished -= 1
+                else:
+                    start = time.perf_counter()
+                    while len(self.items) >= self.maxsize:
+                        if stop_event is not None and stop_event.is_set():
+                            return False
+                        self.condition.wait(0.2)
+                    self.blocked_time += time.perf_counter() - start
+            self.items.append((time.perf_counter(), item))
+            self.unfinished += 1
+            self.condition.notify_all()
+            return True
+
+    def get(self, timeout=0.2):
+        """Restituisce (timestamp di accodamento, elemento) oppure None allo scadere del timeout"""
+        with self.condition:
+            if not self.items:
+                self.condition.wait(timeout)
+                if not self.items:
+                    return None
+            entry = self.items.popleft()
+            self.condition.notify_all()
+            return entry
+
+    def task_done(self):
+        """Segnala che un elemento prelevato è stato elaborato (e i suoi risultati accodati)"""
+        with self.condition:
+            self.unfinished -= 1
+
+    def depth(self):
+        """Numero di elementi in coda"""
+        with self.condition:
+            return len(self.items)
+
+class StageStats:
+    """Contatori di uno stadio: elementi elaborati, errori, attesa in coda e latenza di elaborazione"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.processed = 0
+        self.errors = 0
+        self.total_wait = 0.0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def record(self, wait, latency):
+        with self.lock:
+            self.processed += 1
+            self.total_wait += wait
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+
+    def record_error(self):
+        with self.lock:
+            self.errors += 1
+
+    def snapshot(self):
+        with self.lock:
+            count = max(self.processed, 1)
+            return {
+                'processed': self.processed,
+                'errors': self.errors,
+                'avg_wait_ms': self.total_wait * 1000 / count,
+                'avg_latency_ms': self.total_latency * 1000 / count,
+                'max_latency_ms': self.max_latency * 1000,
+            }
+
+class Stage(threading.Thread):
+    """
+    Stadio della pipeline su un thread dedicato: prende elementi dalla coda di
+    ingresso, li passa all'handler e accoda nella coda di uscita ogni risultato
+    restituito (l'handler restituisce un iterabile, anche un generatore, o None).
+    """
+    def __init__(self, name, handler, input_queue, output_queue, stop_event, on_error=None):
+        super().__init__(name=f"stage-{name}", daemon=True)
+        self.stage_name = name
+        self.handler = handler
+        self.input_queue = input_queue
+        self.output_queue = output_queue
+        self.stop_event = stop_event
+        self.on_error = on_error
+        self.stats = StageStats()
+
+    def run(self):
+        while not self.stop_event.is_set():
+            entry = self.input_queue.get()
+            if entry is None:
+                continue
+            enqueued_at, item = entry
+            start = time.perf_counter()
+            try:
+                for result in self.handler(item) or ():
+                    if self.output_queue is not None:
+                        self.output_queue.put(result, self.stop_event)
+            except Exception as e:
+                self.stats.record_error()
+                if self.on_error:
+                    self.on_error(self.stage_name, e)
+            self.stats.record(start - enqueued_at, time.perf_counter() - start)
+            self.input_queue.task_done()
+
+class SourceStage(threading.Thread):
+    """
+    Stadio sorgente: a ogni scadenza dello scheduler produce un elemento e lo
+    accoda senza aspettare gli stadi successivi. Se produce solleva EOFError
+    (es. replay terminato) la sorgente si ferma e finished diventa True.
+    """
+    def __init__(self, name, produce, output_queue, scheduler, stop_event, on_error=None, error_backoff=5):
+        super().__init__(name=f"stage-{name}", daemon=True)
+        self.stage_name = name
+        self.produce = produce
+        self.output_queue = output_queue
+        self.scheduler = scheduler
+        self.stop_event = stop_event
+        self.on_error = on_error
+        self.error_backoff = error_backoff
+        self.finished = False
+        self.stats = StageStats()
+
+    def run(self):
+        while self.scheduler.wait(self.stop_event):
+            start = time.perf_counter()
+            try:
+                self.output_queue.put(self.produce(), self.stop_event)
+                self.stats.record(0.0, time.perf_counter() - start)
+            except EOFError:
+                self.finished = True
+                break
+            except Exception as e:
+                self.stats.record_error()
+                if self.on_error:
+                    self.on_error(self.stage_name, e)
+                self.stop_event.wait(self.error_backoff)
+
+class Pipeline:
+    """Stadi collegati da code limitate, ognuno sul proprio thread"""
+    def __init__(self, on_error=None):
+        self.on_error = on_error
+        self.stop_event = threading.Event()
+        self.source_stop_event = threading.Event()  # Ferma solo le sorgenti (drain)
+        self.stages = []
+        self.queues = {}
+
+    def add_queue(self, name, maxsize, drop_oldest=False):
+        self.queues[name] = StageQueue(maxsize, drop_oldest)
+        return self.queues[name]
+
+    def add_source(self, name, produce, output, scheduler, error_backoff=5):
+        stage = SourceStage(name, produce, self.queues[output], scheduler, self.source_stop_event,
+                            self.on_error, error_backoff)
+        self.stages.append(stage)
+        return stage
+
+    def add_stage(self, name, handler, input, output=None):
+        stage = Stage(name, handler, self.queues[input], self.queues.get(output) if output else None,
+                      self.stop_event, self.on_error)
+        self.stages.append(stage)
+        return stage
+
+    def start(self):
+        self.stop_event.clear()
+        self.source_stop_event.clear()
+        for stage in self.stages:
+            stage.start()
+
+    def drain(self, timeout=10):
+        """
+        Ferma le sorgenti e attende che gli stadi elaborino gli elementi già accodati.
+        Restituisce True se le code si sono svuotate entro timeout secondi.
+        """
+        self.source_stop_event.set()
+        deadline = time.monotonic() + timeout
+        for stage in self.stages:
+            if isinstance(stage, SourceStage):
+                stage.join(timeout=max(0.0, deadline - time.monotonic()))
+        while any(queue.unfinished > 0 for queue in self.queues.values()):
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def stop(self, timeout=2):
+        """Ferma tutti gli stadi; restituisce False se qualcuno è ancora attivo dopo timeout"""
+        self.source_stop_event.set()
+        self.stop_event.set()
+        for stage in self.stages:
+            stage.join(timeout=timeout)
+        return not self.alive()
+
+    def alive(self):
+        """True se almeno uno stadio è ancora in esecuzione"""
+        return any(stage.is_alive() for stage in self.stages)
+
+    def drained(self):
+        """True se tutte le sorgenti sono terminate e ogni elemento accodato è stato elaborato"""
+        sources = [stage for stage in self.stages if isinstance(stage, SourceStage)]
+        return (all(stage.finished for stage in sources)
+                and all(queue.unfinished == 0 for queue in self.queues.values()))
+
+    def stats(self):
+        """Contatori per stadio e profondità/scarti per coda"""
+        return {
+            'stages': {stage.stage_name: stage.stats.snapshot() for stage in self.stages},
+            'queues': {name: {'depth': queue.depth(), 'maxsize': queue.maxsize, 'dropped': queue.dropped,
+                              'blocked_ms': queue.blocked_time * 1000}
+                       for name, queue in self.queues.items()},
+        }
+
+    def format_stats(self):
+        """Riepilogo leggibile dei contatori per il log"""
+        stats = self.stats()
+        parts = []
+        for name, s in stats['stages'].items():
+            parts.append(f"{name}: {s['processed']} el., {s['avg_latency_ms']:.1f} ms medi "
+                         f"(max {s['max_latency_ms']:.1f}), attesa {s['avg_wait_ms']:.1f} ms, errori {s['errors']}")
+        for name, q in stats['queues'].items():
+            parts.append(f"coda {name}: {q['depth']}/{q['maxsize']}, scartati {q['dropped']}, "
+                         f"bloccata {q['blocked_ms']:.0f} ms")
+        for stage in self.stages:
+            if isinstance(stage, SourceStage):
+                parts.append(f"{stage.stage_name}: {stage.scheduler.format_stats()}")
+        return " | ".join(parts)
@@ -0,0 +1,170 @@
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import traceback
+from datetime import datetime
+import cv2
+import numpy as np
+
+DUMP_IMAGE_PARAMS = [cv2.IMWRITE_PNG_COMPRESSION, 1]  # Il dump avviene sul thread che ha fallito: PNG veloce
+DUMP_FOLDER = re.compile(r'\d{8}_\d{6}_\d{3}_.+')  # Nome delle cartelle create da dump(): data_ora_ms_motivo
+
+class FrameRingBuffer:
+    """
+    Ultimi capacity frame grezzi elaborati dallo stadio OCR, per ogni area, in un
+    unico blocco numpy allocato una volta in allocate(): ogni frame viene copiato
+    nello slot più vecchio, senza allocazioni per frame, e la memoria resta costante
+    per tutta la durata del monitor. L'immagine preprocessata non viene conservata:
+    dump() la ricalcola dal frame grezzo con il preprocessing dell'area, così il
+    percorso OCR non paga un secondo preprocessing per ogni frame cambiato.
+
+    dump() scrive su disco il contenuto (PNG più info.json con testi e motivo): il
+    monitor lo chiama su eccezione, su parsing fallito e quando store_result segnala
+    empty_streak letture OCR vuote consecutive su un'area. Tra due dump passano
+    almeno min_interval secondi e su disco restano solo gli ultimi max_dumps.
+    """
+    def __init__(self, path, capacity=8, empty_streak=3, min_interval=60, max_dumps=20):
+        self.path = path
+        self.capacity = capacity
+        self.empty_streak = empty_streak
+        self.min_interval = min_interval
+        self.max_dumps = max_dumps
+        self.block = None
+        self.raw = {}  # nome area -> vista (capacity, altezza, larghezza, canali) sul blocco
+        self.preprocessors = {}  # nome area -> preprocessing usato per le immagini dei dump
+        self._lock = threading.Lock()
+        self._cursor = -1
+        self._timestamps = [0.0] * capacity
+        self._stored = []  # per slot: {nome area: testo OCR, None se l'OCR non è terminato}
+        self._empty_counts = {}
+        self._last_dump = None
+        self.dumps = 0
+        self.suppressed = 0
+
+    def allocate(self, layout):
+        """
+        Alloca il blocco per le aree [(nome, forma grezza, preprocessing o None)]:
+        un solo np.empty, suddiviso in viste per area.
+        """
+        sizes = [(name, tuple(raw_shape), int(np.prod(raw_shape))) for name, raw_shape, _ in layout]
+        self.block = np.empty((self.capacity, sum(size for _, _, size in sizes)), np.uint8)
+        self.raw = {}
+        offset = 0
+        for name, raw_shape, size in sizes:
+            self.raw[name] = self.block[:, offset:offset + size].reshape((self.capacity,) + raw_shape)
+            offset += size
+        self.preprocessors = {name: preprocess for name, _, preprocess in layout}
+        self._cursor = -1
+        self._stored = [{} for _ in range(self.capacity)]
+        self._empty_counts = {name: 0 for name, _, _ in layout}
+
+    @property
+    def nbytes(self):
+        return self.block.nbytes if self.block is not None else 0
+
+    def next_slot(self, timestamp=None):
+        """Passa allo slot più vecchio (che viene sovrascritto) e ne restituisce l'indice"""
+        with self._lock:
+            self._cursor = (self._cursor + 1) % self.capacity
+            self._timestamps[self._cursor] = timestamp if timestamp is not None else time.time()
+            self._stored[self._cursor].clear()
+            return self._cursor
+
+    def store_raw(self, slot, name, frame):
+        """Copia il frame grezzo di un'area prima dell'OCR (così un'eccezione nell'OCR lo trova nel dump)"""
+        target = self.raw.get(name)
+        if target is None or target.shape[1:] != frame.shape:
+            return False
+        with self._lock:
+            np.copyto(target[slot], frame)
+            self._stored[slot][name] = None
+        return True
+
+    def store_result(self, slot, name, text):
+        """
+        Registra il testo letto. Restituisce True quando le letture vuote consecutive
+        dell'area raggiungono empty_streak (una volta per serie).
+        """
+        with self._lock:
+            self._stored[slot][name] = text
+            if text.strip():
+                self._empty_counts[name] = 0
+                return False
+            self._empty_counts[name] = self._empty_counts.get(name, 0) + 1
+            return self._empty_counts[name] == self.empty_streak
+
+    def dump(self, reason, details=None, error=None):
+        """
+        Scrive gli slot dal più vecchio al più recente in una nuova cartella e
+        restituisce il percorso, None se è vuoto o è troppo presto dall'ultimo dump.
+        """
+        with self._lock:
+            if self.block is None or self._cursor < 0:
+                return None
+            now = time.monotonic()
+            if self._last_dump is not None and now - self._last_dump < self.min_interval:
+                self.suppressed += 1
+                return None
+            self._last_dump = now
+
+            folder = os.path.join(self.path, datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3] + "_" + reason)
+            os.makedirs(folder, exist_ok=True)
+            info = {'reason': reason, 'details': details, 'time': datetime.now().isoformat(), 'frames': []}
+            if error is not None:
+                info['error'] = "".join(traceback.format_exception(type(error), error, error.__traceback__))
+
+            order = [(self._cursor + 1 + i) % self.capacity for i in range(self.capacity)]
+            for index, slot in enumerate(slot for slot in order if self._stored[slot]):
+                areas = {}
+                for name, text in self._stored[slot].items():
+                    raw = self.raw[name][slot]
+                    cv2.imwrite(os.path.join(folder, f"{index:02d}_{name}_raw.png"), raw, DUMP_IMAGE_PARAMS)
+                    preprocess = self.preprocessors.get(name)
+                    if text is not None and preprocess is not None:
+                        self._write_preprocessed(os.path.join(folder, f"{index:02d}_{name}_pre.png"), preprocess, raw)
+                    areas[name] = {'text': text}
+                info['frames'].append({'index': index, 'timestamp': self._timestamps[slot], 'areas': areas})
+
+            with open(os.path.join(folder, "info.json"), 'w', encoding='utf-8') as f:
+                json.dump(info, f, ensure_ascii=False, indent=2)
+            self.dumps += 1
+        self._prune()
+        return folder
+
+    @staticmethod
+    def _write_preprocessed(path, preprocess, raw):
+        """Immagine passata all'OCR, ricalcolata dal frame grezzo (un errore non ferma il dump)"""
+        try:
+            cv2.imwrite(path, preprocess(raw.copy()), DUMP_IMAGE_PARAMS)
+        except Exception as e:
+            print(f"Preprocessing del dump non riuscito: {e}")
+
+    def _prune(self):
+        """
+        Tiene su disco solo gli ultimi max_dumps dump. Vengono considerate solo le
+        cartelle con il nome dei dump: path può essere condiviso (es. '.' o 'logs').
+        """
+        folders = sorted(entry.path for entry in os.scandir(self.path)
+                         if entry.is_dir() and DUMP_FOLDER.match(entry.name))
+        for folder in folders[:max(0, len(folders) - self.max_dumps)]:
+            shutil.rmtree(folder, ignore_errors=True)
+
+def ring_buffer_from_config(section):
+    """FrameRingBuffer dalla sezione [postmortem] di config.ini, None se non è abilitato"""
+    if not section.getboolean('enabled', False):
+        return None
+    return FrameRingBuffer(
+        path=section.get('path', 'postmortem'),
+        capacity=section.getint('capacity', 8),
+        empty_streak=section.getint('empty_streak', 3),
+        min_interval=section.getfloat('min_interval', 60),
+        max_dumps=section.getint('max_dumps', 20)
+    )
+
+def area_layout(area_states, channels=4):
+    """Layout per allocate(): forma del frame grezzo (BGRA) e preprocessing di ogni area"""
+    return [(state.area.name, (state.area.height, state.area.width, channels), state.preprocess)
+            for state in area_states]
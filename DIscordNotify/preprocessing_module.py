@@ -0,0 +1,160 @@
+import threading
+from collections import OrderedDict
+import cv2
+import numpy as np
+
+SHARPEN_KERNEL = np.array([[0, -1, 0], [-1, 5, -1], [0, -1, 0]], dtype=np.float32)
+PROFILE_SECTION_PREFIX = "preprocessing:"
+
+# Profili predefiniti: 'binary' passa a Tesseract un'immagine già binarizzata alla
+# risoluzione originale (testo nero su bianco), senza ingrandimento né sharpening
+PROFILES = {
+    'default': {},
+    'binary': {'stages': ('invert', 'threshold'), 'threshold': 'otsu'},
+}
+
+def to_gray(frame):
+    """Converte un frame BGR/BGRA in scala di grigi (i frame già grigi passano invariati)"""
+    if frame.ndim == 2:
+        return frame
+    code = cv2.COLOR_BGRA2GRAY if frame.shape[2] == 4 else cv2.COLOR_BGR2GRAY
+    return cv2.cvtColor(frame, code)
+
+class PreprocessingPipeline:
+    """
+    Preprocessing per OCR con buffer preallocati: per ogni dimensione di input
+    (area o banda) i buffer di uscita vengono creati una volta e riutilizzati
+    tramite gli argomenti dst di OpenCV, il kernel di sharpening è costruito una
+    sola volta. La sequenza di stadi dopo la conversione in grigio è configurabile.
+
+    Il risultato è una vista su un buffer interno (per thread), valida fino alla
+    chiamata successiva dallo stesso thread: chi deve conservarla ne fa una copia.
+    """
+    STAGES = ('scale', 'sharpen', 'invert', 'threshold', 'morph')
+    DEFAULT_STAGES = ('scale', 'sharpen', 'invert')
+
+    def __init__(self, stages=DEFAULT_STAGES, scale=1.5, threshold='otsu', adaptive_block=31,
+                 adaptive_c=15, morph_size=2, interpolation=cv2.INTER_CUBIC, max_shapes=32):
+        unknown = [stage for stage in stages if stage not in self.STAGES]
+        if unknown:
+            raise ValueError(f"Stadi di preprocessing non validi: {', '.join(unknown)}")
+        if threshold not in ('otsu', 'adaptive') and not isinstance(threshold, int):
+            raise ValueError(f"Soglia non valida: {threshold}")
+        self.stages = tuple(stages)
+        self.scale = float(scale)
+        self.threshold = threshold
+        self.adaptive_block = adaptive_block | 1  # adaptiveThreshold vuole un blocco dispari
+        self.adaptive_c = adaptive_c
+        self.interpolation = interpolation
+        self.max_shapes = max_shapes
+        self.kernel = SHARPEN_KERNEL
+        self.morph_kernel = np.ones((morph_size, morph_size), np.uint8)
+        self._local = threading.local()
+
+    @classmethod
+    def from_config(cls, section, profile='default'):
+        """Crea la pipeline da una sezione di config.ini ([preprocessing] o [preprocessing:nome])"""
+        profile = section.get('profile', profile)
+        if profile not in PROFILES:
+            raise ValueError(f"Profilo di base non valido: {profile}")
+        params = dict(PROFILES[profile])
+        if 'stages' in section:
+            params['stages'] = [s.strip() for s in section['stages'].split(',') if s.strip()]
+        if 'scale' in section:
+            params['scale'] = float(section['scale'])
+        if 'threshold' in section:
+            threshold = section['threshold'].strip().lower()
+            params['threshold'] = threshold if threshold in ('otsu', 'adaptive') else int(threshold)
+        for key in ('adaptive_block', 'adaptive_c', 'morph_size'):
+            if key in section:
+                params[key] = int(section[key])
+        return cls(**params)
+
+    def output_size(self, width, height):
+        """Dimensione (larghezza, altezza) dopo lo stadio di scala"""
+        if 'scale' not in self.stages or self.scale == 1.0:
+            return width, height
+        return max(1, int(width * self.scale)), max(1, int(height * self.scale))
+
+    def _slots(self, shape):
+        """Buffer di uscita per una dimensione di input, per thread e con LRU sulle dimensioni"""
+        cache = getattr(self._local, 'slots', None)
+        if cache is None:
+            cache = self._local.slots = OrderedDict()
+        slots = cache.get(shape)
+        if slots is None:
+            slots = cache[shape] = {}
+            if len(cache) > self.max_shapes:
+                cache.popitem(last=False)
+        else:
+            cache.move_to_end(shape)
+        return slots
+
+    @staticmethod
+    def _slot(slots, key, shape):
+        """Buffer uint8 preallocato per uno stadio, ricreato solo se cambia forma"""
+        buffer = slots.get(key)
+        if buffer is None or buffer.shape != shape:
+            buffer = slots[key] = np.empty(shape, np.uint8)
+        return buffer
+
+    def process(self, img):
+        """Preprocessa un frame BGR, BGRA o grigio e restituisce l'immagine per OCR"""
+        slots = self._slots(img.shape[:2])
+
+        if img.ndim == 2:
+            current = img
+        else:
+            code = cv2.COLOR_BGRA2GRAY if img.shape[2] == 4 else cv2.COLOR_BGR2GRAY
+            current = cv2.cvtColor(img, code, dst=self._slot(slots, 'gray', img.shape[:2]))
+
+        # Ogni stadio scrive nel proprio buffer: l'input del chiamante non viene mai modificato
+        for index, stage in enumerate(self.stages):
+            if stage == 'scale':
+                if self.scale != 1.0:
+                    w, h = self.output_size(current.shape[1], current.shape[0])
+                    current = cv2.resize(current, (w, h), dst=self._slot(slots, index, (h, w)),
+                                         interpolation=self.interpolation)
+            elif stage == 'sharpen':
+                current = cv2.filter2D(current, -1, self.kernel, dst=self._slot(slots, index, current.shape))
+            elif stage == 'invert':
+                current = cv2.bitwise_not(current, dst=self._slot(slots, index, current.shape))
+            elif stage == 'threshold':
+                dst = self._slot(slots, index, current.shape)
+                if self.threshold == 'otsu':
+                    _, current = cv2.threshold(current, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU, dst=dst)
+                elif self.threshold == 'adaptive':
+                    # Soglia locale: regge i riquadri di embed e le evidenziazioni con sfondo diverso
+                    current = cv2.adaptiveThreshold(current, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY,
+                                                    self.adaptive_block, self.adaptive_c, dst=dst)
+                else:
+                    _, current = cv2.threshold(current, self.threshold, 255, cv2.THRESH_BINARY, dst=dst)
+            elif stage == 'morph':
+                # Chiusura sul fondo bianco: elimina i puntini scuri isolati lasciati dalla soglia
+                current = cv2.morphologyEx(current, cv2.MORPH_CLOSE, self.morph_kernel,
+                                           dst=self._slot(slots, index, current.shape))
+        return current
+
+    __call__ = process
+
+def load_profiles(config):
+    """
+    Profili di preprocessing da config.ini: 'default' è la sezione [preprocessing],
+    'binary' è predefinito e ogni sezione [preprocessing:nome] aggiunge o ridefinisce
+    un profilo (con profile=binary si parte da quel profilo predefinito).
+    """
+    profiles = {name: PreprocessingPipeline(**params) for name, params in PROFILES.items()}
+    if config.has_section('preprocessing'):
+        profiles['default'] = PreprocessingPipeline.from_config(config['preprocessing'])
+    for section_name in config.sections():
+        if section_name.startswith(PROFILE_SECTION_PREFIX):
+            name = section_name[len(PROFILE_SECTION_PREFIX):].strip()
+            profiles[name] = PreprocessingPipeline.from_config(config[section_name], name if name in PROFILES else 'default')
+    return profiles
+
+def select_profile(profiles, name):
+    """Profilo di preprocessing per nome, con errore esplicito se non esiste"""
+    try:
+        return profiles[name or 'default']
+    except KeyError:
+        raise ValueError(f"Profilo di preprocessing sconosciuto: {name} (disponibili: {', '.join(profiles)})")
@@ -0,0 +1,267 @@
+import glob
+import json
+import mmap
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+from datetime import datetime
+import numpy as np
+from change_module import FrameChangeDetector
+
+SESSION_PREFIX = "session_"
+CHUNK_PATTERN = "chunk_*.rec"
+META_FILE = "meta.json"
+RECORD_MAGIC = b"FRM1"
+# magic, timestamp (epoch), larghezza, altezza, canali, lunghezza dei dati compressi
+RECORD_HEADER = struct.Struct('<4sdIIII')
+
+def chunk_files(session_path):
+    """Chunk di una sessione in ordine di scrittura"""
+    return sorted(glob.glob(os.path.join(session_path, CHUNK_PATTERN)))
+
+def scan_records(data):
+    """
+    Scorre i record di un chunk (bytes o mmap) e restituisce
+    (timestamp, larghezza, altezza, canali, offset dati, lunghezza). Un record
+    troncato in coda (chiusura improvvisa durante la scrittura) viene ignorato.
+    """
+    records = []
+    offset = 0
+    size = len(data)
+    while offset + RECORD_HEADER.size <= size:
+        magic, timestamp, width, height, channels, length = RECORD_HEADER.unpack_from(data, offset)
+        start = offset + RECORD_HEADER.size
+        if magic != RECORD_MAGIC or start + length > size:
+            break
+        records.append((timestamp, width, height, channels, start, length))
+        offset = start + length
+    return records
+
+class RecordingReader:
+    """
+    Lettura di una sessione registrata: i chunk sono aperti in memory map e ogni
+    frame viene decompresso solo quando richiesto.
+    """
+    def __init__(self, session_path):
+        self.path = session_path
+        self.origin = (0, 0)
+        meta_path = os.path.join(session_path, META_FILE)
+        if os.path.exists(meta_path):
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                self.origin = tuple(json.load(f).get('origin', self.origin))
+
+        self._maps = []
+        self.records = []  # (timestamp, indice del chunk, larghezza, altezza, canali, offset, lunghezza)
+        for chunk_path in chunk_files(session_path):
+            if os.path.getsize(chunk_path) == 0:
+                continue
+            with open(chunk_path, 'rb') as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            chunk_index = len(self._maps)
+            self._maps.append(data)
+            for timestamp, width, height, channels, offset, length in scan_records(data):
+                self.records.append((timestamp, chunk_index, width, height, channels, offset, length))
+        if not self.records:
+            raise FileNotFoundError(f"Nessun frame registrato in: {session_path}")
+
+    def __len__(self):
+        return len(self.records)
+
+    @property
+    def timestamps(self):
+        return [record[0] for record in self.records]
+
+    def read(self, index):
+        """Frame di indice index come array (altezza, larghezza, canali)"""
+        _, chunk_index, width, height, channels, offset, length = self.records[index]
+        raw = zlib.decompress(self._maps[chunk_index][offset:offset + length])
+        return np.frombuffer(raw, dtype=np.uint8).reshape(height, width, channels)
+
+    def close(self):
+        for data in self._maps:
+            data.close()
+        self._maps = []
+
+class SessionRecorder:
+    """
+    Registratore opzionale della sessione. Il thread di cattura consegna il frame
+    con submit(), che non copia, non comprime e non scrive: mette solo il frame in
+    una coda limitata (se è piena il frame viene scartato e contato). Un thread in
+    background scarta i frame invariati, comprime con zlib quelli cambiati e li
+    accoda al chunk corrente. I chunk ruotano a chunk_mb e quelli delle sessioni
+    precedenti, dai più vecchi, vengono cancellati per restare entro budget_mb; i
+    chunk della sessione in corso non vengono mai cancellati: quando non resta
+    spazio la registrazione si sospende e i frame successivi sono contati come
+    oltre budget. chunk_mb maggiore di budget_mb viene ridotto a budget_mb.
+    """
+    def __init__(self, path, budget_mb=2048, chunk_mb=64, compression=1, sensitivity=1, queue_size=16):
+        if budget_mb <= 0 or chunk_mb <= 0:
+            raise ValueError(f"budget_mb e chunk_mb devono essere positivi: {budget_mb}, {chunk_mb}")
+        if chunk_mb > budget_mb:
+            print(f"chunk_mb ({chunk_mb}) maggiore di budget_mb ({budget_mb}): chunk ridotti a {budget_mb} MB")
+            chunk_mb = budget_mb
+        self.path = path
+        self.budget_bytes = int(budget_mb * 1024 * 1024)
+        self.chunk_bytes = int(chunk_mb * 1024 * 1024)
+        self.compression = compression
+        self.change_detector = FrameChangeDetector(sensitivity=sensitivity)
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.session_path = None
+        self._thread = None
+        self._chunk = None
+        self._chunk_size = 0
+        self._chunk_index = 0
+        self._suspended = False  # Budget esaurito dai soli chunk della sessione in corso
+        self.frames_written = 0
+        self.frames_unchanged = 0
+        self.frames_dropped = 0
+        self.frames_over_budget = 0
+        self.raw_bytes = 0
+        self.bytes_written = 0
+        self.chunks_deleted = 0
+
+    def start(self, origin=(0, 0)):
+        """Crea la cartella della sessione e avvia il thread di scrittura"""
+        self.session_path = os.path.join(self.path, SESSION_PREFIX + datetime.now().strftime("%Y%m%d_%H%M%S"))
+        os.makedirs(self.session_path, exist_ok=True)
+        with open(os.path.join(self.session_path, META_FILE), 'w', encoding='utf-8') as f:
+            json.dump({'origin': list(origin), 'started_at': time.time()}, f)
+        self._thread = threading.Thread(target=self._run, name="session-recorder", daemon=True)
+        self._thread.start()
+
+    def submit(self, frame, timestamp=None):
+        """Consegna un frame catturato (nessuna copia: il chiamante non deve più modificarlo)"""
+        try:
+            self.queue.put_nowait((timestamp if timestamp is not None else time.time(), frame))
+            return True
+        except queue.Full:
+            self.frames_dropped += 1
+            return False
+
+    def stop(self, timeout=5):
+        """Scrive i frame in coda, chiude il chunk corrente e ferma il thread"""
+        if self._thread is None:
+            return
+        self.queue.put(None)
+        self._thread.join(timeout=timeout)
+        self._thread = None
+
+    def _run(self):
+        try:
+            while True:
+                item = self.queue.get()
+                if item is None:
+                    break
+                try:
+                    self._write(*item)
+                except Exception as e:
+                    print(f"Errore nella registrazione del frame: {e}")
+        finally:
+            self._close_chunk()
+
+    def _write(self, timestamp, frame):
+        """Comprime e accoda un frame cambiato al chunk corrente"""
+        if not self.change_detector.has_changed(frame):
+            self.frames_unchanged += 1
+            return
+        if self._suspended:
+            self.frames_over_budget += 1
+            return
+        frame = np.ascontiguousarray(frame)
+        data = zlib.compress(frame, self.compression)
+        height, width = frame.shape[:2]
+        channels = frame.shape[2] if frame.ndim == 3 else 1
+
+        record_size = RECORD_HEADER.size + len(data)
+        if self._chunk is None or self._chunk_size + record_size > self.chunk_bytes:
+            if not self._rotate():
+                self.frames_over_budget += 1
+                return
+        self._chunk.write(RECORD_HEADER.pack(RECORD_MAGIC, timestamp, width, height, channels, len(data)))
+        self._chunk.write(data)
+        self._chunk.flush()  # Dopo un crash il chunk resta leggibile fino all'ultimo frame
+        self._chunk_size += record_size
+        self.frames_written += 1
+        self.raw_bytes += frame.nbytes
+        self.bytes_written += record_size
+
+    def _close_chunk(self):
+        if self._chunk is not None:
+            self._chunk.close()
+            self._chunk = None
+
+    def _rotate(self):
+        """
+        Apre un nuovo chunk, prima liberando spazio se il budget verrebbe superato.
+        Restituisce False (nessun chunk aperto) se lo spazio non si libera.
+        """
+        self._close_chunk()
+        if not self._enforce_budget(self.chunk_bytes):
+            # Le sessioni precedenti sono già state cancellate: lo spazio non può più liberarsi
+            self._suspended = True
+            print(f"Budget della registrazione esaurito ({self.budget_bytes / 1048576:.1f} MB): "
+                  f"registrazione sospesa")
+            return False
+        self._chunk_index += 1
+        self._chunk = open(os.path.join(self.session_path, f"chunk_{self._chunk_index:06d}.rec"), 'wb')
+        self._chunk_size = 0
+        return True
+
+    def _enforce_budget(self, reserve):
+        """
+        Cancella i chunk più vecchi delle sessioni precedenti finché lo spazio usato più
+        reserve sta nel budget; False se non basta (i chunk della sessione in corso restano).
+        """
+        chunks = sorted(glob.glob(os.path.join(self.path, SESSION_PREFIX + "*", CHUNK_PATTERN)),
+                        key=os.path.getmtime)
+        total = sum(os.path.getsize(chunk) for chunk in chunks)
+        for chunk in chunks:
+            if total + reserve <= self.budget_bytes:
+                break
+            if os.path.dirname(chunk) == self.session_path:
+                continue
+            total -= os.path.getsize(chunk)
+            os.remove(chunk)
+            self.chunks_deleted += 1
+            session = os.path.dirname(chunk)
+            if not glob.glob(os.path.join(session, CHUNK_PATTERN)):
+                for name in os.listdir(session):
+                    os.remove(os.path.join(session, name))
+                os.rmdir(session)
+        return total + reserve <= self.budget_bytes
+
+    def stats(self):
+        """Frame scritti, invariati e scartati, byte su disco e rapporto di compressione"""
+        return {
+            'written': self.frames_written,
+            'unchanged': self.frames_unchanged,
+            'dropped': self.frames_dropped,
+            'over_budget': self.frames_over_budget,
+            'queued': self.queue.qsize(),
+            'bytes_written': self.bytes_written,
+            'compression_ratio': self.raw_bytes / self.bytes_written if self.bytes_written else 0.0,
+            'chunks_deleted': self.chunks_deleted,
+        }
+
+    def format_stats(self):
+        """Riepilogo leggibile per il log"""
+        s = self.stats()
+        return (f"registrazione: {s['written']} frame ({s['bytes_written'] / 1048576:.1f} MB, "
+                f"compressione {s['compression_ratio']:.0f}x), invariati {s['unchanged']}, "
+                f"scartati {s['dropped']}, oltre budget {s['over_budget']}, chunk cancellati {s['chunks_deleted']}")
+
+def recorder_from_config(section):
+    """SessionRecorder dalla sezione [recorder] di config.ini, None se la registrazione non è abilitata"""
+    if not section.getboolean('enabled', False):
+        return None
+    return SessionRecorder(
+        path=section.get('path', 'recordings'),
+        budget_mb=section.getfloat('budget_mb', 2048),
+        chunk_mb=section.getfloat('chunk_mb', 64),
+        compression=section.getint('compression', 1),
+        sensitivity=section.getint('sensitivity', 1),
+        queue_size=section.getint('queue_size', 16)
+    )
@@ -0,0 +1,90 @@
+import threading
+import time
+
+class AdaptiveScheduler:
+    """
+    Scheduler del polling a scadenze assolute: il periodo non deriva con il tempo
+    di elaborazione. Dopo un'attività (frame cambiato) si torna subito
+    all'intervallo attivo, poi a ogni tick senza cambiamenti l'intervallo cresce
+    di un fattore decay fino all'intervallo di inattività.
+    clock (secondi, monotono) è sostituibile nei test.
+    """
+    def __init__(self, active_interval=2.0, idle_interval=10.0, decay=1.5, miss_tolerance=0.05, clock=time.monotonic):
+        self.condition = threading.Condition()
+        self.clock = clock
+        self.active_interval = float(active_interval)
+        self.idle_interval = max(float(idle_interval), self.active_interval)
+        self.decay = max(1.0, float(decay))
+        self.miss_tolerance = miss_tolerance
+        self.current_interval = self.active_interval
+        self.next_deadline = None
+        self.started_at = None
+        self.ticks = 0
+        self.missed = 0
+        self.total_lateness = 0.0
+        self.max_lateness = 0.0
+
+    def set_active_interval(self, active_interval):
+        """Aggiorna l'intervallo attivo (es. modificato dalla GUI durante il monitoraggio)"""
+        with self.condition:
+            self.active_interval = float(active_interval)
+            self.idle_interval = max(self.idle_interval, self.active_interval)
+            self.current_interval = max(self.current_interval, self.active_interval)
+
+    def notify_activity(self):
+        """Segnala un cambiamento: si torna all'intervallo attivo e la prossima scadenza si avvicina"""
+        with self.condition:
+            self.current_interval = self.active_interval
+            if self.next_deadline is not None:
+                self.next_deadline = min(self.next_deadline, self.clock() + self.active_interval)
+                self.condition.notify_all()
+
+    def wait(self, stop_event):
+        """Attende la prossima scadenza; restituisce False se stop_event viene impostato"""
+        with self.condition:
+            if self.next_deadline is None:
+                self.started_at = self.next_deadline = self.clock()
+
+            # La scadenza viene riletta a ogni risveglio: notify_activity può anticiparla
+            while True:
+                if stop_event.is_set():
+                    return False
+                remaining = self.next_deadline - self.clock()
+                if remaining <= 0:
+                    break
+                self.condition.wait(min(remaining, 0.5))
+
+            deadline = self.next_deadline
+            now = self.clock()
+            lateness = now - deadline
+            self.ticks += 1
+            if lateness > self.miss_tolerance:
+                self.missed += 1
+                self.total_lateness += lateness
+                self.max_lateness = max(self.max_lateness, lateness)
+
+            # Prossima scadenza assoluta; se si è in ritardo di più di un periodo non si recuperano i tick persi
+            self.next_deadline = deadline + self.current_interval
+            if self.next_deadline < now:
+                self.next_deadline = now + self.current_interval
+            self.current_interval = min(self.idle_interval, self.current_interval * self.decay)
+        return True
+
+    def stats(self):
+        """Tick eseguiti, scadenze mancate, ritardi e frequenza di polling effettiva"""
+        with self.condition:
+            elapsed = self.clock() - self.started_at if self.started_at else 0.0
+            return {
+                'ticks': self.ticks,
+                'missed': self.missed,
+                'avg_lateness_ms': self.total_lateness * 1000 / max(self.missed, 1),
+                'max_lateness_ms': self.max_lateness * 1000,
+                'effective_rate_hz': self.ticks / elapsed if elapsed > 0 else 0.0,
+                'current_interval': self.current_interval,
+            }
+
+    def format_stats(self):
+        """Riepilogo leggibile per il log"""
+        s = self.stats()
+        return (f"polling {s['effective_rate_hz']:.2f} Hz, intervallo attuale {s['current_interval']:.1f} s, "
+                f"scadenze mancate {s['missed']}/{s['ticks']} (max ritardo {s['max_lateness_ms']:.0f} ms)")
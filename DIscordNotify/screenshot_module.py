@@ -8,6 +8,9 @@ import time
 import mss
 from dataclasses import dataclass
 import os
+from capture_module import MssCapture
+from preprocessing_module import PreprocessingPipeline
+from template_module import TemplateMatcher, TemplateCache
 
 class AreaSelector:
     def __init__(self, callback):
@@ -138,24 +141,26 @@ class AreaSelector:
         self.callback(None)
 
 class ScreenshotManager:
-    def __init__(self, monitor_area=None, templates_dir=None):
+    def __init__(self, monitor_area=None, templates_dir=None, template_scales=(1.0,), frame_source=None):
         self.monitor_area = monitor_area
-        self.loaded_templates = {}
-        if templates_dir:
-            if not os.path.isdir(templates_dir):
-                raise FileNotFoundError(f"La directory dei template non è stata trovata: {templates_dir}")
-            
-            for filename in os.listdir(templates_dir):
-                if filename.lower().endswith(('.png', '.jpg', '.jpeg')):
-                    path = os.path.join(templates_dir, filename)
-                    template_data = cv2.imread(path, 0) # Carica in scala di grigi
-                    if template_data is not None:
-                        self.loaded_templates[filename] = template_data
-                    else:
-                        print(f"Attenzione: impossibile caricare il template {path}")
-            print(f"Caricati {len(self.loaded_templates)} template dalla directory: {templates_dir}")
+        self.capture = frame_source or MssCapture()
+        self.preprocessor = PreprocessingPipeline()
+        self.templates_dir = templates_dir
+        self.set_template_scales(template_scales)
+
+    def set_template_scales(self, scales):
+        """Imposta le scale dei template (zoom di Discord) e ricarica i template"""
+        self.template_matcher = TemplateMatcher(scales=scales)
+        self.template_cache = TemplateCache(scales=scales)
+        if self.templates_dir:
+            loaded = self.template_matcher.load_directory(self.templates_dir)
+            print(f"Caricati {loaded} template dalla directory: {self.templates_dir}")
+
+    @property
+    def loaded_templates(self):
+        """Template caricati (nome file -> Template)"""
+        return self.template_matcher.templates
 
-    
     def set_monitor_area(self, area):
         """Imposta l'area di monitoraggio"""
         self.monitor_area = area
@@ -169,30 +174,32 @@ class ScreenshotManager:
         screenshot = pyautogui.screenshot(region=(x, y, w, h))
         return screenshot
     
-    def capture_and_preprocess(self):
-        """Cattura screenshot e preprocessa per OCR"""
-        screenshot = self.capture_screenshot()
-        
-        # Converti per OpenCV
-        img_cv = cv2.cvtColor(np.array(screenshot), cv2.COLOR_RGB2BGR)
+    def capture_frame(self):
+        """Cattura il frame grezzo dell'area monitorata come vista BGRA (sessione mss persistente)"""
+        if not self.monitor_area:
+            raise ValueError("Area di monitoraggio non impostata")
+        return self.capture.grab(self.monitor_area)
+
+    def set_frame_source(self, frame_source):
+        """Sostituisce la sorgente dei frame (schermo dal vivo o replay, vedi source_module)"""
+        self.capture.close()
+        self.capture = frame_source
 
-        # 1. Grayscale
-        gray = cv2.cvtColor(img_cv, cv2.COLOR_BGR2GRAY)
+    def close(self):
+        """Chiude la sessione di cattura"""
+        self.capture.close()
 
-        # 2. Slight upscale (1.5x)
-        scale_percent = 150
-        width = int(gray.shape[1] * scale_percent / 100)
-        height = int(gray.shape[0] * scale_percent / 100)
-        gray = cv2.resize(gray, (width, height), interpolation=cv2.INTER_CUBIC)
+    def capture_and_preprocess(self):
+        """Cattura screenshot e preprocessa per OCR"""
+        return self.preprocess(self.capture_frame())
 
-        # 3. Sharpen
-        kernel = np.array([[0, -1, 0], [-1, 5,-1], [0, -1, 0]])
-        sharp = cv2.filter2D(gray, -1, kernel)
+    def preprocess(self, img_cv):
+        """Preprocessa un frame BGR o BGRA per OCR (buffer riutilizzati, vedi PreprocessingPipeline)"""
+        return self.preprocessor.process(img_cv)
 
-        # 4. Invert (white text on black -> black text on white)
-        inverted = cv2.bitwise_not(sharp)
-        
-        return inverted
+    def set_preprocessing(self, preprocessor):
+        """Imposta la pipeline di preprocessing"""
+        self.preprocessor = preprocessor
     
     def show_preprocessed_image(self, img, window_title="Preprocessed Image", filename="preprocessed_debug.png"):
         """Mostra e salva l'immagine preprocessata per debug"""
@@ -201,69 +208,51 @@ class ScreenshotManager:
         cv2.waitKey(0)
         cv2.destroyAllWindows() 
 
-    def find_template(self, template_path, threshold=0.8):
+    def find_template(self, template_path, threshold=0.8, frame=None):
         """
-        Cerca un'immagine template all'interno dell'area monitorata.
+        Cerca un'immagine template all'interno dell'area monitorata (o del frame fornito).
         Restituisce le coordinate del match se trovato, altrimenti None.
         """
+        return self.find_templates([template_path], threshold, frame).get(template_path)
+
+    def find_templates(self, template_paths, threshold=0.8, frame=None):
+        """
+        Cerca più template (file) su un unico frame dell'area monitorata: se frame non è
+        fornito viene catturato una sola volta. I template decodificati restano in una
+        cache LRU e vengono riletti solo se il file cambia.
+        Restituisce {percorso: (x, y, larghezza, altezza)} in coordinate globali per i template trovati.
+        """
         if not self.monitor_area:
             raise ValueError("Area di monitoraggio non impostata")
+        if frame is None:
+            frame = self.capture_frame()
 
-        # Cattura lo screenshot dell'area
-        screenshot_pil = self.capture_screenshot()
-        screenshot_cv = cv2.cvtColor(np.array(screenshot_pil), cv2.COLOR_RGB2BGR)
-        
-        # Carica il template
-        template = cv2.imread(template_path)
-        if template is None:
-            raise FileNotFoundError(f"Immagine template non trovata a: {template_path}")
-
-        # Esegui il template matching
-        res = cv2.matchTemplate(screenshot_cv, template, cv2.TM_CCOEFF_NORMED)
-        min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(res)
-
-        if max_val >= threshold:
-            # Le coordinate sono relative all'area dello screenshot
-            top_left = max_loc
-            h, w, _ = template.shape
-            bottom_right = (top_left[0] + w, top_left[1] + h)
-            
-            # Converte le coordinate in coordinate globali dello schermo
-            global_x = self.monitor_area[0] + top_left[0]
-            global_y = self.monitor_area[1] + top_left[1]
-            
-            return (global_x, global_y, w, h)
-        
-        return None
+        templates = [self.template_cache.get(path) for path in template_paths]
+        matches = self.template_matcher.match_templates(frame, templates, threshold, context="find_template")
+
+        # Converte le coordinate (relative all'area) in coordinate globali dello schermo
+        area_x, area_y = self.monitor_area[0], self.monitor_area[1]
+        return {path: (area_x + match.x, area_y + match.y, match.width, match.height)
+                for path, match in matches.items()}
 
-    def find_templates_in_image(self, image_to_search, threshold=0.8):
+    def find_templates_in_image(self, image_to_search, threshold=0.8, context=None):
         """
-        Cerca i template pre-caricati all'interno di un'immagine fornita.
-        Restituisce un set con i nomi dei file dei template trovati.
+        Cerca i template pre-caricati all'interno di un'immagine fornita (PIL, oppure
+        frame BGR/BGRA grezzo). Restituisce un set con i nomi dei file dei template trovati.
+        context (es. nome dell'area) permette di cercare prima dove il template è stato visto l'ultima volta.
         """
         if not self.loaded_templates:
             print("Attenzione: Nessun template è stato caricato. La ricerca non verrà eseguita.")
             return set()
 
         if isinstance(image_to_search, Image.Image):
-            image_cv = cv2.cvtColor(np.array(image_to_search), cv2.COLOR_RGB2BGR)
+            image_cv = cv2.cvtColor(np.array(image_to_search.convert('RGB')), cv2.COLOR_RGB2BGR)
         elif isinstance(image_to_search, np.ndarray):
             image_cv = image_to_search
         else:
             raise TypeError("Il formato dell'immagine non è supportato. Fornire un'immagine PIL o un array NumPy.")
 
-        search_gray = cv2.cvtColor(image_cv, cv2.COLOR_BGR2GRAY)
-        
-        found_templates = set()
-
-        for template_filename, template_data in self.loaded_templates.items():
-            res = cv2.matchTemplate(search_gray, template_data, cv2.TM_CCOEFF_NORMED)
-            min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(res)
-
-            if max_val >= threshold:
-                found_templates.add(template_filename)
-        
-        return found_templates
+        return self.template_matcher.find(image_cv, threshold=threshold, context=context)
 
 @dataclass
 class ScreenshotResult:
@@ -0,0 +1,157 @@
+import bisect
+
+# Righe iniziali provate come ancora dell'allineamento: la prima riga visibile è spesso
+# tagliata dal bordo dell'area e letta in modo diverso a ogni frame
+ANCHOR_LINES = 3
+# Righe consecutive in comune perché l'allineamento valga (una riga come "Balance: 1000"
+# si ripete in tutti i messaggi e da sola non dice nulla)
+MIN_COMMON_LINES = 2
+
+class MessageSegmenter:
+    """
+    Segmentazione in streaming delle righe OCR in messaggi: un messaggio inizia su una
+    riga con parola chiave e prosegue fino alla successiva (single_line: solo la riga).
+    Ricorda le righe del frame precedente e dove iniziano i messaggi; il frame nuovo
+    viene allineato al precedente (la chat scorre verso l'alto) e vengono ricostruiti
+    solo i messaggi dalla prima riga cambiata in poi. I messaggi rimasti uguali sono
+    già stati valutati al frame in cui sono comparsi e non vengono restituiti di nuovo,
+    a meno che il chiamante non li abbia ancora dichiarati registrati (settle): un invio
+    fallito viene così ritentato finché il messaggio resta sullo schermo.
+    """
+    def __init__(self, keyword_matcher, single_line=False, skip_prefix=None):
+        self.keyword_matcher = keyword_matcher
+        self.single_line = single_line
+        self.skip_prefix = skip_prefix  # Righe (non di inizio) escluse dal testo del messaggio
+        self.frames = 0
+        self.lines_seen = 0
+        self.lines_segmented = 0
+        self.reset()
+
+    def reset(self):
+        """Dimentica il frame precedente: il prossimo viene segmentato per intero"""
+        self.lines = []
+        self.starts = []  # Indici in self.lines delle righe che aprono un messaggio
+        self.pending = {}  # Inizio -> testo dei messaggi restituiti e non ancora registrati
+        self.texts = {}  # Inizio -> testo di ogni messaggio del frame
+
+    def common_length(self, lines, anchor, shift):
+        """Righe uguali consecutive tra lines[anchor:] e le righe precedenti da shift"""
+        previous = self.lines
+        length = min(len(lines) - anchor, len(previous) - shift)
+        # Caso comune (solo scorrimento o righe aggiunte in fondo): un solo confronto in C
+        if lines[anchor:anchor + length] == previous[shift:shift + length]:
+            return length
+        for offset in range(length):
+            if lines[anchor + offset] != previous[shift + offset]:
+                return offset
+        return length
+
+    def align(self, lines):
+        """(anchor, shift, common): lines[anchor:anchor+common] == righe precedenti[shift:shift+common]"""
+        previous = self.lines
+        best = (0, 0, 0)
+        for anchor in range(min(ANCHOR_LINES, len(lines))):
+            shift = -1
+            while True:
+                try:
+                    shift = previous.index(lines[anchor], shift + 1)
+                except ValueError:
+                    break
+                common = self.common_length(lines, anchor, shift)
+                if common > best[2]:
+                    best = (anchor, shift, common)
+                if anchor + common == len(lines) or shift + common == len(previous):
+                    break  # Nessuno scorrimento maggiore può dare più righe in comune
+            if best[2] >= MIN_COMMON_LINES or (best[2] and best[0] + best[2] == len(lines)):
+                return best
+        return (0, 0, 0)
+
+    def feed(self, lines):
+        """
+        Righe (non vuote, già ripulite) del frame corrente -> testi dei messaggi nuovi o
+        modificati rispetto al frame precedente. Il primo frame, o uno che non si
+        allinea al precedente, restituisce tutti i messaggi visibili.
+        """
+        anchor, shift, common = self.align(lines)
+        changed = anchor + common  # Prima riga diversa dal frame precedente
+        unchanged = changed == len(lines) and shift + common == len(self.lines)
+
+        # Inizi dei messaggi nella parte allineata, riportati agli indici del frame nuovo
+        first = bisect.bisect_left(self.starts, shift)
+        last = bisect.bisect_left(self.starts, shift + common)
+        carried = [start - shift + anchor for start in self.starts[first:last]]
+
+        if not common or any(self.keyword_matcher.search(line) for line in lines[:anchor]):
+            # Nessun allineamento, o un inizio di messaggio tra le righe di testa non allineate
+            resume = 0
+        elif unchanged:
+            resume = len(lines)
+        elif self.single_line:
+            resume = changed
+        else:
+            # Il messaggio che contiene la prima riga cambiata va ricostruito da capo
+            position = bisect.bisect_left(carried, changed)
+            resume = carried[position - 1] if position else 0
+        carried = carried[:bisect.bisect_left(carried, resume)]
+        # Testi e messaggi in sospeso del frame precedente, riportati agli indici del frame nuovo
+        known = {start - shift + anchor: text for start, text in self.texts.items() if shift <= start < shift + common}
+        was_pending = {start - shift + anchor: message for start, message in self.pending.items()
+                       if shift <= start < shift + common}
+        pending = {start: message for start, message in was_pending.items() if start < resume}
+        texts = {start: text for start, text in known.items() if start < resume}
+
+        messages = list(pending.values())
+
+        def emit(start, text):
+            texts[start] = text
+            if known.get(start) == text and start not in was_pending:
+                return  # Ricostruito (poteva continuare oltre la riga cambiata) ma identico e già registrato
+            pending[start] = text
+            messages.append(text)
+
+        current = []
+        current_start = resume
+        for index in range(resume, len(lines)):
+            line = lines[index]
+            if self.keyword_matcher.search(line):
+                carried.append(index)
+                if self.single_line:
+                    emit(index, line)
+                    continue
+                if current:
+                    emit(current_start, '\n'.join(current))
+                current = [line]
+                current_start = index
+            elif not self.single_line and not (self.skip_prefix and line.startswith(self.skip_prefix)):
+                current.append(line)
+        if current:
+            emit(current_start, '\n'.join(current))
+
+        self.lines = lines
+        self.starts = carried
+        self.pending = pending
+        self.texts = texts
+        self.frames += 1
+        self.lines_seen += len(lines)
+        self.lines_segmented += len(lines) - resume
+        return messages
+
+    def settle(self, message):
+        """Il messaggio è già registrato (o scartato): non va più restituito finché non cambia"""
+        for start, pending in list(self.pending.items()):
+            if pending == message:
+                del self.pending[start]
+
+    def stats(self):
+        """Frame, righe ricevute e righe effettivamente segmentate"""
+        return {
+            'frames': self.frames,
+            'lines_seen': self.lines_seen,
+            'lines_segmented': self.lines_segmented,
+        }
+
+    def format_stats(self):
+        """Statistiche in una riga di log"""
+        ratio = self.lines_segmented / self.lines_seen * 100 if self.lines_seen else 0.0
+        return (f"segmentazione: {self.lines_segmented} righe analizzate su {self.lines_seen} "
+                f"({ratio:.0f}%) in {self.frames} frame")
@@ -0,0 +1,201 @@
+import re
+from dataclasses import dataclass, field
+
+@dataclass
+class eliz_data_trade:
+    limit_order: bool
+    token_name: str
+    bought_token_amount: int
+    balance: int
+    entry_price: float
+    stop_loss: any
+    take_profit: any
+    e_retest: bool
+    side: str  # 'Buy' or 'Sell'
+
+@dataclass
+class classic_data_trade:
+    limit_order: bool
+    token_name: str
+    balance: int
+    entry_price: float
+    stop_loss: any
+    take_profit: any
+    side: str  # 'Buy' or 'Sell'
+    entry_range: list = field(default_factory=list)  # Tutti i prezzi di "Entry: a-b-c"
+
+def to_int(value):
+    try:
+        return int(value)
+    except ValueError:
+        return 0
+
+def to_float(value):
+    try:
+        return float(value)
+    except ValueError:
+        return 0.0
+
+def to_float_or_text(value):
+    """Numero se possibile, altrimenti il testo (es. 'Stop Loss: breakeven')"""
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+def to_bool(value):
+    return value.lower() in ['true', 'yes', '1', 'si', 'sì']
+
+def to_range(value):
+    """'2905-2882 - 2860' -> [2905.0, 2882.0, 2860.0]"""
+    return [float(number) for number in RANGE_SEPARATOR.split(value) if NUMBER.match(number)]
+
+# Righe "Etichetta: valore" dei messaggi Eliz: etichetta -> (campo, conversione)
+ELIZ_FIELDS = {
+    'Token Name': ('token_name', str),
+    'Bought Token Amount': ('bought_token_amount', to_int),
+    'Balance': ('balance', to_int),
+    'Entry Price': ('entry_price', to_float),
+    'Stop Loss': ('stop_loss', to_float_or_text),
+    'Take Profit': ('take_profit', to_float_or_text),
+    'EP Retest': ('e_retest', to_bool),
+}
+# Segnali classici su una riga ("Long: ETH Entry: 2905-2882 SL: 2790 TP: 3000")
+CLASSIC_FIELDS = {
+    'Entry': ('entry_range', to_range),
+    'SL': ('stop_loss', to_float_or_text),
+    'TP': ('take_profit', to_float_or_text),
+}
+
+RANGE_SEPARATOR = re.compile(r'\s*-\s*')
+NUMBER = re.compile(r'\d+\.?\d*$')
+# Riga che termina con LIMIT ORDER (spazi esclusi), come line.strip().endswith("LIMIT ORDER")
+LIMIT_ORDER = re.compile(r'LIMIT ORDER[^\S\n]*$', re.MULTILINE)
+
+def signal_side(text):
+    """'Buy'/'Sell' dall'ultima riga che contiene long o short ("long" vince nella stessa riga)"""
+    lowered = text.lower()
+    position = max(lowered.rfind('long'), lowered.rfind('short'))
+    if position < 0:
+        return ""
+    start = lowered.rfind('\n', 0, position) + 1
+    end = lowered.find('\n', position)
+    return 'Buy' if 'long' in lowered[start:end if end >= 0 else len(lowered)] else 'Sell'
+
+class TradeParser:
+    """
+    Parser dei segnali guidato dalle tabelle dei campi: line_fields sono le righe
+    "Etichetta: valore" (Eliz), inline_fields i campi dentro la riga dei segnali classici
+    ("Long: ETH Entry: 2905-2882 SL: 2790"). Le tabelle sono compilate in un'unica
+    espressione che inizia con caratteri letterali, così il motore C di re salta
+    direttamente ai punti candidati e scorre il testo una volta sola.
+    """
+    def __init__(self, line_fields, inline_fields=None):
+        self.line_fields = line_fields
+        self.inline_fields = inline_fields or {}
+        # Le righe Eliz iniziano dopo un a capo: il testo viene preceduto da '\n'
+        branches = [r'\n[^\S\n]*(%s):([^\n]*)' % '|'.join(map(re.escape, line_fields))]
+        if self.inline_fields:
+            branches.append(r'(%s):[ \t]*((?:[\d.]+[ \t]*-[ \t]*)*[\d.]+|[^\s]+)'
+                            % '|'.join(map(re.escape, self.inline_fields)))
+            branches.append(r'(?:Long|long|LONG|Short|short|SHORT)[ \t]*:[ \t]*([A-Za-z0-9]+)')
+        else:
+            branches[0] += '()()()'  # Gruppi inline sempre vuoti: findall dà comunque 5 valori
+        self.pattern = re.compile('|'.join(branches))
+
+    def scan(self, text):
+        """
+        Campi trovati (campo -> valore convertito), più 'side' ('Buy'/'Sell'),
+        'limit_order' e 'token' (la parola dopo "Long:"/"Short:"). A parità di campo
+        vince l'ultima occorrenza, come nei parser originali riga per riga.
+        """
+        fields = {}
+        for label, value, inline, inline_value, token in self.pattern.findall('\n' + text):
+            if label:
+                name, convert = self.line_fields[label]
+                if ':' in value:  # Come line.replace("Etichetta:", "") dei parser originali
+                    value = value.replace(label + ':', "")
+                fields[name] = convert(value.strip())
+            elif inline:
+                name, convert = self.inline_fields[inline]
+                fields[name] = convert(inline_value)
+            elif 'token' not in fields:
+                fields['token'] = token
+        if side := signal_side(text):
+            fields['side'] = side
+        if LIMIT_ORDER.search(text):
+            fields['limit_order'] = True
+        return fields
+
+ELIZ_PARSER = TradeParser(ELIZ_FIELDS)
+# I segnali classici possono usare anche le righe Eliz (Entry Price, Stop Loss, ...)
+SIGNAL_PARSER = TradeParser(ELIZ_FIELDS, CLASSIC_FIELDS)
+
+def scan_signal(text):
+    """Tutti i campi Eliz e classici del testo in una passata"""
+    return SIGNAL_PARSER.scan(text)
+
+def default_eliz_trade():
+    """Trade vuoto restituito quando il parsing fallisce (come i parser originali)"""
+    return eliz_data_trade(limit_order=False, token_name="", bought_token_amount=0, balance=0, entry_price=0.0,
+                           stop_loss="", take_profit="", e_retest=False, side="")
+
+def default_classic_trade():
+    """Segnale vuoto restituito quando il parsing fallisce (stessi valori del trade Eliz vuoto)"""
+    return classic_data_trade(limit_order=False, token_name="", balance=0, entry_price=0.0,
+                              stop_loss="", take_profit="", side="")
+
+def parse_eliz_trade(text: str) -> eliz_data_trade:
+    """Dati del trade da un messaggio 'Current Trade' di Eliz (trade vuoto in caso di errore)"""
+    try:
+        fields = ELIZ_PARSER.scan(text)
+    except Exception as e:
+        print(f"Errore nel parsing del trade: {e}")
+        return default_eliz_trade()
+    return eliz_data_trade(
+        limit_order=fields.get('limit_order', False),
+        token_name=fields.get('token_name', ""),
+        bought_token_amount=fields.get('bought_token_amount', 0),
+        balance=fields.get('balance', 0),
+        entry_price=fields.get('entry_price', 0.0),
+        stop_loss=fields.get('stop_loss', ""),
+        take_profit=fields.get('take_profit', ""),
+        e_retest=fields.get('e_retest', False),
+        side=fields.get('side', "")
+    )
+
+def parse_classic_trade(text: str) -> classic_data_trade:
+    """
+    Dati del trade da un segnale classico ("Long: ETH Entry: 2905-2882 SL: 2790 TP: 3000"),
+    segnale vuoto in caso di errore
+    """
+    try:
+        fields = SIGNAL_PARSER.scan(text)
+        token_name = fields.get('token', "")
+        if not token_name:
+            # Senza "Long:"/"Short:" il ticker è la prima parola, saltando l'eventuale LIMIT
+            words = text.split(None, 2)
+            token_name = words[1] if words[:1] == ["LIMIT"] and len(words) > 1 else words[0] if words else ""
+    except Exception as e:
+        print(f"Errore nel parsing del trade: {e}")
+        return default_classic_trade()
+    entry_range = fields.get('entry_range', [])
+    return classic_data_trade(
+        limit_order=fields.get('limit_order', True),
+        token_name=fields.get('token_name') or token_name,
+        balance=fields.get('balance', 1000),
+        entry_price=entry_range[0] if entry_range else fields.get('entry_price', 0.0),
+        stop_loss=fields.get('stop_loss', ""),
+        take_profit=fields.get('take_profit', ""),
+        side=fields.get('side', ""),
+        entry_range=entry_range
+    )
+
+LONG_OR_SHORT = re.compile(r'Lo|Sh')
+
+def clean_classic_signal(text):
+    """Rimuove caratteri prima di Lo/Sh, rimuove w/ e tutto dopo @"""
+    match = LONG_OR_SHORT.search(text)
+    if not match:
+        return ""
+    return text[match.start():].replace("w/", "").partition("@")[0].strip()
@@ -0,0 +1,282 @@
+import bisect
+import glob
+import json
+import os
+import threading
+import time
+import cv2
+import numpy as np
+from capture_module import MssCapture
+from recorder_module import RecordingReader, chunk_files
+
+SOURCE_TYPES = ('live', 'images', 'video', 'raw', 'recording')
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mkv', '.mov', '.webm')
+RAW_FRAMES_FILE = "frames.npy"
+RAW_TIMESTAMPS_FILE = "timestamps.npy"
+RAW_META_FILE = "meta.json"
+
+class EndOfReplay(EOFError):
+    """Il replay ha esaurito i frame registrati"""
+
+class ReplaySource:
+    """
+    Sorgente di frame offline con la stessa interfaccia di MssCapture (la sorgente
+    dal vivo): grab((x, y, larghezza, altezza)) restituisce una vista BGRA sull'area
+    richiesta del frame registrato, le cui coordinate partono da origin.
+
+    Con realtime=True ogni grab restituisce il frame che era sullo schermo al tempo
+    trascorso dall'avvio (i frame intermedi vengono saltati, come dal vivo); con
+    realtime=False ogni grab passa al frame successivo alla massima velocità.
+    Esauriti i frame, grab solleva EndOfReplay e finished diventa True.
+    """
+    def __init__(self, timestamps, realtime=False, origin=(0, 0)):
+        self.timestamps = list(timestamps)  # secondi dal primo frame, non decrescenti
+        self.realtime = realtime
+        self.origin = tuple(origin)
+        self.finished = False
+        self.frames_served = 0
+        self.position = 0
+        self.started_at = None
+        self._lock = threading.Lock()
+        self._cached_index = None
+        self._cached_frame = None
+
+        # Durata dell'ultimo frame: l'intervallo medio tra i frame registrati
+        count = len(self.timestamps)
+        last_gap = (self.timestamps[-1] - self.timestamps[0]) / (count - 1) if count > 1 else 0.0
+        self.duration = (self.timestamps[-1] + last_gap) if count else 0.0
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def read(self, index):
+        """Frame registrato di indice index (BGR, BGRA o grigio)"""
+        raise NotImplementedError
+
+    def _next_index(self):
+        """Indice del frame da restituire, None se il replay è finito"""
+        if not self.realtime:
+            if self.position >= len(self.timestamps):
+                return None
+            self.position += 1
+            return self.position - 1
+
+        now = time.monotonic()
+        if self.started_at is None:
+            self.started_at = now
+        elapsed = now - self.started_at
+        if elapsed >= self.duration:
+            return None
+        return max(0, bisect.bisect_right(self.timestamps, elapsed) - 1)
+
+    def _frame(self, index):
+        """Frame BGRA di indice index, decodificato una sola volta"""
+        if index != self._cached_index:
+            frame = self.read(index)
+            if frame.ndim == 2:
+                frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGRA)
+            elif frame.shape[2] == 3:
+                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2BGRA)
+            self._cached_index = index
+            self._cached_frame = frame
+        return self._cached_frame
+
+    def grab(self, area):
+        """Restituisce l'area (x, y, larghezza, altezza) del frame corrente come vista BGRA"""
+        with self._lock:
+            index = self._next_index()
+            frame = None
+            if index is not None:
+                try:
+                    frame = self._frame(index)
+                except EndOfReplay:
+                    pass  # Il file contiene meno frame di quelli dichiarati
+            if frame is None:
+                self.finished = True
+                raise EndOfReplay(f"Replay terminato dopo {self.frames_served} frame")
+            self.frames_served += 1
+
+        x, y, w, h = area
+        ox, oy = x - self.origin[0], y - self.origin[1]
+        if ox < 0 or oy < 0 or ox + w > frame.shape[1] or oy + h > frame.shape[0]:
+            raise ValueError(f"Area {area} fuori dal frame registrato "
+                             f"(origine {self.origin}, {frame.shape[1]}x{frame.shape[0]})")
+        return frame[oy:oy + h, ox:ox + w]
+
+    def close(self):
+        """Rilascia le risorse della sorgente"""
+        self._cached_frame = None
+        self._cached_index = None
+
+class ImageSequenceSource(ReplaySource):
+    """
+    Sequenza di immagini (cartella o pattern glob) in ordine di nome. I tempi sono
+    index / fps se fps è indicato, altrimenti le date di modifica dei file.
+    """
+    def __init__(self, path, fps=None, realtime=False, origin=(0, 0)):
+        if os.path.isdir(path):
+            files = [os.path.join(path, name) for name in os.listdir(path)
+                     if name.lower().endswith(IMAGE_EXTENSIONS)]
+        else:
+            files = glob.glob(path)
+        self.files = sorted(files)
+        if not self.files:
+            raise FileNotFoundError(f"Nessuna immagine trovata in: {path}")
+
+        if fps:
+            timestamps = [index / fps for index in range(len(self.files))]
+        else:
+            mtimes = np.array([os.path.getmtime(name) for name in self.files])
+            timestamps = np.maximum.accumulate(mtimes - mtimes[0]).tolist()
+        super().__init__(timestamps, realtime, origin)
+
+    def read(self, index):
+        frame = cv2.imread(self.files[index], cv2.IMREAD_UNCHANGED)
+        if frame is None:
+            raise ValueError(f"Immagine non leggibile: {self.files[index]}")
+        return frame
+
+class VideoSource(ReplaySource):
+    """File video letto in sequenza con OpenCV; i tempi derivano dagli fps del file"""
+    def __init__(self, path, realtime=False, origin=(0, 0)):
+        self.capture = cv2.VideoCapture(path)
+        if not self.capture.isOpened():
+            raise FileNotFoundError(f"Video non leggibile: {path}")
+        self.fps = self.capture.get(cv2.CAP_PROP_FPS) or 30.0
+        count = int(self.capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.video_position = 0  # indice del prossimo frame che il decoder restituirà
+        super().__init__([index / self.fps for index in range(count)], realtime, origin)
+
+    def read(self, index):
+        if index < self.video_position:
+            self.capture.set(cv2.CAP_PROP_POS_FRAMES, index)
+            self.video_position = index
+        # I frame saltati in tempo reale vengono solo scartati, senza decodificarli
+        while self.video_position < index:
+            self.capture.grab()
+            self.video_position += 1
+        ok, frame = self.capture.read()
+        if not ok:
+            raise EndOfReplay(f"Video terminato al frame {index}")
+        self.video_position += 1
+        return frame
+
+    def close(self):
+        super().close()
+        self.capture.release()
+
+class RawArchiveSource(ReplaySource):
+    """
+    Archivio di frame grezzi in una cartella: frames.npy (n, altezza, larghezza, 4)
+    BGRA aperto in memory map, timestamps.npy con i tempi in secondi e meta.json con
+    l'origine dei frame sullo schermo. I frame vengono restituiti senza copie.
+    """
+    def __init__(self, path, realtime=False, origin=None):
+        frames_path = os.path.join(path, RAW_FRAMES_FILE)
+        if not os.path.exists(frames_path):
+            raise FileNotFoundError(f"Archivio di frame non trovato: {frames_path}")
+        self.frames = np.load(frames_path, mmap_mode='r')
+
+        timestamps_path = os.path.join(path, RAW_TIMESTAMPS_FILE)
+        if os.path.exists(timestamps_path):
+            timestamps = np.load(timestamps_path).tolist()
+        else:
+            timestamps = [float(index) for index in range(len(self.frames))]
+
+        if origin is None:
+            meta_path = os.path.join(path, RAW_META_FILE)
+            origin = (0, 0)
+            if os.path.exists(meta_path):
+                with open(meta_path, 'r', encoding='utf-8') as f:
+                    origin = tuple(json.load(f).get('origin', origin))
+        super().__init__(timestamps, realtime, origin)
+
+    def read(self, index):
+        return self.frames[index]
+
+    def close(self):
+        super().close()
+        self.frames = None
+
+class RecordingSource(ReplaySource):
+    """Sessione registrata da SessionRecorder (recorder_module): chunk compressi in memory map"""
+    def __init__(self, path, realtime=False, origin=None):
+        self.reader = RecordingReader(path)
+        timestamps = self.reader.timestamps
+        super().__init__([timestamp - timestamps[0] for timestamp in timestamps], realtime,
+                         origin if origin is not None else self.reader.origin)
+
+    def read(self, index):
+        return self.reader.read(index)
+
+    def close(self):
+        super().close()
+        self.reader.close()
+
+def save_raw_archive(path, frames, timestamps=None, origin=(0, 0)):
+    """Scrive una sequenza di frame (stessa dimensione) come archivio leggibile da RawArchiveSource"""
+    frames = list(frames)
+    if not frames:
+        raise ValueError("Nessun frame da salvare")
+    os.makedirs(path, exist_ok=True)
+    first = frames[0]
+    archive = np.lib.format.open_memmap(os.path.join(path, RAW_FRAMES_FILE), mode='w+', dtype=np.uint8,
+                                        shape=(len(frames), first.shape[0], first.shape[1], 4))
+    for index, frame in enumerate(frames):
+        if frame.ndim == 2:
+            frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGRA)
+        elif frame.shape[2] == 3:
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2BGRA)
+        archive[index] = frame
+    archive.flush()
+    del archive
+
+    if timestamps is None:
+        timestamps = [float(index) for index in range(len(frames))]
+    np.save(os.path.join(path, RAW_TIMESTAMPS_FILE), np.asarray(timestamps, dtype=np.float64))
+    with open(os.path.join(path, RAW_META_FILE), 'w', encoding='utf-8') as f:
+        json.dump({'origin': list(origin)}, f)
+
+def detect_source_type(path):
+    """Tipo di sorgente dedotto dal percorso: archivio grezzo, cartella/glob di immagini o video"""
+    if os.path.isdir(path):
+        if os.path.exists(os.path.join(path, RAW_FRAMES_FILE)):
+            return 'raw'
+        return 'recording' if chunk_files(path) else 'images'
+    if path.lower().endswith(VIDEO_EXTENSIONS):
+        return 'video'
+    return 'images'
+
+def create_source(kind='live', path=None, realtime=False, fps=None, origin=None):
+    """Crea la sorgente di frame: 'live' (schermo), 'images', 'video', 'raw', 'recording' o 'auto' (dal percorso)"""
+    if kind == 'auto':
+        kind = detect_source_type(path) if path else 'live'
+    if kind == 'live':
+        return MssCapture()
+    if kind not in SOURCE_TYPES:
+        raise ValueError(f"Tipo di sorgente non valido: {kind}")
+    if not path:
+        raise ValueError(f"La sorgente '{kind}' richiede un percorso")
+    if kind == 'raw':
+        return RawArchiveSource(path, realtime, origin)
+    if kind == 'recording':
+        return RecordingSource(path, realtime, origin)
+    origin = origin or (0, 0)
+    if kind == 'video':
+        return VideoSource(path, realtime, origin)
+    return ImageSequenceSource(path, fps, realtime, origin)
+
+def source_from_config(section):
+    """Crea la sorgente dalla sezione [source] di config.ini"""
+    origin = None
+    if section.get('origin'):
+        origin = tuple(int(value) for value in section['origin'].split(','))
+    fps = section.get('fps', '')
+    return create_source(
+        kind=section.get('type', 'auto' if section.get('path') else 'live'),
+        path=section.get('path') or None,
+        realtime=section.getboolean('realtime', False),
+        fps=float(fps) if fps else None,
+        origin=origin
+    )
@@ -0,0 +1,239 @@
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+import cv2
+from preprocessing_module import to_gray
+
+TEMPLATE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+MIN_TEMPLATE_SIZE = 8  # Sotto questa dimensione un livello ridotto non è più affidabile
+# Livelli di zoom di Discord (Impostazioni > Aspetto), utili come scale dei template
+DISCORD_ZOOM_SCALES = (0.5, 0.67, 0.75, 0.8, 0.9, 1.0, 1.1, 1.25, 1.5, 1.75, 2.0)
+
+@dataclass
+class TemplateMatch:
+    name: str
+    x: int
+    y: int
+    width: int
+    height: int
+    score: float
+    scale: float = 1.0
+
+def build_pyramid(gray, levels):
+    """Piramide [piena risoluzione, metà, ...] fermandosi prima di scendere sotto MIN_TEMPLATE_SIZE"""
+    pyramid = [gray]
+    for _ in range(levels):
+        if min(pyramid[-1].shape[:2]) // 2 < MIN_TEMPLATE_SIZE:
+            break
+        pyramid.append(cv2.pyrDown(pyramid[-1]))
+    return pyramid
+
+class Template:
+    """Template in scala di grigi con una piramide per ogni scala (livello 0 = risoluzione piena)"""
+    def __init__(self, name, image, levels=1, scales=(1.0,)):
+        self.name = name
+        gray = to_gray(image)
+        self.pyramids = {}  # scala -> piramide
+        for scale in scales:
+            if scale == 1.0:
+                scaled = gray
+            else:
+                width, height = round(gray.shape[1] * scale), round(gray.shape[0] * scale)
+                if min(width, height) < MIN_TEMPLATE_SIZE:
+                    continue
+                interpolation = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_LINEAR
+                scaled = cv2.resize(gray, (width, height), interpolation=interpolation)
+            self.pyramids[scale] = build_pyramid(scaled, levels)
+        if not self.pyramids:
+            raise ValueError(f"Template {name} troppo piccolo per le scale richieste")
+
+class TemplateCache:
+    """
+    Cache LRU dei template decodificati, indicizzata per percorso e data di modifica:
+    un file modificato su disco viene ricaricato, uno invariato non viene più letto.
+    """
+    def __init__(self, maxsize=32, levels=1, scales=(1.0,)):
+        self.maxsize = maxsize
+        self.levels = levels
+        self.scales = tuple(scales)
+        self._items = OrderedDict()  # percorso -> (mtime_ns, Template)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path):
+        """Template del file, decodificato solo se non è in cache o è cambiato"""
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            raise FileNotFoundError(f"Immagine template non trovata a: {path}")
+
+        with self._lock:
+            entry = self._items.get(path)
+            if entry is not None and entry[0] == mtime:
+                self._items.move_to_end(path)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        image = cv2.imread(path, cv2.IMREAD_COLOR)
+        if image is None:
+            raise FileNotFoundError(f"Immagine template non leggibile: {path}")
+        template = Template(path, image, self.levels, self.scales)
+
+        with self._lock:
+            self._items[path] = (mtime, template)
+            self._items.move_to_end(path)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+        return template
+
+class TemplateMatcher:
+    """
+    Ricerca di template sul frame grezzo: i template vengono caricati una volta e
+    confrontati in scala di grigi alla stessa scala dello schermo. Ogni template
+    viene cercato prima attorno alla posizione dell'ultimo match, poi su un livello
+    ridotto della piramide e infine confermato a risoluzione piena solo nell'intorno
+    dei candidati trovati.
+    """
+    def __init__(self, threshold=0.8, levels=1, scales=(1.0,), roi_margin=8, candidates=3, coarse_tolerance=0.2):
+        self.threshold = threshold
+        self.levels = levels
+        self.scales = tuple(scales)
+        self.roi_margin = roi_margin
+        self.candidates = candidates
+        self.coarse_tolerance = coarse_tolerance
+        self.templates = {}  # nome -> Template
+        self.last_matches = {}  # (contesto, nome) -> (x, y, scala) dell'ultimo match
+        self.roi_hits = 0
+        self.coarse_searches = 0
+
+    def add_template(self, name, image):
+        """Aggiunge un template da un array BGR, BGRA o grigio"""
+        self.templates[name] = Template(name, image, self.levels, self.scales)
+
+    def load_directory(self, templates_dir):
+        """Carica tutti i template (png/jpg) di una cartella e restituisce quanti ne sono stati caricati"""
+        if not os.path.isdir(templates_dir):
+            raise FileNotFoundError(f"La directory dei template non è stata trovata: {templates_dir}")
+        loaded = 0
+        for filename in sorted(os.listdir(templates_dir)):
+            if filename.lower().endswith(TEMPLATE_EXTENSIONS):
+                path = os.path.join(templates_dir, filename)
+                image = cv2.imread(path, cv2.IMREAD_COLOR)  # Stessa conversione in grigio dei frame
+                if image is None:
+                    print(f"Attenzione: impossibile caricare il template {path}")
+                    continue
+                self.add_template(filename, image)
+                loaded += 1
+        return loaded
+
+    def match(self, image, names=None, threshold=None, context=None):
+        """
+        Cerca i template caricati (tutti o quelli in names) in un'immagine BGR, BGRA o grigia.
+        context distingue le sorgenti (es. il nome dell'area) per la memoria dell'ultimo match.
+        Restituisce {nome: TemplateMatch} per i template trovati.
+        """
+        names = names if names is not None else list(self.templates)
+        return self.match_templates(image, [self.templates[name] for name in names], threshold, context)
+
+    def match_templates(self, image, templates, threshold=None, context=None):
+        """Cerca più Template (anche esterni, es. da TemplateCache) sullo stesso frame, convertito una sola volta"""
+        threshold = self.threshold if threshold is None else threshold
+        pyramid = [to_gray(image)]
+        found = {}
+        for template in templates:
+            result = self._match_template(pyramid, template, threshold, (context, template.name))
+            if result is not None:
+                found[template.name] = result
+        return found
+
+    def find(self, image, threshold=None, context=None):
+        """Nomi dei template presenti nell'immagine"""
+        return set(self.match(image, threshold=threshold, context=context))
+
+    def _search(self, gray, template_gray, x0, y0, x1, y1):
+        """matchTemplate ristretto alla regione [x0, x1) x [y0, y1); restituisce (punteggio, x, y)"""
+        h, w = gray.shape
+        x0, y0, x1, y1 = max(0, x0), max(0, y0), min(w, x1), min(h, y1)
+        th, tw = template_gray.shape
+        if x1 - x0 < tw or y1 - y0 < th:
+            return -1.0, 0, 0
+        res = cv2.matchTemplate(gray[y0:y1, x0:x1], template_gray, cv2.TM_CCOEFF_NORMED)
+        _, score, _, (x, y) = cv2.minMaxLoc(res)
+        return score, x0 + x, y0 + y
+
+    def _refine(self, frame_pyramid, name, scale, template_gray, x, y, radius, threshold):
+        """Conferma a risoluzione piena attorno a (x, y)"""
+        th, tw = template_gray.shape
+        score, x, y = self._search(frame_pyramid[0], template_gray, x - radius, y - radius,
+                                   x + tw + radius, y + th + radius)
+        if score >= threshold:
+            return TemplateMatch(name, x, y, tw, th, float(score), scale)
+        return None
+
+    @staticmethod
+    def _frame_level(frame_pyramid, level):
+        """Livello della piramide del frame, calcolato al primo uso e condiviso tra i template"""
+        while len(frame_pyramid) <= level:
+            if min(frame_pyramid[-1].shape[:2]) // 2 < MIN_TEMPLATE_SIZE:
+                break
+            frame_pyramid.append(cv2.pyrDown(frame_pyramid[-1]))
+        return min(level, len(frame_pyramid) - 1)
+
+    def _coarse_search(self, frame_pyramid, name, scale, pyramid, threshold):
+        """Ricerca di una scala del template sul livello ridotto, con conferma dei candidati"""
+        gray = frame_pyramid[0]
+        template_gray = pyramid[0]
+        if gray.shape[0] < template_gray.shape[0] or gray.shape[1] < template_gray.shape[1]:
+            return None
+
+        level = self._frame_level(frame_pyramid, len(pyramid) - 1)
+        if level == 0:
+            score, x, y = self._search(gray, template_gray, 0, 0, gray.shape[1], gray.shape[0])
+            if score >= threshold:
+                return TemplateMatch(name, x, y, template_gray.shape[1], template_gray.shape[0], float(score), scale)
+            return None
+
+        coarse_template = pyramid[level]
+        res = cv2.matchTemplate(frame_pyramid[level], coarse_template, cv2.TM_CCOEFF_NORMED)
+        factor = 2 ** level
+        ch, cw = coarse_template.shape
+        for _ in range(self.candidates):
+            _, score, _, (cx, cy) = cv2.minMaxLoc(res)
+            if score < threshold - self.coarse_tolerance:
+                break
+            # Conferma a risoluzione piena nell'intorno del candidato
+            match = self._refine(frame_pyramid, name, scale, template_gray, cx * factor, cy * factor,
+                                 factor + 1, threshold)
+            if match is not None:
+                return match
+            # Candidato scartato: lo si esclude e si prova il successivo
+            res[max(0, cy - ch // 2):cy + ch // 2 + 1, max(0, cx - cw // 2):cx + cw // 2 + 1] = -1.0
+        return None
+
+    def _match_template(self, frame_pyramid, template, threshold, key):
+        # 1. Intorno dell'ultimo match, alla scala a cui era stato trovato
+        last = self.last_matches.get(key)
+        if last is not None and last[2] in template.pyramids:
+            x, y, scale = last
+            match = self._refine(frame_pyramid, template.name, scale, template.pyramids[scale][0],
+                                 x, y, self.roi_margin, threshold)
+            if match is not None:
+                self.roi_hits += 1
+                return match
+
+        # 2. Ricerca a piramide su tutte le scale: vince il punteggio migliore
+        self.coarse_searches += 1
+        best = None
+        for scale, pyramid in template.pyramids.items():
+            match = self._coarse_search(frame_pyramid, template.name, scale, pyramid, threshold)
+            if match is not None and (best is None or match.score > best.score):
+                best = match
+
+        if best is not None:
+            self.last_matches[key] = (best.x, best.y, best.scale)
+        else:
+            self.last_matches.pop(key, None)
+        return best
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# I moduli sono importati come file piatti (from dedup_module import ...), come in main_modular.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,22 @@
+import hashlib
+
+from analysis_module import MessageAnalyzer
+from dedup_module import DedupStore
+
+MESSAGE = "Current Trade\nToken Name: ETH\nEntry Price: 2905.5\nStop Loss: 2790"
+
+def test_default_store_records_notified_messages():
+    analyzer = MessageAnalyzer()
+    message_hash = hashlib.md5(MESSAGE.encode()).hexdigest()
+    assert analyzer.is_new_message(MESSAGE, message_hash)
+    analyzer.update_last_messages(message_hash, MESSAGE)
+    assert not analyzer.is_new_message(MESSAGE, message_hash)
+
+def test_set_dedup_store_replaces_default_store():
+    analyzer = MessageAnalyzer()
+    store = DedupStore()
+    analyzer.set_dedup_store(store)
+    message_hash = hashlib.md5(MESSAGE.encode()).hexdigest()
+    analyzer.update_last_messages(message_hash)
+    assert message_hash in store
+    assert not analyzer.is_new_message(MESSAGE, message_hash, store)
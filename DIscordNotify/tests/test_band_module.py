@@ -0,0 +1,44 @@
+import cv2
+import numpy as np
+import pytest
+from band_module import LINE_PENDING, BandOCR
+from ocr_module import CompletedBatch, OCRResult
+
+class FailedBatch:
+    def result(self):
+        raise RuntimeError("OCR non riuscito")
+
+class FlakyOCR:
+    """OCR finto: la prima lettura fallisce, le successive restituiscono 'riga'"""
+    def __init__(self):
+        self.calls = 0
+
+    def submit(self, images, psm=None):
+        self.calls += 1
+        if self.calls == 1:
+            return FailedBatch()
+        return CompletedBatch([OCRResult("riga") for _ in images])
+
+def make_frame():
+    frame = np.full((120, 300, 3), 255, np.uint8)
+    for index, y in enumerate((30, 70, 110)):
+        cv2.putText(frame, f"messaggio {index}", (10, y), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 0), 2)
+    return frame
+
+@pytest.mark.parametrize("line_mode", [False, True])
+def test_failed_collect_leaves_no_pending_bands(line_mode):
+    band_ocr = BandOCR(FlakyOCR(), lambda frame: cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), line_mode=line_mode)
+    frame = make_frame()
+    job = band_ocr.submit(frame)
+    with pytest.raises(RuntimeError):
+        band_ocr.collect(job)
+    assert all(result is not None and result is not LINE_PENDING for result in band_ocr.band_results.values())
+
+    # Lo stesso frame viene riletto per intero invece di riportare i segnaposto come testo
+    result = band_ocr.collect(band_ocr.submit(frame))
+    assert band_ocr.last_ocr_bands == band_ocr.last_total_bands > 0
+    assert result.text.split("\n") == ["riga"] * band_ocr.last_total_bands
+
+    # Frame identico dopo una lettura riuscita: nessuna banda riletta
+    band_ocr.collect(band_ocr.submit(frame))
+    assert band_ocr.last_ocr_bands == 0
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from benchmark_module import make_sample_frame
+from change_module import FrameChangeDetector
+
+BASE_LINES = [
+    "Eliz Challenge",
+    "Long: SOL",
+    "Entry: 142.35",
+    "Stop Loss: 138.10",
+    "EP Retest: false",
+]
+
+@pytest.mark.parametrize("index, edited", [
+    (3, "Stop Loss: 138.70"),
+    (2, "Entry: 142.36"),
+    (1, "Long: SOI"),
+    (4, "EP Retest: true"),
+])
+def test_single_character_edit_is_a_change(index, edited):
+    detector = FrameChangeDetector(sensitivity=5)
+    assert detector.has_changed(make_sample_frame(BASE_LINES))
+
+    lines = list(BASE_LINES)
+    lines[index] = edited
+    assert detector.has_changed(make_sample_frame(lines))
+    assert detector.last_changed_blocks >= 1
+
+def test_identical_and_noisy_frames_are_skipped():
+    detector = FrameChangeDetector(sensitivity=5)
+    frame = make_sample_frame(BASE_LINES)
+    assert detector.has_changed(frame)
+    assert not detector.has_changed(frame.copy())
+
+    # Rumore isolato sotto soglia e un singolo pixel fuori tolleranza non contano
+    noisy = frame.astype(np.int16) + np.random.default_rng(0).integers(-3, 4, frame.shape)
+    noisy = np.clip(noisy, 0, 255).astype(np.uint8)
+    noisy[5, 5] = 255
+    assert not detector.has_changed(noisy)
@@ -0,0 +1,106 @@
+import configparser
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import textwrap
+import pytest
+import dedup_module
+from dedup_module import DedupStore, NearDuplicateIndex, load_near_distances
+
+MESSAGE = "Current Trade\nToken Name: ETH\nEntry Price: 2905.5\nStop Loss: 2790"
+JITTERED = "Current Trade\nToken Name: ETH\nEntry Prlce: 29O5.5\nStop Loss: 2790"
+
+def test_store_survives_restart(tmp_path):
+    path = str(tmp_path / "messages.journal")
+    message_hash = hashlib.md5(MESSAGE.encode()).hexdigest()
+    store = DedupStore(path, legacy_path=None)
+    store.add(message_hash)
+    store.close()
+    reopened = DedupStore(path, legacy_path=None)
+    assert message_hash in reopened
+    reopened.close()
+
+def test_near_duplicates_survive_restart(tmp_path):
+    path = str(tmp_path / "messages.near")
+    index = NearDuplicateIndex(path=path)
+    index.add(MESSAGE)
+    index.close()
+    reopened = NearDuplicateIndex(path=path)
+    assert reopened.find(JITTERED, 3) == MESSAGE
+    assert reopened.find(MESSAGE.replace("2905.5", "2950.5"), 3) is None
+    reopened.close()
+
+def test_near_duplicates_restart_in_new_process(tmp_path):
+    # Il simhash non dipende da hash() di Python: stesse chiavi con un altro PYTHONHASHSEED
+    path = str(tmp_path / "messages.near")
+    index = NearDuplicateIndex(path=path)
+    index.add(MESSAGE)
+    index.close()
+    script = textwrap.dedent(f"""
+        import sys
+        sys.path.insert(0, {os.path.dirname(dedup_module.__file__)!r})
+        from dedup_module import NearDuplicateIndex
+        print(NearDuplicateIndex(path={path!r}).find({JITTERED!r}, 3) == {MESSAGE!r})
+    """)
+    env = dict(os.environ, PYTHONHASHSEED="12345")
+    output = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True,
+                            env=env).stdout
+    assert output.strip() == "True"
+
+def test_simhash_is_stable_across_processes():
+    script = textwrap.dedent(f"""
+        import sys
+        sys.path.insert(0, {os.path.dirname(dedup_module.__file__)!r})
+        from dedup_module import simhash
+        print(simhash({MESSAGE!r}))
+    """)
+    outputs = {subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True,
+                              env=dict(os.environ, PYTHONHASHSEED=seed)).stdout.strip() for seed in ("1", "2")}
+    assert outputs == {str(dedup_module.simhash(MESSAGE))}
+
+@pytest.mark.parametrize("stored, probe", [
+    ("Long ETH 5x leverage market entry now", "Long BTC 5x leverage market entry now"),
+    ("Long: ETH Entry: 2905-2882 SL: 2790", "Long: BTC Entry: 2905-2882 SL: 2790"),
+    ("Current Trade\nToken Name: SOL\nEntry Price: 142.35", "Current Trade\nToken Name: SOI\nEntry Price: 142.35"),
+])
+def test_ticker_swap_is_not_a_near_duplicate(stored, probe):
+    index = NearDuplicateIndex()
+    index.add(stored)
+    assert index.find(probe, 3) is None
+
+def test_near_distance_scales_with_length():
+    index = NearDuplicateIndex()
+    index.add("SL hit on ETH")
+    assert index.find("SL hlt on ETH", 3) is None  # Troppo corto: solo hash esatto
+    index.add(MESSAGE)
+    assert index.find(JITTERED, 3) == MESSAGE
+
+def test_near_distance_is_opt_in():
+    config = configparser.ConfigParser()
+    assert load_near_distances(config) == {'': 0}
+    config.read_string("[dedup]\nnear_distance = 3\n[dedup:@Eliz Challenge]\nnear_distance = 1\n")
+    assert load_near_distances(config) == {'': 3, '@Eliz Challenge': 1}
+
+def test_near_journal_ignores_truncated_line_and_compacts(tmp_path):
+    path = tmp_path / "messages.near"
+    index = NearDuplicateIndex(capacity=2, path=str(path))
+    for number in range(5):
+        index.add(f"Current Trade\nEntry Price: {number}")
+    index.close()
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('[1700000000.0, "Current Tra')
+    reopened = NearDuplicateIndex(capacity=2, path=str(path))
+    assert len(reopened) == 2
+    assert reopened.find("Current Trade\nEntry Price: 4", 1) is not None
+    assert reopened.find("Current Trade\nEntry Price: 1", 1) is None
+    reopened.close()
+    assert len(path.read_text(encoding='utf-8').splitlines()) <= 4
+
+def test_near_duplicates_expire_with_ttl(tmp_path):
+    path = tmp_path / "messages.near"
+    path.write_text(json.dumps([1000.0, MESSAGE]) + "\n", encoding='utf-8')
+    reopened = NearDuplicateIndex(path=str(path), ttl=3600)
+    assert reopened.find(JITTERED, 3) is None
+    reopened.close()
@@ -0,0 +1,58 @@
+import random
+
+import pytest
+
+from keyword_module import KeywordMatcher, parse_keywords
+
+LINES = [
+    "Long ETH 5x leverage",
+    "LONGS are crowded, shorting here",
+    "short: BTC (edited)",
+    "price 1.5+2 [entry] (a|b) ^start$ \\d end?",
+    "nothing to see",
+    "",
+]
+
+def legacy_search(keywords, line):
+    """Il vecchio controllo delle aree: any(kw in line.lower() for kw in keywords)"""
+    return any(kw in line.lower() for kw in parse_keywords(keywords))
+
+@pytest.mark.parametrize("keywords", [
+    "long, longs",
+    "longs,long",
+    "short, shorting, sh",
+    "current trade, long, short",
+    "1.5+2, [entry], (a|b), ^start$, \\d, end?",
+    ".*, +, ?",
+    "",
+    " , ,",
+])
+@pytest.mark.parametrize("line", LINES)
+def test_search_matches_legacy_any(keywords, line):
+    assert bool(KeywordMatcher(keywords).search(line)) == legacy_search(keywords, line)
+
+def test_prefix_keywords_prefer_the_longest():
+    matcher = KeywordMatcher("long, longs")
+    match = matcher.search("LONGS are crowded")
+    assert (match.keyword, match.start, match.end) == ("longs", 0, 5)
+    assert matcher.search("long ETH").keyword == "long"
+
+def test_metacharacters_are_literal():
+    matcher = KeywordMatcher(".*, (a|b)")
+    assert matcher.search("anything") is None
+    assert matcher.search("pick (A|B) now").keyword == "(a|b)"
+
+def test_empty_keyword_list():
+    matcher = KeywordMatcher("")
+    assert not matcher and len(matcher) == 0
+    assert matcher.search("long") is None
+    assert matcher.find_all("long short") == []
+
+def test_random_keywords_match_legacy_any():
+    rng = random.Random(0)
+    alphabet = "abl.o*n(g|s)"
+    for _ in range(500):
+        keywords = ",".join("".join(rng.choice(alphabet) for _ in range(rng.randint(1, 4)))
+                            for _ in range(rng.randint(0, 5)))
+        line = "".join(rng.choice(alphabet + "LON ") for _ in range(rng.randint(0, 20)))
+        assert bool(KeywordMatcher(keywords).search(line)) == legacy_search(keywords, line), (keywords, line)
@@ -0,0 +1,61 @@
+import threading
+import time
+import numpy as np
+import ocr_module
+from ocr_module import OCRProcessor
+
+TSV = ("level\tpage_num\tblock_num\tpar_num\tline_num\tword_num\tleft\ttop\twidth\theight\tconf\ttext\n"
+       "5\t1\t1\t1\t1\t1\t0\t0\t10\t10\t95\tCurrent\n"
+       "5\t1\t1\t1\t1\t2\t12\t0\t10\t10\t95\tTrade\n")
+
+class BrokenEngine:
+    created = 0
+
+    def __init__(self, **kwargs):
+        BrokenEngine.created += 1
+        raise OSError("libtesseract.so.5: cannot open shared object file")
+
+def test_tesseract_api_failure_falls_back_once(monkeypatch, capsys):
+    BrokenEngine.created = 0
+    monkeypatch.setattr(ocr_module, "TesseractEngine", BrokenEngine)
+    monkeypatch.setattr(ocr_module.pytesseract, "image_to_data", lambda image, config: TSV)
+    processor = OCRProcessor(backend='tesseract_api', cache_size=0)
+    image = np.zeros((10, 30), np.uint8)
+    results = [processor.recognize(image) for _ in range(5)]
+    assert [result.text for result in results] == ["Current Trade"] * 5
+    assert BrokenEngine.created == 1
+    output = capsys.readouterr().out
+    assert output.count("libtesseract non disponibile") == 1
+    assert "Errore OCR" not in output
+
+class SlowEngine:
+    created = 0
+
+    def __init__(self, **kwargs):
+        SlowEngine.created += 1
+        time.sleep(0.05)
+
+    def close(self):
+        pass
+
+def test_engine_created_once_across_threads(monkeypatch):
+    SlowEngine.created = 0
+    monkeypatch.setattr(ocr_module, "TesseractEngine", SlowEngine)
+    processor = OCRProcessor(backend='tesseract_api', cache_size=0)
+    engines = []
+    threads = [threading.Thread(target=lambda: engines.append(processor.get_engine())) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert SlowEngine.created == 1
+    assert len({id(engine) for engine in engines}) == 1
+
+def test_pytesseract_plain_text_uses_image_to_string(monkeypatch):
+    # image_to_string conserva spazi e righe vuote; il testo di recognize è ricostruito dalle parole
+    monkeypatch.setattr(ocr_module.pytesseract, "image_to_string", lambda image, config: "Current  Trade\n\nSL: 2790\n")
+    monkeypatch.setattr(ocr_module.pytesseract, "image_to_data", lambda image, config: TSV)
+    processor = OCRProcessor(backend='pytesseract', cache_size=0)
+    image = np.zeros((10, 30), np.uint8)
+    assert processor.extract_text(image) == "Current  Trade\n\nSL: 2790"
+    assert processor.recognize(image).text == "Current Trade"
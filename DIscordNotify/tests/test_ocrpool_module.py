@@ -0,0 +1,38 @@
+from concurrent.futures import Future
+import numpy as np
+from ocr_module import OCRCache, OCRResult
+from ocrpool_module import OCRPool
+
+def test_in_flight_tile_counts_as_hit_and_moves_to_cache():
+    cache = OCRCache()
+    pool = OCRPool(workers=1, cache=cache)  # I processi partono solo al primo submit
+    try:
+        key = cache.key(np.zeros((4, 4), np.uint8))
+        future = Future()
+        pool._in_flight[key] = future
+
+        assert pool._cached(key) is future
+        stats = cache.stats()
+        assert (stats['hits'], stats['in_flight_hits'], stats['misses']) == (1, 1, 0)
+
+        future.set_result(OCRResult("riga"))
+        pool._store(key, future)
+        assert key not in pool._in_flight
+        assert pool._cached(key).result().text == "riga"
+        assert cache.stats()['hits'] == 2
+    finally:
+        pool.close()
+
+def test_store_keeps_newer_in_flight_read():
+    cache = OCRCache()
+    pool = OCRPool(workers=1, cache=cache)
+    try:
+        key = cache.key(np.zeros((4, 4), np.uint8))
+        failed, newer = Future(), Future()
+        failed.set_exception(RuntimeError("OCR non riuscito"))
+        pool._in_flight[key] = newer
+        pool._store(key, failed)  # Callback tardivo di una lettura precedente fallita
+        assert pool._in_flight[key] is newer
+        assert cache.get(key) is None
+    finally:
+        pool.close()
@@ -0,0 +1,28 @@
+import itertools
+import time
+from pipeline_module import Pipeline
+from scheduler_module import AdaptiveScheduler
+
+def test_drain_completes_queued_items_before_stop():
+    counter = itertools.count()
+    produced, handled = [], []
+
+    def produce():
+        produced.append(next(counter))
+        return produced[-1]
+
+    def slow_dispatch(item):
+        time.sleep(0.02)
+        handled.append(item)
+
+    pipeline = Pipeline()
+    pipeline.add_queue("items", maxsize=50)
+    pipeline.add_source("source", produce, "items", AdaptiveScheduler(active_interval=0.001, idle_interval=0.001))
+    pipeline.add_stage("dispatch", slow_dispatch, "items")
+    pipeline.start()
+    time.sleep(0.2)
+
+    assert pipeline.drain(timeout=10)
+    assert pipeline.stop()
+    assert not pipeline.alive()
+    assert handled == produced
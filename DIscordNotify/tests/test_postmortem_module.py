@@ -0,0 +1,34 @@
+import os
+import numpy as np
+from postmortem_module import FrameRingBuffer
+
+def make_buffer(path, max_dumps):
+    buffer = FrameRingBuffer(str(path), capacity=2, min_interval=0, max_dumps=max_dumps)
+    buffer.allocate([('chat', (4, 4, 4), lambda frame: frame[:, :, 0])])
+    slot = buffer.next_slot()
+    buffer.store_raw(slot, 'chat', np.zeros((4, 4, 4), np.uint8))
+    buffer.store_result(slot, 'chat', "testo")
+    return buffer
+
+def test_dump_preprocesses_raw_frames(tmp_path):
+    buffer = make_buffer(tmp_path, max_dumps=1)
+    folder = buffer.dump("prova")
+    assert sorted(os.listdir(folder)) == ["00_chat_pre.png", "00_chat_raw.png", "info.json"]
+
+def test_prune_keeps_only_last_dumps(tmp_path):
+    buffer = make_buffer(tmp_path, max_dumps=2)
+    folders = [buffer.dump(f"prova{index}") for index in range(4)]
+    remaining = sorted(entry.path for entry in os.scandir(tmp_path))
+    assert remaining == sorted(folders)[-2:]
+
+def test_prune_keeps_unrelated_folders(tmp_path):
+    for name in ("logs", "templates", "00_altro"):
+        (tmp_path / name).mkdir()
+        (tmp_path / name / "file.txt").write_text("da non cancellare")
+    buffer = make_buffer(tmp_path, max_dumps=1)
+    for index in range(3):
+        buffer.dump(f"prova{index}")
+    for name in ("logs", "templates", "00_altro"):
+        assert (tmp_path / name / "file.txt").read_text() == "da non cancellare"
+    dumps = [entry.name for entry in os.scandir(tmp_path) if entry.name not in ("logs", "templates", "00_altro")]
+    assert len(dumps) == 1
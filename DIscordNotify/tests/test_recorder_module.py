@@ -0,0 +1,43 @@
+import os
+import numpy as np
+import pytest
+from recorder_module import RecordingReader, SessionRecorder, chunk_files
+
+def noise_frames(count, seed=0):
+    """Frame tutti diversi e poco comprimibili"""
+    rng = np.random.default_rng(seed)
+    return [rng.integers(0, 256, (64, 64, 3), dtype=np.uint8) for _ in range(count)]
+
+def record(path, frames, budget_mb, chunk_mb):
+    recorder = SessionRecorder(str(path), budget_mb=budget_mb, chunk_mb=chunk_mb, queue_size=len(frames))
+    recorder.start()
+    for frame in frames:
+        recorder.submit(frame)
+    recorder.stop(timeout=30)
+    return recorder
+
+def test_invalid_budget_rejected_and_chunk_clamped(tmp_path):
+    with pytest.raises(ValueError):
+        SessionRecorder(str(tmp_path), budget_mb=0)
+    recorder = SessionRecorder(str(tmp_path), budget_mb=1, chunk_mb=64)
+    assert recorder.chunk_bytes == recorder.budget_bytes
+
+def test_budget_smaller_than_chunk_keeps_active_session(tmp_path):
+    frames = noise_frames(20)
+    recorder = record(tmp_path, frames, budget_mb=0.05, chunk_mb=1)
+    reader = RecordingReader(recorder.session_path)
+    assert len(reader) == recorder.frames_written > 0
+    assert all(np.array_equal(reader.read(index), frames[index]) for index in range(len(reader)))
+    reader.close()
+    assert recorder.frames_written + recorder.frames_over_budget == len(frames)
+    assert recorder.chunks_deleted == 0
+
+def test_old_sessions_deleted_before_active_session(tmp_path):
+    old = record(tmp_path, noise_frames(10, seed=1), budget_mb=0.2, chunk_mb=0.02)
+    os.rename(old.session_path, os.path.join(str(tmp_path), "session_00000000_000000"))
+    recorder = record(tmp_path, noise_frames(40, seed=2), budget_mb=0.2, chunk_mb=0.02)
+    assert not os.path.exists(os.path.join(str(tmp_path), "session_00000000_000000"))
+    reader = RecordingReader(recorder.session_path)
+    assert len(reader) == recorder.frames_written  # Nessun chunk della sessione in corso cancellato
+    reader.close()
+    assert len(chunk_files(recorder.session_path)) == recorder._chunk_index
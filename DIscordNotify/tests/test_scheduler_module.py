@@ -0,0 +1,83 @@
+import threading
+
+import pytest
+
+from scheduler_module import AdaptiveScheduler
+
+class FakeClock:
+    """Orologio monotono manuale: il test decide quando scatta ogni scadenza"""
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+def make_scheduler(clock):
+    return AdaptiveScheduler(active_interval=2.0, idle_interval=10.0, decay=1.5, miss_tolerance=0.05, clock=clock)
+
+def test_absolute_deadlines_do_not_drift():
+    clock = FakeClock()
+    scheduler = make_scheduler(clock)
+    stop = threading.Event()
+    assert scheduler.wait(stop)  # Primo tick subito
+    assert scheduler.next_deadline == pytest.approx(102.0)
+    for _ in range(3):
+        scheduler.notify_activity()
+        deadline = scheduler.next_deadline
+        clock.now = deadline + 0.03  # Tick in ritardo ma entro la tolleranza
+        assert scheduler.wait(stop)
+        assert scheduler.next_deadline == pytest.approx(deadline + 2.0)  # Dalla scadenza, non da adesso
+    assert scheduler.missed == 0
+    assert scheduler.ticks == 4
+
+def test_interval_decays_to_idle():
+    clock = FakeClock()
+    scheduler = make_scheduler(clock)
+    stop = threading.Event()
+    intervals = []
+    for _ in range(7):
+        clock.now = scheduler.next_deadline or clock.now
+        assert scheduler.wait(stop)
+        intervals.append(scheduler.next_deadline - clock.now)
+    assert intervals == pytest.approx([2.0, 3.0, 4.5, 6.75, 10.0, 10.0, 10.0])
+
+def test_activity_resets_to_active_interval():
+    clock = FakeClock()
+    scheduler = make_scheduler(clock)
+    stop = threading.Event()
+    for _ in range(5):
+        clock.now = scheduler.next_deadline or clock.now
+        scheduler.wait(stop)
+    assert scheduler.next_deadline - clock.now == pytest.approx(10.0)
+    clock.now += 1.0
+    scheduler.notify_activity()
+    # La scadenza si avvicina all'intervallo attivo e il decadimento riparte
+    assert scheduler.next_deadline == pytest.approx(clock.now + 2.0)
+    assert scheduler.current_interval == 2.0
+    clock.now = scheduler.next_deadline
+    scheduler.wait(stop)
+    assert scheduler.next_deadline - clock.now == pytest.approx(2.0)
+    assert scheduler.current_interval == pytest.approx(3.0)
+
+def test_missed_deadlines_are_counted_and_not_replayed():
+    clock = FakeClock()
+    scheduler = make_scheduler(clock)
+    stop = threading.Event()
+    scheduler.wait(stop)
+    clock.now = scheduler.next_deadline + 0.2
+    scheduler.wait(stop)
+    assert (scheduler.missed, scheduler.max_lateness) == (1, pytest.approx(0.2))
+    # In ritardo di più di un periodo: si riparte da adesso senza recuperare i tick persi
+    clock.now = scheduler.next_deadline + 20.0
+    scheduler.wait(stop)
+    assert scheduler.missed == 2
+    assert scheduler.next_deadline == pytest.approx(clock.now + 4.5)
+    stats = scheduler.stats()
+    assert (stats['ticks'], stats['missed'], stats['max_lateness_ms']) == (3, 2, pytest.approx(20000.0))
+
+def test_wait_returns_false_when_stopped():
+    scheduler = make_scheduler(FakeClock())
+    stop = threading.Event()
+    stop.set()
+    assert not scheduler.wait(stop)
+    assert scheduler.ticks == 0
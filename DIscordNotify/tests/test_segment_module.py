@@ -0,0 +1,56 @@
+from benchmark_module import make_trade_block
+from keyword_module import KeywordMatcher
+from segment_module import MessageSegmenter
+
+def chat(*indexes):
+    """Righe visibili con i messaggi 'Current Trade' indicati, dall'alto verso il basso"""
+    return [line for index in indexes for line in make_trade_block(index)[1:]]
+
+def message(index):
+    return "\n".join(make_trade_block(index)[1:])
+
+def settled_segmenter(lines):
+    """Segmenter che ha già visto (e registrato) il frame lines"""
+    segmenter = MessageSegmenter(KeywordMatcher("current trade"), skip_prefix="(Edited")
+    for text in segmenter.feed(lines):
+        segmenter.settle(text)
+    return segmenter
+
+def test_first_frame_returns_every_message():
+    segmenter = MessageSegmenter(KeywordMatcher("current trade"))
+    assert segmenter.feed(chat(0, 1)) == [message(0), message(1)]
+
+def test_scroll_returns_only_the_new_message():
+    segmenter = settled_segmenter(chat(0, 1))
+    # La chat scorre di tre righe e in fondo compare un messaggio nuovo
+    assert segmenter.feed(chat(0, 1, 2)[3:]) == [message(2)]
+    assert segmenter.stats()['lines_segmented'] < 2 * len(chat(0, 1, 2))
+
+def test_top_line_cut_by_the_window_edge():
+    segmenter = settled_segmenter(chat(0, 1))
+    lines = chat(0, 1, 2)[2:]
+    lines[0] = lines[0][4:]  # Prima riga tagliata a metà dal bordo e letta diversa
+    assert segmenter.feed(lines) == [message(2)]
+
+def test_edit_rebuilds_the_whole_message():
+    segmenter = settled_segmenter(chat(0, 1))
+    lines = chat(0, 1)
+    edited = [line.replace("Stop Loss:", "Stop Loss: 1") if line.startswith("Stop Loss") else line
+              for line in lines[8:]]
+    lines[8:] = edited + ["(Edited)"]
+    assert segmenter.feed(lines) == ["\n".join(edited)]
+
+def test_unsettled_message_is_returned_until_settled():
+    segmenter = MessageSegmenter(KeywordMatcher("current trade"))
+    assert segmenter.feed(chat(0, 1)) == [message(0), message(1)]
+    segmenter.settle(message(0))  # L'invio del secondo messaggio è fallito
+    assert segmenter.feed(chat(0, 1)) == [message(1)]
+    # Anche dopo uno scorrimento il messaggio in sospeso viene ritentato
+    assert segmenter.feed(chat(0, 1, 2)[3:]) == [message(1), message(2)]
+    segmenter.settle(message(1))
+    segmenter.settle(message(2))
+    assert segmenter.feed(chat(0, 1, 2)[3:]) == []
+
+def test_unaligned_frame_is_segmented_from_scratch():
+    segmenter = settled_segmenter(chat(0, 1))
+    assert segmenter.feed(chat(5, 6)) == [message(5), message(6)]
@@ -0,0 +1,104 @@
+import dataclasses
+import re
+
+import pytest
+
+from benchmark_module import legacy_clean_classic, legacy_parse_eliz_fields, make_trade_block
+from signal_module import clean_classic_signal, parse_classic_trade, parse_eliz_trade
+
+ELIZ_CORPUS = ["\n".join(make_trade_block(index)[1:]) for index in range(8)] + [
+    "Current Trade LIMIT ORDER\nToken Name: ETH\nEntry Price: 2905.5\nStop Loss: breakeven\nTake Profit: TBD",
+    "Current Trade\nToken Name: SOL\nStop Loss: Stop Loss: 138.10\nEP Retest: TRUE\nShort squeeze expected",
+    "Current Trade\nLong/short ratio: 1.2\nToken Name: BTC\nBalance: 1k\nBought Token Amount: 12.5",
+    "Current Trade\n  Token Name:   AVAX  \n\nEntry Price: abc\nEP Retest: sì\nshort\nLIMIT ORDER   ",
+    "",
+]
+
+CLASSIC_CORPUS = [
+    "Long: ETH Entry: 2905-2882 - 2860 SL: 2790 TP: 3000",
+    "Short: BTC Entry: 64000 SL: breakeven",
+    "LIMIT SOL Long Entry: 140-138.5 SL: 130",
+    "ARKM long and short both fine Entry: 1.25-1.20",
+    "LIMIT DOGE short\nStop Loss: breakeven\nTake Profit: 0.2",
+    "NEAR Long Entry: 5.1-5.0-4.9\nStop Loss: 4.5",
+]
+
+def legacy_classic_fields(text):
+    """
+    Regole per riga del parse_classic_trade originale (lato, ticker saltando LIMIT,
+    intervallo di Entry, righe Stop Loss/Take Profit) senza il NameError finale
+    """
+    side, token_name, entry_range, stop_loss, take_profit = "", "", [], "", ""
+    for line in text.strip().split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+        if "long" in line.lower():
+            side = "Buy"
+        elif "short" in line.lower():
+            side = "Sell"
+        splitted = line.split()
+        token_name = splitted[0] if splitted[0] != "LIMIT" else splitted[1]
+        match = re.search(r'Entry:\s*((?:[\d.]+\s*-\s*)*[\d.]+)', text)
+        if match:
+            entry_range = [float(number.strip()) for number in match.group(1).split('-')
+                           if re.match(r'^\d+\.?\d*$', number.strip())]
+        if line.startswith("Stop Loss:"):
+            sl_str = line.replace("Stop Loss:", "").strip()
+            try:
+                stop_loss = float(sl_str)
+            except ValueError:
+                stop_loss = sl_str
+        elif line.startswith("Take Profit:"):
+            tp_str = line.replace("Take Profit:", "").strip()
+            try:
+                take_profit = float(tp_str)
+            except ValueError:
+                take_profit = tp_str
+    return {'side': side, 'token_name': token_name, 'entry_range': entry_range,
+            'stop_loss': stop_loss, 'take_profit': take_profit}
+
+@pytest.mark.parametrize("message", ELIZ_CORPUS)
+def test_eliz_fields_match_legacy_parser(message):
+    assert dataclasses.asdict(parse_eliz_trade(message)) == legacy_parse_eliz_fields(message)
+
+@pytest.mark.parametrize("message", [
+    "Trader Today at 21:49 Long: ETH Entry: 2905-2882 w/ @Signals",
+    "xx Short BTC @here",
+    "no signal here",
+    "ShLo",
+    "",
+])
+def test_clean_classic_matches_legacy(message):
+    assert clean_classic_signal(message) == legacy_clean_classic(message)
+
+@pytest.mark.parametrize("message", CLASSIC_CORPUS)
+def test_classic_fields_match_legacy_rules(message):
+    legacy = legacy_classic_fields(message)
+    trade = parse_classic_trade(message)
+    assert trade.side == legacy['side']
+    assert trade.entry_range == legacy['entry_range']
+    assert trade.entry_price == (legacy['entry_range'][0] if legacy['entry_range'] else 0.0)
+    if "Stop Loss:" in message:
+        assert trade.stop_loss == legacy['stop_loss']
+        assert trade.take_profit == legacy['take_profit']
+    if "\n" not in message and not re.search(r'(?i)(long|short)\s*:', message):
+        # Senza "Long:"/"Short:" il ticker è la prima parola, dopo l'eventuale LIMIT
+        assert trade.token_name == legacy['token_name']
+
+def test_classic_inline_fields():
+    trade = parse_classic_trade("Long: ETH Entry: 2905-2882 - 2860 SL: breakeven TP: 3000")
+    assert (trade.token_name, trade.side, trade.limit_order) == ("ETH", "Buy", True)
+    assert trade.entry_range == [2905.0, 2882.0, 2860.0]
+    assert (trade.stop_loss, trade.take_profit) == ("breakeven", 3000.0)
+
+def test_long_wins_over_short_on_the_same_line():
+    assert parse_classic_trade("ARKM long and short both fine Entry: 1.25").side == "Buy"
+    assert parse_eliz_trade("Current Trade\nLong/short ratio: 1.2").side == "Buy"
+    assert parse_eliz_trade("Current Trade\nLong/short ratio: 1.2\nshort").side == "Sell"
+
+def test_parse_errors_return_default_trade(capsys):
+    assert parse_eliz_trade(None) == parse_eliz_trade("")
+    trade = parse_classic_trade(None)
+    assert (trade.token_name, trade.limit_order, trade.balance, trade.entry_range) == ("", False, 0, [])
+    assert "Errore nel parsing del trade" in capsys.readouterr().out